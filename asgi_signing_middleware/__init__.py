@@ -49,14 +49,34 @@ License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at https://mozilla.org/MPL/2.0/.
 """
 
+from .body import BodyData
+from .body import SignedBodyMiddleware
+from .body import SignedResponseMiddleware
 from .cookie import CookieData
+from .cookie import LazyCookieData
 from .cookie import SerializedSignedCookieMiddleware
 from .cookie import SimpleSignedCookieMiddleware
+from .links import LinkData
+from .links import SignedLinkMiddleware
+from .multi import CookieSpec
+from .multi import MultiSignedCookieMiddleware
+from .session import SessionData
+from .session import SessionSignedCookieMiddleware
 
 __version__ = '0.2.0'
 
 __all__ = (
+    'BodyData',
     'CookieData',
+    'CookieSpec',
+    'LazyCookieData',
+    'LinkData',
+    'MultiSignedCookieMiddleware',
     'SerializedSignedCookieMiddleware',
+    'SessionData',
+    'SessionSignedCookieMiddleware',
+    'SignedBodyMiddleware',
+    'SignedLinkMiddleware',
+    'SignedResponseMiddleware',
     'SimpleSignedCookieMiddleware',
 )
@@ -0,0 +1,119 @@
+"""Batch signing.
+
+Signing or unsigning many payloads at once, such as when pre-generating cookies for email
+campaigns or load tests, reuses the middleware signer, and can spread the work over a
+process pool, where the middleware is sent once to every worker process.
+
+Work is sent to the workers in windows of items, so that results can be streamed without
+consuming the whole input first.
+"""
+
+import typing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from multiprocessing.context import BaseContext
+
+from blake2signer.errors import ExpiredSignatureError
+
+# Middleware of the current worker process, set when the worker starts
+_worker_middleware: typing.Any = None
+
+
+class WorkerExpiredSignatureError(ExpiredSignatureError):
+    """Expired signature error raised by a worker process.
+
+    Errors raised by a worker are pickled to be raised again in the parent process, which
+    an `ExpiredSignatureError` can't be by default, as it requires keyword arguments.
+    """
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        """Reduce the error to be pickled."""
+        return rebuild_expired_error, (self.args, self.timestamp, self.data)
+
+
+def rebuild_expired_error(
+    args: typing.Tuple[typing.Any, ...],
+    timestamp: datetime,
+    data: bytes,
+) -> WorkerExpiredSignatureError:
+    """Rebuild an expired signature error from its pickled state."""
+    return WorkerExpiredSignatureError(*args, timestamp=timestamp, data=data)
+
+
+def init_worker(middleware: typing.Any) -> None:
+    """Set the middleware of the current worker process."""
+    global _worker_middleware  # pylint: disable=W0603
+    _worker_middleware = middleware
+
+
+def sign_in_worker(data: typing.Any) -> str:
+    """Sign data with the middleware of the current worker process."""
+    signed_data: str = _worker_middleware.sign(data)
+
+    return signed_data
+
+
+def unsign_in_worker(signed_data: str) -> typing.Any:
+    """Unsign data with the middleware of the current worker process.
+
+    Raises:
+        SignedDataError: the signed data was wrong, expired, or otherwise incorrect, where
+            an expired signature is raised as a `WorkerExpiredSignatureError`.
+    """
+    try:
+        return _worker_middleware.unsign(signed_data)
+    except ExpiredSignatureError as exc:
+        raise WorkerExpiredSignatureError(
+            *exc.args,
+            timestamp=exc.timestamp,
+            data=exc.data,
+        ) from exc
+
+
+def map_in_processes(
+    func: typing.Callable[[typing.Any], typing.Any],
+    items: typing.Iterable[typing.Any],
+    *,
+    middleware: typing.Any,
+    processes: int,
+    chunk_size: int,
+    mp_context: typing.Optional[BaseContext] = None,
+) -> typing.Iterator[typing.Any]:
+    """Apply a worker function to every item in a process pool, yielding results in order.
+
+    A window of items is processed while the results of the previous one are yielded.
+
+    Args:
+        func: The worker function.
+        items: The items.
+
+    Keyword Args:
+        middleware: The middleware to send to every worker.
+        processes: Amount of worker processes.
+        chunk_size: Amount of items sent to a worker at once.
+        mp_context (optional): Multiprocessing context to start the workers with (defaults
+            to None, to use the default start method of the platform). Note that the spawn
+            start method, the default on macOS and Windows, starts new interpreters, so
+            the function must be importable, and the middleware picklable.
+
+    Yields:
+        The result of every item.
+    """
+    iterator = iter(items)
+    window_size = chunk_size * processes
+    with ProcessPoolExecutor(
+            processes,
+            mp_context=mp_context,
+            initializer=init_worker,
+            initargs=(middleware,),
+    ) as pool:
+        pending: typing.Iterator[typing.Any] = iter(())
+        while True:
+            window = list(islice(iterator, window_size))
+            results = pool.map(func, window, chunksize=chunk_size)
+            yield from pending
+            if not window:
+                return
+
+            pending = results
@@ -0,0 +1,504 @@
+"""Signed body FastAPI/Starlette middlewares.
+
+Bodies are signed by signing a digest of them (see `get_body_digest`), and the signature
+is sent in a header, so that bodies are hashed chunk by chunk instead of being held in
+memory in full.
+
+Senders, such as webhook providers, sign request bodies, whose signature is checked by the
+`SignedBodyMiddleware` before the application runs. Likewise, the
+`SignedResponseMiddleware` signs response bodies as they stream, so that downstream
+consumers can check their integrity.
+"""
+
+import hashlib
+import typing
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+
+from blake2signer.errors import InvalidSignatureError
+from blake2signer.errors import SignedDataError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.responses import Response
+
+from .detached import DetachedSigner
+from .paths import PathMatcher
+from .types import PathPattern
+from .types import Secrets
+from .types import TResult
+
+if typing.TYPE_CHECKING:
+    from starlette.types import ASGIApp
+    from starlette.types import Message
+    from starlette.types import Receive
+    from starlette.types import Scope
+    from starlette.types import Send
+
+# Spool where the request body is kept while its signature is checked
+Spool = typing.IO[bytes]
+
+
+class BodyTooLargeError(Exception):
+    """The request body is bigger than the maximum body size."""
+
+
+def create_body_hasher() -> typing.Any:
+    """Create a hasher of bodies, to be updated with every chunk."""
+    return hashlib.blake2b(digest_size=32, person=b'asgibody')
+
+
+def get_body_digest(body: bytes) -> bytes:
+    """Get the digest of a whole body, which is what its signature signs."""
+    hasher = create_body_hasher()
+    hasher.update(body)
+
+    digest: bytes = hasher.digest()
+
+    return digest
+
+
+class SignedBodyMiddlewareBase:
+    """Base to create a middleware that signs bodies, or checks their signatures.
+
+    The signature is a timestamped signature of the body digest, sent in a header. Bodies
+    are signed with `sign`, and their signatures checked with `verify`, which rejects
+    signatures older than the signature time-to-live, to limit replays.
+    """
+
+    def __init__(
+        self,
+        app: 'ASGIApp',
+        *,
+        secret: Secrets,
+        header_name: str = 'x-body-signature',
+        signature_ttl: int = 300,
+        signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        include_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+        exclude_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+    ) -> None:
+        """Create a signed body middleware.
+
+        Args:
+            app: An ASGI application instance.
+
+        Keyword Args:
+            secret: The signing secret, or a sequence of secrets ordered from newest to
+                oldest to rotate keys: bodies are signed with the newest one, and verified
+                with any of them.
+            header_name (optional): Name of the header carrying the signature.
+            signature_ttl (optional): Maximum age of a signature, in seconds (defaults to
+                5 minutes).
+            signer_kwargs (optional): Additional keyword arguments for the signer.
+            include_paths (optional): Request paths for which the middleware acts, as
+                path prefixes or compiled regular expressions (defaults to all paths).
+            exclude_paths (optional): Request paths for which the middleware doesn't act,
+                as path prefixes or compiled regular expressions (defaults to none). It
+                takes precedence over `include_paths`.
+
+        Raises:
+            ValueError: the secret was included in the signer kwargs.
+        """
+        self.app: 'ASGIApp' = app
+        self.header_name: str = header_name.lower()
+        self.include_paths: PathMatcher = PathMatcher(include_paths or ())
+        self.exclude_paths: PathMatcher = PathMatcher(exclude_paths or ())
+        # The personalisation follows the one of the signed cookie middlewares
+        self.signer: DetachedSigner = DetachedSigner(
+            secret,
+            personalisation=type(self).__name__ + self.header_name,
+            max_age=signature_ttl,
+            signer_kwargs=signer_kwargs,
+        )
+
+    def sign_digest(self, digest: bytes) -> str:
+        """Sign a body digest, to be sent in the signature header.
+
+        Args:
+            digest: The body digest.
+
+        Returns:
+            The signature.
+        """
+        return self.signer.sign(digest)
+
+    def sign(self, body: bytes) -> str:
+        """Sign a whole body, to be sent in the signature header.
+
+        Args:
+            body: The whole body.
+
+        Returns:
+            The signature.
+        """
+        return self.sign_digest(get_body_digest(body))
+
+    def verify(self, signature: str, digest: bytes) -> None:
+        """Verify the signature of a body given its digest.
+
+        Args:
+            signature: The signature from the header.
+            digest: The body digest.
+
+        Raises:
+            SignedDataError: the signature was wrong, expired, or otherwise incorrect.
+        """
+        self.signer.verify(signature, digest)
+
+    def should_handle_path(self, path: str) -> bool:
+        """Return True if the middleware should act for given request path, False otherwise."""
+        if self.exclude_paths.match(path):
+            return False
+
+        return not self.include_paths or self.include_paths.match(path)
+
+
+@dataclass
+class BodyData:
+    """Signed request body container.
+
+    The body is `verified` if its signature is valid. Otherwise, `exc` holds the reason,
+    which the request handler only gets to see if the middleware doesn't reject bad
+    signatures (see `reject` in the middleware).
+    """
+    verified: bool
+    exc: typing.Optional[Exception] = None
+
+
+class SignedBodyMiddleware(SignedBodyMiddlewareBase):
+    """Middleware that verifies the signature of request bodies, such as webhooks.
+
+    This is a pure ASGI middleware: it reads the body from the `receive` channel before the
+    application runs, hashing it incrementally, and spooling it to a temporary file once it
+    outgrows a memory limit, so that big bodies are never held in memory in full. The body
+    is then replayed to the application from the spool once the signature is checked. Bad
+    signatures are rejected with a 403 response without running the application, and
+    bodies bigger than the maximum body size with a 413 response as soon as they are.
+
+    Senders can produce the signature with `sign`.
+
+    It uses the `request.state` (see https://www.starlette.io/requests/#other-state) to
+    communicate the verification result to request handlers (views), as a `BodyData`.
+    """
+
+    # Size of the chunks of the body replayed to the application, in bytes
+    replay_chunk_size: typing.ClassVar[int] = 64 * 1024
+
+    def __init__(
+        self,
+        app: 'ASGIApp',
+        *,
+        state_attribute_name: str,
+        reject: bool = True,
+        spool_size: int = 1024 * 1024,
+        max_body_size: typing.Optional[int] = 10 * 1024 * 1024,
+        **kwargs: typing.Any,
+    ) -> None:  # noqa: D417  # it's a false positive
+        """Create a signed request body middleware.
+
+        Args:
+            app: An ASGI application instance.
+
+        Keyword Args:
+            state_attribute_name: Name for the request state attribute.
+            reject (optional): True to reject requests whose body signature is missing or
+                wrong with a 403 response (default), False to let the request handler
+                deal with them.
+            spool_size (optional): Size, in bytes, after which the body is spooled to a
+                temporary file instead of being kept in memory (defaults to 1 MiB). Once
+                spooled, the body is written and read in a worker thread.
+            max_body_size (optional): Size, in bytes, after which the body is rejected, as
+                it is read before its signature is checked (defaults to 10 MiB, or None
+                for no limit).
+            **kwargs: Keyword arguments for the base middleware, see
+                `SignedBodyMiddlewareBase`.
+
+        Raises:
+            ValueError: the secret was included in the signer kwargs.
+        """
+        super().__init__(app, **kwargs)
+
+        self.state_attribute_name: str = state_attribute_name
+        self.reject: bool = reject
+        self.spool_size: int = spool_size
+        self.max_body_size: typing.Optional[int] = max_body_size
+
+    def get_body_data(self, signature: str, digest: bytes) -> BodyData:
+        """Get the signed body container for given signature and body digest."""
+        try:
+            self.verify(signature, digest)
+        except SignedDataError as exc:
+            return BodyData(verified=False, exc=exc)
+
+        return BodyData(verified=True)
+
+    # noinspection PyMethodMayBeStatic
+    def get_rejection_response(self, body: BodyData) -> Response:  # pylint: disable=R0201
+        """Get the response for a request whose body signature is missing or wrong."""
+        return PlainTextResponse('Invalid body signature', status_code=403)
+
+    # noinspection PyMethodMayBeStatic
+    def get_too_large_response(  # pylint: disable=R0201
+        self,
+        exc: BodyTooLargeError,
+    ) -> Response:
+        """Get the response for a request whose body is bigger than the maximum body size."""
+        return PlainTextResponse('Body too large', status_code=413)
+
+    def check_body_size(self, size: int) -> None:
+        """Check that a body size is not bigger than the maximum body size.
+
+        Raises:
+            BodyTooLargeError: the body is bigger than the maximum body size.
+        """
+        if self.max_body_size is not None and size > self.max_body_size:
+            raise BodyTooLargeError(f'body is bigger than {self.max_body_size} bytes')
+
+    def check_content_length(self, request: Request) -> None:
+        """Check the body size declared by the request, if any (see `check_body_size`)."""
+        content_length = request.headers.get('content-length', '')
+        if content_length.isascii() and content_length.isdigit():
+            self.check_body_size(int(content_length))
+
+    @staticmethod
+    async def run_sync(
+        func: typing.Callable[..., TResult],
+        *args: typing.Any,
+        offload: bool,
+    ) -> TResult:
+        """Call given function, in a worker thread if it should be offloaded."""
+        if offload:
+            return await run_in_threadpool(func, *args)
+
+        return func(*args)
+
+    async def spool_body(self, receive: 'Receive', spool: Spool) -> typing.Optional[bytes]:
+        """Read the request body into given spool, hashing it incrementally.
+
+        Chunks are written in a worker thread once the body outgrows the spool size, as it
+        is written to disk then.
+
+        Returns:
+            The body digest, or None if the client disconnected before sending it.
+
+        Raises:
+            BodyTooLargeError: the body is bigger than the maximum body size, as soon as
+                it is.
+        """
+        hasher = create_body_hasher()
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] != 'http.request':
+                return None
+
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            self.check_body_size(size)
+            hasher.update(chunk)
+            await self.run_sync(spool.write, chunk, offload=size > self.spool_size)
+            more_body = message.get('more_body', False)
+
+        digest: bytes = hasher.digest()
+
+        return digest
+
+    def replay_body(self, spool: Spool, receive: 'Receive') -> 'Receive':
+        """Create a receive callable that replays the spooled body, then receives as usual.
+
+        Args:
+            spool: The spool holding the body, which is rewound.
+            receive: The original receive callable.
+
+        Returns:
+            A receive callable.
+        """
+        size = spool.tell()
+        spool.seek(0)
+        offload = size > self.spool_size  # It is on disk
+        replayed = False
+
+        async def replay() -> 'Message':
+            nonlocal replayed
+            if replayed:
+                return await receive()  # Let the app learn about disconnections
+
+            chunk = await self.run_sync(spool.read, self.replay_chunk_size, offload=offload)
+            replayed = spool.tell() >= size
+
+            return {'type': 'http.request', 'body': chunk, 'more_body': not replayed}
+
+        return replay
+
+    async def handle_body(
+        self,
+        request: Request,
+        body: BodyData,
+        receive: 'Receive',
+        send: 'Send',
+    ) -> None:
+        """Run the application with the signed body container, or reject the request."""
+        if self.reject and not body.verified:
+            response = self.get_rejection_response(body)
+            await response(request.scope, receive, send)
+            return
+
+        setattr(request.state, self.state_attribute_name, body)
+
+        await self.app(request.scope, receive, send)
+
+    async def __call__(self, scope: 'Scope', receive: 'Receive', send: 'Send') -> None:
+        """Verify the request body signature before running the application.
+
+        This middleware will inject the verification result in the request state.
+        """
+        if scope['type'] != 'http' or not self.should_handle_path(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+
+        signature = request.headers.get(self.header_name)
+        if not signature:  # Don't even read the body
+            error = InvalidSignatureError('signature is missing')
+            await self.handle_body(request, BodyData(verified=False, exc=error), receive, send)
+            return
+
+        await self.verify_body(request, signature, receive, send)
+
+    async def verify_body(
+        self,
+        request: Request,
+        signature: str,
+        receive: 'Receive',
+        send: 'Send',
+    ) -> None:
+        """Spool the request body to verify its signature, then handle it (see `handle_body`).
+
+        Bodies bigger than the maximum body size are rejected without reading them further.
+        """
+        with SpooledTemporaryFile(max_size=self.spool_size) as spool:
+            try:
+                self.check_content_length(request)
+                digest = await self.spool_body(receive, spool)
+            except BodyTooLargeError as exc:
+                response = self.get_too_large_response(exc)
+                await response(request.scope, receive, send)
+                return
+
+            if digest is None:
+                return  # The client is gone, there's no one to respond to
+
+            body = self.get_body_data(signature, digest)
+            await self.handle_body(request, body, self.replay_body(spool, receive), send)
+
+
+class ResponseBodySigner:
+    """Send channel of a response that signs its body as it streams.
+
+    The response start message is held until the first body chunk: if it is the whole
+    body, the signature is added to the start message as a header. Otherwise, the body is
+    streamed, and the signature is sent as an HTTP trailer, if the server supports them.
+    Only the digest of the body is kept, so memory usage doesn't depend on its size.
+    """
+
+    __slots__ = ('middleware', 'send', 'trailers', 'hasher', 'start', 'streaming')
+
+    def __init__(
+        self,
+        middleware: 'SignedResponseMiddleware',
+        send: 'Send',
+        *,
+        trailers: bool,
+    ) -> None:
+        """Create a response body signer.
+
+        Args:
+            middleware: The middleware signing the response.
+            send: The original send callable.
+
+        Keyword Args:
+            trailers: True if the server supports HTTP trailers, False otherwise.
+        """
+        self.middleware: 'SignedResponseMiddleware' = middleware
+        self.send: 'Send' = send
+        self.trailers: bool = trailers
+        self.hasher: typing.Any = create_body_hasher()
+        self.start: typing.Optional['Message'] = None
+        self.streaming: bool = False
+
+    def get_signature_header(self) -> typing.Tuple[bytes, bytes]:
+        """Get the signature header of the body hashed so far."""
+        signature = self.middleware.sign_digest(self.hasher.digest())
+
+        return self.middleware.header_name.encode(), signature.encode()
+
+    async def send_start(self, start: 'Message', *, more_body: bool) -> None:
+        """Send the response start message, with the signature header if there's no more body.
+
+        Otherwise, the signature trailer is announced, if the server supports trailers.
+        """
+        headers = list(start.get('headers', ()))
+        if not more_body:
+            headers.append(self.get_signature_header())
+        elif self.trailers:
+            self.streaming = True
+            start['trailers'] = True
+            headers.append((b'trailer', self.middleware.header_name.encode()))
+
+        start['headers'] = headers
+        await self.send(start)
+
+    async def send_body(self, message: 'Message') -> None:
+        """Send a response body message, hashing its chunk, and signing the body at its end."""
+        self.hasher.update(message.get('body', b''))
+        more_body = message.get('more_body', False)
+
+        start, self.start = self.start, None
+        if start is not None:
+            await self.send_start(start, more_body=more_body)
+
+        await self.send(message)
+
+        if self.streaming and not more_body:
+            await self.send({
+                'type': 'http.response.trailers',
+                'headers': [self.get_signature_header()],
+                'more_trailers': False,
+            })
+
+    async def __call__(self, message: 'Message') -> None:
+        """Send a response message."""
+        if message['type'] == 'http.response.start':
+            self.start = message
+        elif message['type'] == 'http.response.body':
+            await self.send_body(message)
+        else:
+            await self.send(message)
+
+
+class SignedResponseMiddleware(SignedBodyMiddlewareBase):
+    """Middleware that signs response bodies, so that consumers can check their integrity.
+
+    This is a pure ASGI middleware: it hashes the response body chunk by chunk as it
+    streams, keeping only its digest, so that memory usage doesn't depend on the body size.
+
+    When the body is sent at once, as most responses do, the signature is sent in the
+    signature header. When the body is streamed, the signature is sent as an HTTP trailer,
+    if the server supports them (see the `http.response.trailers` ASGI extension), or not
+    sent at all otherwise, as headers can't be sent after the body.
+
+    Consumers can check the signature with `verify`, given the body digest (see
+    `get_body_digest`).
+    """
+
+    async def __call__(self, scope: 'Scope', receive: 'Receive', send: 'Send') -> None:
+        """Sign the response body, sending its signature as a header or a trailer."""
+        if scope['type'] != 'http' or not self.should_handle_path(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        trailers = 'http.response.trailers' in scope.get('extensions', {})
+
+        await self.app(scope, receive, ResponseBodySigner(self, send, trailers=trailers))
@@ -0,0 +1,211 @@
+"""Verified and rejected cookie caches.
+
+Browsers send the same signed cookie on every request until it changes, so the payload of
+cookies whose signature was already verified is cached by their signed value, to skip
+checking the signature and decoding the data again.
+
+Cached payloads are shared between requests, so they must be immutable, such as strings,
+or the serialized data, which is unserialized again for every request, so that a request
+can't modify the data read by another one (see `unsign_payload` in the middlewares).
+
+Likewise, clients replaying a bad cookie make every request check its signature only to
+fail, so cookies that failed are cached by a hash of their signed value, along with their
+error, to fail the same way without checking the signature again.
+"""
+
+import hashlib
+import threading
+import typing
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import time
+
+from blake2signer.errors import SignedDataError
+
+
+@dataclass
+class CacheStats:
+    """Cookie cache statistics.
+
+    Expirations only apply to the verified cookie cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """Verified cookie cache entry."""
+
+    data: typing.Any
+    signed_at: float
+    cached_at: float
+
+
+class VerifiedCookieCache:
+    """In-process cache of verified cookies, that evicts the least recently used ones.
+
+    Entries expire when their signature does, so that the cookie time-to-live is enforced,
+    and optionally after some time in the cache. It is safe to use from several threads.
+    """
+
+    def __init__(self, max_size: int = 1024, *, ttl: typing.Optional[float] = None) -> None:
+        """Create a verified cookie cache.
+
+        Args:
+            max_size (optional): Maximum amount of cookies to keep (defaults to 1024).
+
+        Keyword Args:
+            ttl (optional): Time, in seconds, after which a cookie is evicted from the
+                cache, regardless of its signature age (defaults to None, to keep it until
+                its signature expires).
+        """
+        self.max_size: int = max_size
+        self.ttl: typing.Optional[float] = ttl
+        self.stats: CacheStats = CacheStats()
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get the amount of cookies cached, including expired ones not yet evicted."""
+        return len(self._entries)
+
+    def is_expired(self, entry: CacheEntry, *, max_age: float, now: float) -> bool:
+        """Return True if the entry expired, False otherwise."""
+        if now - entry.signed_at >= max_age:
+            return True
+
+        return self.ttl is not None and now - entry.cached_at >= self.ttl
+
+    def get(self, signed_data: str, *, max_age: float) -> typing.Optional[CacheEntry]:
+        """Get the entry of a verified cookie, if cached and not expired.
+
+        Args:
+            signed_data: The signed cookie value.
+
+        Keyword Args:
+            max_age: Maximum age of the signature, in seconds.
+
+        Returns:
+            The cache entry, or None if there's none.
+        """
+        with self._lock:
+            entry = self._entries.get(signed_data)
+            if entry is not None and self.is_expired(entry, max_age=max_age, now=time()):
+                del self._entries[signed_data]
+                self.stats.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(signed_data)
+            self.stats.hits += 1
+
+        return entry
+
+    def set(self, signed_data: str, data: typing.Any, *, signed_at: float) -> None:
+        """Cache a verified cookie, evicting the least recently used ones if necessary.
+
+        Args:
+            signed_data: The signed cookie value.
+            data: The cookie payload, which must be immutable, as it is shared.
+
+        Keyword Args:
+            signed_at: The signature timestamp.
+        """
+        with self._lock:
+            self._entries[signed_data] = CacheEntry(
+                data=data,
+                signed_at=signed_at,
+                cached_at=time(),
+            )
+            self._entries.move_to_end(signed_data)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every cached cookie."""
+        with self._lock:
+            self._entries.clear()
+
+
+def copy_error(error: SignedDataError) -> SignedDataError:
+    """Create a new error equal to given one, so that it can be raised again safely."""
+    return type(error)(*error.args)
+
+
+class RejectedCookieCache:
+    """In-process cache of rejected cookies, that evicts the least recently used ones.
+
+    Cookies are kept by a hash of their signed value, to bound the memory used by big ones.
+    It is safe to use from several threads.
+    """
+
+    def __init__(self, max_size: int = 256) -> None:
+        """Create a rejected cookie cache.
+
+        Args:
+            max_size (optional): Maximum amount of cookies to keep (defaults to 256).
+        """
+        self.max_size: int = max_size
+        self.stats: CacheStats = CacheStats()
+        self._errors: 'OrderedDict[bytes, SignedDataError]' = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Get the amount of cookies cached."""
+        return len(self._errors)
+
+    @staticmethod
+    def get_key(signed_data: str) -> bytes:
+        """Get the cache key of a signed cookie value: a hash of it."""
+        return hashlib.blake2b(signed_data.encode(), digest_size=16).digest()
+
+    def get(self, signed_data: str) -> typing.Optional[SignedDataError]:
+        """Get the error of a rejected cookie, if cached.
+
+        Args:
+            signed_data: The signed cookie value.
+
+        Returns:
+            A new error equal to the one the cookie failed with, or None if there's none.
+        """
+        key = self.get_key(signed_data)
+        with self._lock:
+            error = self._errors.get(key)
+            if error is None:
+                self.stats.misses += 1
+                return None
+
+            self._errors.move_to_end(key)
+            self.stats.hits += 1
+
+        return copy_error(error)
+
+    def set(self, signed_data: str, error: SignedDataError) -> None:
+        """Cache a rejected cookie, evicting the least recently used ones if necessary.
+
+        Args:
+            signed_data: The signed cookie value.
+            error: The error the cookie failed with.
+        """
+        key = self.get_key(signed_data)
+        with self._lock:
+            self._errors[key] = error
+            self._errors.move_to_end(key)
+
+            while len(self._errors) > self.max_size:
+                self._errors.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Remove every cached cookie."""
+        with self._lock:
+            self._errors.clear()
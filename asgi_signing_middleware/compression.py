@@ -0,0 +1,101 @@
+"""Compression policy for serialized cookies.
+
+Blake2signer's serializer signer already skips compression when it is detrimental, but it
+always runs the compressor. These helpers add a size threshold below which payloads are
+not even compressed, and keep statistics of the compression achieved.
+"""
+
+import typing
+from dataclasses import dataclass
+
+from blake2signer.interfaces import CompressorInterface
+
+
+@dataclass
+class CompressionStats:
+    """Compression statistics.
+
+    Sizes are of the serialized payloads before and after compression, and only account
+    for payloads that ended up compressed.
+    """
+
+    compressed: int = 0
+    skipped_below_threshold: int = 0
+    skipped_detrimental: int = 0
+    size_in: int = 0
+    size_out: int = 0
+
+    @property
+    def ratio(self) -> float:
+        """Get the size reduction achieved, as a percentage (0 if nothing was compressed)."""
+        if not self.size_in:
+            return 0.0
+
+        return 100 * (1 - self.size_out / self.size_in)
+
+
+def create_compressor_class(
+    compressor_class: typing.Type[CompressorInterface],
+    *,
+    threshold: int,
+    ratio: float,
+    stats: CompressionStats,
+) -> typing.Type[CompressorInterface]:
+    """Create a compressor class that applies a size threshold and keeps statistics.
+
+    The created class keeps the name of the given compressor class, because the signer
+    uses it as part of the personalisation, so that it remains compatible with it.
+
+    Args:
+        compressor_class: The actual compressor class.
+
+    Keyword Args:
+        threshold: Minimum payload size, in bytes, to try compressing it.
+        ratio: Minimum size reduction, as a percentage, to consider a payload compressed.
+            It must match the compression ratio of the signer.
+        stats: The object where statistics are kept.
+
+    Returns:
+        A compressor class.
+    """
+
+    class ThresholdCompressor(compressor_class):  # type: ignore
+        """Compressor that skips small payloads, keeping statistics."""
+
+        def compress(self, data: bytes, *, level: int) -> bytes:
+            """Compress given data, if convenient.
+
+            Given data is returned as-is if it is smaller than the threshold, or if
+            compressing it doesn't reduce its size significantly, which makes the signer
+            skip compression.
+
+            Args:
+                data: Data to compress.
+
+            Keyword Args:
+                level: Desired compression level.
+
+            Returns:
+                Raw compressed data, or given data as-is.
+            """
+            size = len(data)
+            if size < threshold:
+                stats.skipped_below_threshold += 1
+                return data
+
+            compressed: bytes = super().compress(data, level=level)
+            compressed_size = len(compressed)
+            if compressed_size >= size * (1 - ratio / 100):
+                stats.skipped_detrimental += 1
+                return data
+
+            stats.compressed += 1
+            stats.size_in += size
+            stats.size_out += compressed_size
+
+            return compressed
+
+    ThresholdCompressor.__name__ = compressor_class.__name__
+    ThresholdCompressor.__qualname__ = compressor_class.__qualname__
+
+    return ThresholdCompressor
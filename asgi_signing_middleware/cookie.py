@@ -5,56 +5,254 @@ securely store data. Additionally, it provides two ready-to-use middlewares to h
 and complex data structures.
 """
 
+import hashlib
 import typing
 from abc import abstractmethod
+from collections import Counter
 from dataclasses import dataclass
+from dataclasses import field
+from datetime import datetime
+from functools import partial
+from multiprocessing.context import BaseContext
+from time import perf_counter
+from time import time
 
 from blake2signer import Blake2SerializerSigner
 from blake2signer import Blake2TimestampSigner
+from blake2signer.compressors import ZlibCompressor
+from blake2signer.errors import ExpiredSignatureError
 from blake2signer.errors import SignedDataError
-from starlette.middleware.base import BaseHTTPMiddleware
+from blake2signer.interfaces import SerializerInterface
+from blake2signer.utils import b64encode
+from blake2signer.utils import force_bytes
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
 
+from .batch import map_in_processes
+from .batch import sign_in_worker
+from .batch import unsign_in_worker
+from .cache import RejectedCookieCache
+from .cache import VerifiedCookieCache
+from .compression import CompressionStats
+from .compression import create_compressor_class
+from .observers import CookieObserver
+from .observers import NO_TIMING
+from .observers import StageTimer
+from .paths import PathMatcher
+from .scanner import CookieScanner
+from .schema import create_schema_serializer
+from .serializers import get_serializer_class
+from .tracing import CookieTracer
+from .tracing import NO_SPAN
+from .tracking import track
 from .types import CookieProperties
+from .types import CookieReadResult
 from .types import JSONTypes
+from .types import PathPattern
+from .types import Secret
+from .types import Secrets
 from .types import TData
+from .types import TResult
 from .types import TSigner
+from .utils import estimate_size
+from .utils import format_cookie_date
+from .utils import quote_cookie_value
 
 if typing.TYPE_CHECKING:
-    from starlette.requests import Request
-    from starlette.responses import Response
-    from starlette.middleware.base import RequestResponseEndpoint
     from starlette.types import ASGIApp
+    from starlette.types import Message
+    from starlette.types import Receive
+    from starlette.types import Scope
+    from starlette.types import Send
+
+# Key of the request scope where the cookie scanner of the request is kept
+SCANNER_SCOPE_KEY = 'asgi_signing_middleware.cookie_scanner'
 
 
 @dataclass
 class CookieData(typing.Generic[TData]):
-    """Cookie data container."""
+    """Cookie data container.
+
+    Setting `data`, or modifying it in place when it is a dict or a list, marks the
+    container as `modified`, which the middleware uses to know if the cookie needs to be
+    written. Set `modified` manually if the data was modified in some way that can't be
+    tracked, such as changing an attribute of a custom object. To do so, a dict or a list
+    is wrapped in a tracking container holding a shallow copy of it, so `data` isn't the
+    given object, unless it already is a tracking container, which is then reused as is.
+
+    The `refresh` flag indicates that the cookie is due to be re-issued, when the sliding
+    expiry is enabled (see `cookie_refresh_ratio` in the middleware).
+    """
     data: typing.Optional[TData]
     exc: typing.Optional[Exception] = None
+    refresh: bool = field(default=False, compare=False)
+    modified: bool = field(default=False, init=False, compare=False)
 
+    def __post_init__(self) -> None:
+        """Track the data for in place modifications."""
+        super().__setattr__('data', track(self.data, self.mark_modified))
+        self.modified = False
 
-class SignedCookieMiddlewareBase(
-        typing.Generic[TSigner, TData],
-        BaseHTTPMiddleware,
-):
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        """Set an attribute, marking the container as modified when setting the data."""
+        super().__setattr__(name, value)
+        if name == 'data':
+            self.modified = True
+
+    def mark_modified(self) -> None:
+        """Mark the container as modified."""
+        self.modified = True
+
+
+class LazyCookieData(CookieData[TData]):
+    """Cookie data container that reads the cookie only when needed.
+
+    The cookie is read, and its signature checked, the first time that either `data` or
+    `exc` are accessed, memoizing the result. If the data is set before being read, the
+    cookie is not read until the middleware needs to compare it with the new data.
+
+    Note that a cookie that is never read is only read after the request handler if it may
+    be due to be refreshed (see `may_refresh` in the middleware).
+    """
+
+    def __init__(  # pylint: disable=W0231
+        self,
+        loader: typing.Callable[[], CookieReadResult[TData]],
+    ) -> None:
+        """Create a lazy cookie data container.
+
+        Args:
+            loader: A callable that reads the cookie, returning its data, exception, and
+                whether it is due to be refreshed.
+        """
+        self._loader = loader
+        self.modified = False
+        self.refresh = False
+        self._loaded: bool = False
+        self._assigned: bool = False
+        self._initial_data: typing.Optional[TData] = None
+        self._data: typing.Optional[TData] = None
+        self._exc: typing.Optional[Exception] = None
+
+    def load(self) -> None:
+        """Read the cookie, if it wasn't already read."""
+        if self._loaded:
+            return
+
+        self._loaded = True
+        initial_data, self._exc, self.refresh = self._loader()
+        self._initial_data = track(initial_data, self.mark_modified)
+        if not self._assigned:
+            self._data = self._initial_data
+
+    @property
+    def data(self) -> typing.Optional[TData]:
+        """Get the data from the cookie, reading it if necessary."""
+        self.load()
+
+        return self._data
+
+    @data.setter
+    def data(self, value: typing.Optional[TData]) -> None:
+        """Set new data to be written to the cookie, without reading it."""
+        self._assigned = True
+        self._data = value
+
+    @property
+    def exc(self) -> typing.Optional[Exception]:
+        """Get the exception from reading the cookie, if any, reading it if necessary."""
+        self.load()
+
+        return self._exc
+
+    @exc.setter
+    def exc(self, value: typing.Optional[Exception]) -> None:
+        """Set the exception."""
+        self.load()
+        self._exc = value
+
+    @property
+    def initial_data(self) -> typing.Optional[TData]:
+        """Get the data originally read from the cookie, reading it if necessary."""
+        self.load()
+
+        return self._initial_data
+
+
+class ResponseStartMessage(Response):
+    """Response bound to an ASGI `http.response.start` message.
+
+    It allows the middleware to use the response methods that deal with headers, such as
+    `set_cookie`, to modify the message headers directly, right before it is sent.
+    """
+
+    def __init__(self, message: 'Message') -> None:  # pylint: disable=W0231
+        """Bind a response to given message, without rendering any content."""
+        self.status_code = message['status']
+        self.raw_headers = list(message.get('headers', ()))
+        message['headers'] = self.raw_headers
+
+
+class SignedCookieMiddlewareBase(typing.Generic[TSigner, TData]):
     """Base to create a middleware that can store signed data into a cookie.
 
+    This is a pure ASGI middleware: it reads the cookie from the request scope, and writes
+    it directly into the response start message, without wrapping the response body.
+
     It uses the `request.state` (see https://www.starlette.io/requests/#other-state) to
     communicate with request handlers (views), so simply define a name used with the state,
     as in `request.state.my_cookie`, where data read from the cookie is stored there, and
     data produced by the request handler (stored in the state) is written to the cookie.
     """
 
+    # Separates the key ID from the signed data, when rotating keys
+    key_id_separator: typing.ClassVar[str] = '~'
+
+    # Changing any of these attributes requires creating a new signer
+    signer_attributes: typing.ClassVar[typing.FrozenSet[str]] = frozenset((
+        'secret',
+        'signer_kwargs',
+        'signer_class',
+        'cookie_name',
+        'cookie_ttl',
+        'cookie_refresh_ratio',
+    ))
+
+    # Cookie properties written as `Set-Cookie` attributes, and the names of these
+    cookie_attributes: typing.ClassVar[typing.Tuple[typing.Tuple[str, str], ...]] = (
+        ('expires', 'Expires'),
+        ('path', 'Path'),
+        ('samesite', 'SameSite'),
+        ('domain', 'Domain'),
+    )
+    # Cookie properties written as `Set-Cookie` flags when true, and the names of these
+    cookie_flags: typing.ClassVar[typing.Tuple[typing.Tuple[str, str], ...]] = (
+        ('httponly', 'HttpOnly'),
+        ('secure', 'Secure'),
+    )
+
     def __init__(
         self,
         app: 'ASGIApp',
         *,
-        secret: typing.Union[str, bytes],
+        secret: Secrets,
         state_attribute_name: str,
         cookie_name: str,
         cookie_ttl: int,
         cookie_properties: typing.Optional[CookieProperties] = None,
         signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        cookie_refresh_ratio: typing.Optional[float] = None,
+        lazy: bool = False,
+        include_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+        exclude_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+        cookie_chunk_size: typing.Optional[int] = None,
+        offload_threshold: typing.Optional[int] = None,
+        cookie_cache_size: typing.Optional[int] = None,
+        cookie_cache_ttl: typing.Optional[float] = None,
+        rejected_cache_size: typing.Optional[int] = None,
+        observer: typing.Optional[CookieObserver] = None,
+        tracer: typing.Optional[CookieTracer] = None,
     ) -> None:  # noqa: D417  # it's a false positive
         """Create a signed cookie middleware.
 
@@ -62,28 +260,105 @@ class SignedCookieMiddlewareBase(
             app: An ASGI application instance.
 
         Keyword Args:
-            secret: The signing secret.
+            secret: The signing secret, or a sequence of secrets ordered from newest to
+                oldest to rotate keys: data is signed with the newest, prefixed by its key
+                ID, and verified with the secret matching the key ID of the cookie, where
+                cookies without a key ID are verified with the oldest. Cookies verified
+                with an old secret are re-issued signed with the newest.
             state_attribute_name: The attribute name used for `request.state`.
             cookie_name: The name of the cookie.
             cookie_ttl: The cookie time-to-live in seconds.
             cookie_properties (optional): Additional cookie properties:
                 path: Cookie path (defaults to '/').
+                expires: Cookie expiry, either in seconds from the time it is written,
+                    or as a date string (it is also limited by the max age).
                 domain: Cookie domain.
                 secure: True to use HTTPS, False otherwise (default).
-                httpsonly: True to prevent the cookie from being used by JS, False
+                httponly: True to prevent the cookie from being used by JS, False
                     otherwise (default).
                 samesite: Define cookie restriction: lax, strict or none.
             signer_kwargs (optional): Additional keyword arguments for the signer.
+            cookie_refresh_ratio (optional): Fraction of the cookie time-to-live after
+                which a valid cookie is re-issued, even if its data didn't change, as in
+                0.5 to refresh it when it's older than half its time-to-live (defaults
+                to None, to only write the cookie when its data changes). This creates a
+                sliding expiry, where active users keep a valid cookie, while paying the
+                cost of signing it only once in a while.
+            lazy (optional): True to read the cookie, and check its signature, only when
+                a request handler accesses its data, or after the handler if it may be due
+                to be refreshed, False to always read it before calling the handler
+                (default).
+            include_paths (optional): Request paths for which the middleware acts, as
+                path prefixes or compiled regular expressions (defaults to all paths).
+            exclude_paths (optional): Request paths for which the middleware doesn't act,
+                as path prefixes or compiled regular expressions (defaults to none). It
+                takes precedence over `include_paths`. Note that the state attribute is
+                not set for requests that the middleware doesn't act upon.
+            cookie_chunk_size (optional): Maximum size of the signed cookie value, in
+                bytes, after which it is split across several cookies, as in
+                `my_cookie.0`, `my_cookie.1`, etc., while the cookie itself holds the
+                amount of chunks (defaults to None, to never split the cookie). Browsers
+                usually drop cookies bigger than 4KB, including the name and properties,
+                so a size of around 3800 is recommended.
+            offload_threshold (optional): Payload size, in bytes, from which the cookie is
+                read and written in a worker thread, so that checking and signing big
+                payloads doesn't block the event loop (defaults to None, to never offload
+                it). Note that a lazy cookie is always read in the request handler thread.
+            cookie_cache_size (optional): Maximum amount of verified cookies to cache by
+                their signed value, so that a cookie sent again skips checking its
+                signature and decoding its data (defaults to None, to disable the cache).
+                Its statistics are kept in `verified_cache.stats`.
+            cookie_cache_ttl (optional): Time, in seconds, after which a cached cookie is
+                evicted from the cache (defaults to None, to keep it until its signature
+                expires).
+            rejected_cache_size (optional): Maximum amount of rejected cookies to cache,
+                so that a cookie sent again fails with the same error without checking its
+                signature (defaults to None, to disable the cache). Its statistics are
+                kept in `rejected_cache.stats`. Regardless of it, failures are counted by
+                error type in `signature_errors`. Expired signatures are neither cached
+                nor counted, as whether a cookie is expired depends on the time.
+            observer (optional): An observer to notify of the time spent handling the
+                cookie, its sizes, and the outcomes of reading and writing it, see the
+                `observers` module (defaults to None, to observe nothing).
+            tracer (optional): A tracer to open spans around reading, unsigning, signing
+                and writing the cookie, see the `tracing` module (defaults to None, to
+                trace nothing).
+
+        Raises:
+            ValueError: the cookie refresh ratio is not greater than 0 and up to 1.
         """
-        super().__init__(app)
+        if cookie_refresh_ratio is not None and not 0 < cookie_refresh_ratio <= 1:
+            raise ValueError('The cookie refresh ratio must be greater than 0 and up to 1')
+
+        self._signer: typing.Optional[TSigner] = None
+        self._signers: typing.Optional[typing.Dict[str, TSigner]] = None
 
-        self.secret: typing.Union[str, bytes] = secret
+        self.app: 'ASGIApp' = app
+        self.secret: Secrets = secret
         self.state_attribute_name: str = state_attribute_name
         self.signer_kwargs: typing.Dict[str, typing.Any] = signer_kwargs or {}
         self.cookie_name: str = cookie_name
         self.cookie_ttl: int = cookie_ttl
+        self.cookie_refresh_ratio: typing.Optional[float] = cookie_refresh_ratio
+        self.lazy: bool = lazy
+        self.include_paths: PathMatcher = PathMatcher(include_paths or ())
+        self.exclude_paths: PathMatcher = PathMatcher(exclude_paths or ())
+        self.cookie_chunk_size: typing.Optional[int] = cookie_chunk_size
+        self.offload_threshold: typing.Optional[int] = offload_threshold
+        self.verified_cache: typing.Optional[VerifiedCookieCache] = (
+            VerifiedCookieCache(cookie_cache_size, ttl=cookie_cache_ttl)
+            if cookie_cache_size else None
+        )
+        self.rejected_cache: typing.Optional[RejectedCookieCache] = (
+            RejectedCookieCache(rejected_cache_size) if rejected_cache_size else None
+        )
+        self.signature_errors: typing.Counter[str] = Counter()
+        self.observer: typing.Optional[CookieObserver] = observer
+        self.tracer: typing.Optional[CookieTracer] = tracer
 
         self._cookie_properties: CookieProperties = cookie_properties or {}
+        self._cookie_suffix: typing.Optional[str] = None
+        self._cookie_expires: typing.Optional[int] = None
 
         self.signer_class: typing.Type[TSigner] = self.get_signer_class()
 
@@ -96,8 +371,44 @@ class SignedCookieMiddlewareBase(
         # pylint: disable=E1101
         return typing.get_args(type(self).__orig_bases__[0])[0]  # type: ignore
 
-    def get_signer(self) -> TSigner:
-        """Get an instance of the signer to use with `sign` and `unsign` methods."""
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        """Set an attribute, resetting the cached signer or cookie suffix if they depend on it."""
+        if name in self.signer_attributes:
+            self.reset_signer()
+        elif name == '_cookie_properties':
+            self.check_cookie_properties(value)
+            super().__setattr__('_cookie_suffix', None)
+
+        super().__setattr__(name, value)
+
+    def __getstate__(self) -> typing.Dict[str, typing.Any]:
+        """Get the state to pickle the middleware, to sign in worker processes.
+
+        The application, signers, caches, observer and tracer are left out, as they may not
+        be picklable: the signers are created again when needed.
+        """
+        state = self.__dict__.copy()
+        state.update({
+            'app': None,
+            '_signer': None,
+            '_signers': None,
+            'verified_cache': None,
+            'rejected_cache': None,
+            'observer': None,
+            'tracer': None,
+        })
+
+        return state
+
+    def get_signer_kwargs(self) -> typing.Dict[str, typing.Any]:
+        """Get the keyword arguments for the signer, including the personalisation.
+
+        Returns:
+            A new dictionary with the signer keyword arguments.
+
+        Raises:
+            ValueError: the secret was included in the signer kwargs.
+        """
         personalisation = type(self).__name__ + self.cookie_name
 
         signer_kwargs = self.signer_kwargs.copy()
@@ -108,19 +419,260 @@ class SignedCookieMiddlewareBase(
         if 'personalisation' in signer_kwargs:
             personalisation += signer_kwargs.pop('personalisation')
 
-        return self.signer_class(
-            self.secret,
-            personalisation=personalisation,
-            **signer_kwargs,
-        )
+        signer_kwargs['personalisation'] = personalisation
+
+        return signer_kwargs
+
+    def get_signer(self, secret: typing.Optional[Secret] = None) -> TSigner:
+        """Create a new instance of the signer.
+
+        Use the `signer` property instead, which caches the instance.
+
+        Args:
+            secret (optional): The secret for the signer (defaults to the signing secret,
+                being the newest one when rotating keys).
+        """
+        if secret is None:
+            secret = self.get_secrets()[0]
+
+        return self.signer_class(secret, **self.get_signer_kwargs())
+
+    def get_secrets(self) -> typing.Tuple[Secret, ...]:
+        """Get the secrets, ordered from newest to oldest."""
+        if isinstance(self.secret, (str, bytes)):
+            return (self.secret,)
+
+        return tuple(self.secret)
+
+    def may_refresh(self) -> bool:
+        """Return True if cookies may be due to be refreshed, False otherwise.
+
+        They are when the sliding expiry is enabled, or when rotating keys, as cookies
+        signed with an old secret are refreshed.
+        """
+        return self.cookie_refresh_ratio is not None or self.rotating_keys
+
+    @property
+    def rotating_keys(self) -> bool:
+        """Return True if rotating keys (several secrets were given), False otherwise."""
+        return not isinstance(self.secret, (str, bytes))
+
+    # noinspection PyMethodMayBeStatic
+    def get_key_id(self, secret: Secret) -> str:  # pylint: disable=R0201
+        """Get the key ID of given secret: a short identifier derived from it."""
+        digest = hashlib.blake2b(force_bytes(secret), digest_size=3, person=b'asgikid')
+
+        return b64encode(digest.digest()).decode()
+
+    def get_signers(self) -> typing.Dict[str, TSigner]:
+        """Create a new signer per secret, by key ID, ordered from newest to oldest.
+
+        Use the `signers` property instead, which caches them.
+
+        Raises:
+            ValueError: two secrets have the same key ID.
+        """
+        if not self.rotating_keys:
+            return {'': self.get_signer()}
+
+        secrets = self.get_secrets()
+        signers = {self.get_key_id(secret): self.get_signer(secret) for secret in secrets}
+        if len(signers) != len(secrets):
+            raise ValueError('Secrets must be unique, and their key IDs must not collide')
+
+        return signers
+
+    @property
+    def signers(self) -> typing.Dict[str, TSigner]:
+        """Get the signers by key ID, ordered from newest to oldest, which are cached.
+
+        The key ID of the signer is an empty string if not rotating keys.
+        """
+        signers = self._signers
+        if signers is None:
+            signers = self._signers = self.get_signers()
+
+        return signers
+
+    @property
+    def signer(self) -> TSigner:
+        """Get the signer to use with `sign` and `unsign` methods.
+
+        It is the signer of the newest secret, when rotating keys.
+
+        The signer is created once and cached. Setting any of the attributes it depends on
+        resets it, but mutating the `signer_kwargs` dict in place doesn't: either set a new
+        dict, or call `reset_signer` afterwards.
+        """
+        signer = self._signer
+        if signer is None:
+            signer = self._signer = next(iter(self.signers.values()))
+
+        return signer
+
+    def reset_signer(self) -> None:
+        """Reset the cached signers, and the cookies they verified or rejected, if any."""
+        super().__setattr__('_signer', None)
+        super().__setattr__('_signers', None)
+
+        for cache_name in ('verified_cache', 'rejected_cache'):
+            cache = self.__dict__.get(cache_name)
+            if cache is not None:
+                cache.clear()
+
+    def add_key_id(self, signed_data: str) -> str:
+        """Prefix signed data with the key ID of the newest secret, if rotating keys."""
+        key_id = next(iter(self.signers))
+        if not key_id:
+            return signed_data
+
+        return key_id + self.key_id_separator + signed_data
+
+    def get_signer_for(self, signed_data: str) -> typing.Tuple[TSigner, str]:
+        """Get the signer for given signed data, by its key ID, if any.
+
+        Key IDs are only looked for when rotating keys, and only known ones are taken as
+        such, so that data containing the key ID separator is handled as it is. Signed data
+        without a known key ID is handled by the signer of the oldest secret.
+
+        Returns:
+            A tuple of the signer, and the signed data without the key ID.
+        """
+        if self.rotating_keys:
+            key_id, separator, data = signed_data.partition(self.key_id_separator)
+            signer = self.signers.get(key_id) if separator else None
+            if signer is not None:
+                return signer, data
+
+        return next(reversed(self.signers.values())), signed_data
+
+    def is_signed_with_old_key(self, request: 'Request') -> bool:
+        """Return True if the cookie was signed with an old secret, False otherwise."""
+        if not self.rotating_keys:
+            return False
+
+        key_id = next(iter(self.signers))
+
+        return not self.get_cookie_value(request).startswith(key_id + self.key_id_separator)
 
     @abstractmethod
     def sign(self, data: TData) -> str:
-        """Sign data with the signer."""
+        """Sign data with the signer, prefixing the key ID (see `add_key_id`)."""
 
     @abstractmethod
     def unsign(self, data: str) -> TData:
-        """Unsign data with the signer."""
+        """Unsign data with the signer of its key (see `get_signer_for`).
+
+        Use `signature_max_age` as max age.
+        """
+
+    def unsign_payload(self, data: str) -> typing.Any:
+        """Unsign data with the signer of its key, to be kept in the verified cookie cache.
+
+        The payload is shared between requests, so it must be immutable: by default, it is
+        the data itself, as returned by `unsign`. Override this method, along with
+        `load_payload`, if the data is mutable, to keep it serialized instead.
+        """
+        return self.unsign(data)
+
+    # noinspection PyMethodMayBeStatic
+    def load_payload(self, payload: typing.Any) -> TData:  # pylint: disable=R0201
+        """Load the data from a payload of the verified cookie cache (see `unsign_payload`)."""
+        data: TData = payload
+
+        return data
+
+    def data_from_expired(self, exc: ExpiredSignatureError) -> TData:
+        """Recover the data from an expired signature, to refresh the cookie.
+
+        Implement this method to support the sliding expiry (see `cookie_refresh_ratio`).
+
+        Raises:
+            NotImplementedError: the middleware doesn't support the sliding expiry.
+        """
+        raise NotImplementedError('This middleware does not support the sliding expiry')
+
+    def sign_many(
+        self,
+        items: typing.Iterable[TData],
+        *,
+        processes: typing.Optional[int] = None,
+        chunk_size: int = 1024,
+        mp_context: typing.Optional[BaseContext] = None,
+    ) -> typing.Iterator[str]:
+        """Sign many payloads, such as to pre-generate cookies, with the same signer.
+
+        Payloads are signed lazily, as the result is consumed, so that any amount of them
+        can be streamed.
+
+        Args:
+            items: Payloads to sign.
+
+        Keyword Args:
+            processes (optional): Amount of worker processes to spread the work over
+                (defaults to None, to sign in the current process). The middleware is
+                pickled to be sent to the workers, which requires its signer kwargs and
+                serializer to be picklable.
+            chunk_size (optional): Amount of payloads sent to a worker at once.
+            mp_context (optional): Multiprocessing context to start the workers with, as
+                in `multiprocessing.get_context('spawn')` (defaults to None, to use the
+                default start method of the platform).
+
+        Returns:
+            An iterator of signed payloads, in the order of the given ones.
+        """
+        if processes is None:
+            return (self.sign(data) for data in items)
+
+        return map_in_processes(
+            sign_in_worker,
+            items,
+            middleware=self,
+            processes=processes,
+            chunk_size=chunk_size,
+            mp_context=mp_context,
+        )
+
+    def unsign_many(
+        self,
+        items: typing.Iterable[str],
+        *,
+        processes: typing.Optional[int] = None,
+        chunk_size: int = 1024,
+        mp_context: typing.Optional[BaseContext] = None,
+    ) -> typing.Iterator[TData]:
+        """Unsign many signed payloads with the same signers, see `sign_many`.
+
+        Returns:
+            An iterator of payloads, in the order of the given signed ones.
+
+        Raises:
+            SignedDataError: a signed payload was wrong, expired, or otherwise incorrect,
+                raised when it is reached.
+        """
+        if processes is None:
+            return (self.unsign(signed_data) for signed_data in items)
+
+        return map_in_processes(
+            unsign_in_worker,
+            items,
+            middleware=self,
+            processes=processes,
+            chunk_size=chunk_size,
+            mp_context=mp_context,
+        )
+
+    @property
+    def signature_max_age(self) -> int:
+        """Get the max age of a signature to consider it fresh, in seconds.
+
+        It is the age after which the cookie is refreshed if the sliding expiry is enabled,
+        or the cookie time-to-live otherwise.
+        """
+        if self.cookie_refresh_ratio is None:
+            return self.cookie_ttl
+
+        return int(self.cookie_ttl * self.cookie_refresh_ratio)
 
     @property
     def cookie_properties(self) -> CookieProperties:
@@ -131,7 +683,7 @@ class SignedCookieMiddlewareBase(
         Returns:
             Cookie properties as a dict.
         """
-        properties = {
+        properties: CookieProperties = {
             'path': '/',
             'domain': None,
             'secure': False,
@@ -142,6 +694,72 @@ class SignedCookieMiddlewareBase(
 
         return properties
 
+    def check_cookie_properties(self, properties: CookieProperties) -> None:
+        """Check that the cookie properties are known ones.
+
+        Raises:
+            ValueError: a cookie property is unknown.
+        """
+        known = {name for name, _ in self.cookie_attributes + self.cookie_flags}
+        unknown = sorted(set(properties) - known)
+        if unknown:
+            raise ValueError(f'Unknown cookie properties: {", ".join(unknown)}')
+
+    def get_cookie_expires(self) -> typing.Optional[int]:
+        """Get the cookie expiry in seconds from the time it is written, if any.
+
+        Returns:
+            The expires property if it is in seconds, or None otherwise, as a date string
+            is the same on every write (see `get_cookie_suffix`).
+        """
+        expires = self.cookie_properties.get('expires')
+
+        return expires if isinstance(expires, int) and not isinstance(expires, bool) else None
+
+    def get_cookie_suffix(self) -> str:
+        """Get the attributes of the `Set-Cookie` header, which are the same on every write.
+
+        An expiry in seconds is left out, as its date is formatted on every write (see
+        `get_cookie_expires`).
+
+        Returns:
+            The attributes from the cookie properties, as in `; Path=/; SameSite=lax`.
+
+        Raises:
+            ValueError: the samesite property is not one of lax, strict or none.
+        """
+        properties = self.cookie_properties
+        samesite = properties.get('samesite')
+        if samesite is not None and str(samesite).lower() not in {'lax', 'strict', 'none'}:
+            raise ValueError(f'The samesite property must be lax, strict or none: {samesite}')
+
+        if self.get_cookie_expires() is not None:
+            properties = {**properties, 'expires': None}  # Formatted on every write instead
+
+        attributes = [
+            f'; {attribute}={properties[name]}'
+            for name, attribute in self.cookie_attributes
+            if properties.get(name) is not None
+        ]
+        flags = [f'; {flag}' for name, flag in self.cookie_flags if properties.get(name)]
+
+        return ''.join(attributes + flags)
+
+    @property
+    def cookie_suffix(self) -> str:
+        """Get the attributes of the `Set-Cookie` header (see `get_cookie_suffix`).
+
+        They are created once and cached, along with the expiry in seconds if any (see
+        `get_cookie_expires`), so that writing a cookie only adds its name, value, max age
+        and expiry date.
+        """
+        suffix = self._cookie_suffix
+        if suffix is None:
+            self._cookie_expires = self.get_cookie_expires()
+            suffix = self._cookie_suffix = self.get_cookie_suffix()
+
+        return suffix
+
     # noinspection PyMethodMayBeStatic
     def should_write_cookie(  # pylint: disable=R0201
         self,
@@ -151,14 +769,15 @@ class SignedCookieMiddlewareBase(
     ) -> bool:
         """Return True if data should be written to the cookie, False otherwise.
 
-        This method exists to avoid writing cookies on every request needlessly. Overwrite
-        this method with a proper data comparison, or just return True to always write the
-        cookie.
+        This method exists to avoid writing cookies on every request needlessly, and it is
+        only called if the cookie data was set or modified in place. Overwrite this method
+        with a proper data comparison, or just return True to always write the cookie.
 
         Returns:
             True if new data should be written to the cookie, False otherwise.
         """
-        return prev_data != new_data
+        # Same object means that it was modified in place, otherwise it was replaced
+        return new_data is prev_data or prev_data != new_data
 
     def read_cookie(self, request: 'Request') -> typing.Optional[TData]:
         """Get data from the cookie, checking its signature.
@@ -172,72 +791,532 @@ class SignedCookieMiddlewareBase(
         Raises:
             SignedDataError: the signature was wrong, missing, or otherwise incorrect.
         """
-        signed_data = request.cookies.get(self.cookie_name, '')
-        if not signed_data:
-            return None
+        with self.trace_span('read_cookie') as span:
+            with self.time_stage('parse'):
+                signed_data = self.get_cookie_value(request)
 
-        data: TData = self.unsign(signed_data)  # may raise SignedDataError
+            if not signed_data:
+                span.set_attribute('cookie.outcome', 'missing')
+                return None
+
+            span.set_attribute('cookie.size', len(signed_data))
+            self.report_size('in', len(signed_data))
+            try:
+                with self.time_stage('unsign'), self.trace_span('unsign'):
+                    data: TData = self.unsign_checked(signed_data)  # may raise SignedDataError
+            except ExpiredSignatureError as exc:
+                span.set_attribute('cookie.outcome', self.get_expired_outcome(exc))
+                raise
+            except SignedDataError:
+                span.set_attribute('cookie.outcome', 'tampered')
+                raise
+
+            span.set_attribute('cookie.outcome', 'valid')
 
         return data
 
-    def write_cookie(self, data: TData, response: 'Response') -> None:
-        """Write the cookie in the response after signing it."""
-        signed_data = self.sign(data)
+    def unsign_checked(self, signed_data: str) -> TData:
+        """Unsign data, failing early for cookies recently rejected, and counting failures.
+
+        Only failures that can't change over time are cached and counted: an expired
+        signature isn't, as it may be refreshed (see `cookie_refresh_ratio`).
 
-        response.set_cookie(
-            key=self.cookie_name,
-            value=signed_data,
-            max_age=self.cookie_ttl,
-            **self.cookie_properties,  # type: ignore
+        Raises:
+            SignedDataError: the signature was wrong, missing, or otherwise incorrect.
+        """
+        rejected_cache = self.rejected_cache
+        try:
+            error = rejected_cache.get(signed_data) if rejected_cache is not None else None
+            if error is not None:
+                raise error
+
+            return self.unsign_cached(signed_data)
+        except ExpiredSignatureError:
+            raise
+        except SignedDataError as exc:
+            self.reject_cookie(signed_data, exc, cached=exc is error)
+            raise
+
+    def reject_cookie(self, signed_data: str, exc: SignedDataError, *, cached: bool) -> None:
+        """Count the failure of a cookie, caching it as rejected if it wasn't already.
+
+        Args:
+            signed_data: The signed cookie value.
+            exc: The error the cookie failed with.
+
+        Keyword Args:
+            cached: True if the error came from the rejected cookie cache, False otherwise.
+        """
+        self.signature_errors[type(exc).__name__] += 1
+        if self.rejected_cache is not None and not cached:
+            self.rejected_cache.set(signed_data, exc)
+
+    def unsign_cached(self, signed_data: str) -> TData:
+        """Unsign data, or get it from the verified cookie cache if enabled.
+
+        Raises:
+            SignedDataError: the signature was wrong, missing, or otherwise incorrect.
+        """
+        verified_cache = self.verified_cache
+        if verified_cache is None:
+            return self.unsign(signed_data)
+
+        entry = verified_cache.get(signed_data, max_age=self.signature_max_age)
+        if entry is not None:
+            return self.load_payload(entry.data)
+
+        payload = self.unsign_payload(signed_data)
+        data = self.load_payload(payload)  # Before caching it, as it may fail
+        verified_cache.set(
+            signed_data,
+            payload,
+            signed_at=self.get_signed_timestamp(signed_data),
+        )
+
+        return data
+
+    def get_signed_timestamp(self, signed_data: str) -> int:
+        """Get the timestamp of signed data whose signature was already verified.
+
+        Blake2signer doesn't expose the timestamp of valid signatures, so it is decoded
+        from the signed data, as the signer does.
+        """
+        signer, data = self.get_signer_for(signed_data)
+        parts = signer._decompose(force_bytes(data))  # pylint: disable=W0212
+        timestamp: int = signer._decompose_timestamp(parts.data).timestamp  # pylint: disable=W0212
+
+        return timestamp
+
+    # noinspection PyMethodMayBeStatic
+    def get_cookie_scanner(self, request: 'Request') -> CookieScanner:  # pylint: disable=R0201
+        """Get the scanner of the raw cookie header of the request.
+
+        Cookies are scanned from the raw header, looking only for the ones the middleware
+        needs, instead of using `request.cookies`, which parses every cookie. The scanner is
+        kept in the request scope, so that the header is scanned once per request, even by
+        several middlewares.
+        """
+        scope = request.scope
+        scanner: typing.Optional[CookieScanner] = scope.get(SCANNER_SCOPE_KEY)
+        if scanner is None:
+            scanner = scope[SCANNER_SCOPE_KEY] = CookieScanner(scope['headers'])
+
+        return scanner
+
+    # noinspection PyMethodMayBeStatic
+    def get_chunks_from_manifest(self, manifest: str) -> int:  # pylint: disable=R0201
+        """Get the amount of chunks from the cookie value, or 0 if it is not chunked."""
+        if manifest.isascii() and manifest.isdigit():
+            return int(manifest)
+
+        return 0
+
+    def get_cookie_chunks(self, request: 'Request') -> int:
+        """Get the amount of chunks of the cookie, or 0 if it is not chunked.
+
+        The manifest is capped by the amount of cookies in the request, as it is not trusted.
+        """
+        scanner = self.get_cookie_scanner(request)
+        chunks = self.get_chunks_from_manifest(scanner.get(self.cookie_name))
+
+        return min(chunks, scanner.count)
+
+    def get_cookie_value(self, request: 'Request') -> str:
+        """Get the signed value from the cookie, reassembling it if it is chunked.
+
+        Returns:
+            The signed value, or an empty string if there's no cookie.
+        """
+        scanner = self.get_cookie_scanner(request)
+        value = scanner.get(self.cookie_name)
+        chunks = self.get_chunks_from_manifest(value)
+        if not chunks:
+            return value
+
+        # A chunk can't be in more than one cookie, so don't trust the manifest blindly
+        return ''.join(
+            scanner.get(f'{self.cookie_name}.{index}')
+            for index in range(min(chunks, scanner.count))
         )
 
+    def set_cookie(self, response: 'Response', key: str, value: str, *, max_age: int) -> None:
+        """Set a cookie in the response, with the cookie properties (see `cookie_suffix`)."""
+        suffix = self.cookie_suffix
+        if self._cookie_expires is not None:
+            suffix = f'; Expires={format_cookie_date(self._cookie_expires)}{suffix}'
+
+        header = f'{key}={quote_cookie_value(value)}; Max-Age={max_age}{suffix}'
+        response.raw_headers.append((b'set-cookie', header.encode('latin-1')))
+
+    def write_cookie(self, data: TData, response: 'Response', *, prev_chunks: int = 0) -> None:
+        """Write the cookie in the response after signing it.
+
+        If the signed value is bigger than the chunk size, it is split across several
+        cookies. Chunks of a previous cookie that are no longer used are expired.
+
+        Args:
+            data: Data to sign and write.
+            response: Response to write the cookie into.
+
+        Keyword Args:
+            prev_chunks (optional): Amount of chunks of the cookie in the request.
+        """
+        with self.trace_span('write_cookie') as span:
+            with self.time_stage('sign'), self.trace_span('sign'):
+                signed_data = self.sign(data)
+
+            span.set_attribute('cookie.size', len(signed_data))
+            span.set_attribute('cookie.outcome', 'written')
+            self.report_size('out', len(signed_data))
+            self.report_outcome('written')
+            with self.time_stage('set_cookie'):
+                self.set_signed_cookie(signed_data, response, prev_chunks=prev_chunks)
+
+    def set_signed_cookie(
+        self,
+        signed_data: str,
+        response: 'Response',
+        *,
+        prev_chunks: int = 0,
+    ) -> None:
+        """Set the cookie in the response, splitting it into chunks if necessary.
+
+        Args:
+            signed_data: Signed data to write.
+            response: Response to write the cookie into.
+
+        Keyword Args:
+            prev_chunks (optional): Amount of chunks of the cookie in the request.
+        """
+        chunk_size = self.cookie_chunk_size
+        chunks: typing.List[str] = []
+        if chunk_size and len(signed_data) > chunk_size:
+            chunks = [
+                signed_data[index:index + chunk_size]
+                for index in range(0, len(signed_data), chunk_size)
+            ]
+            signed_data = str(len(chunks))  # The cookie becomes the manifest
+
+        self.set_cookie(response, self.cookie_name, signed_data, max_age=self.cookie_ttl)
+
+        for index, chunk in enumerate(chunks):
+            self.set_cookie(
+                response,
+                f'{self.cookie_name}.{index}',
+                chunk,
+                max_age=self.cookie_ttl,
+            )
+
+        for index in range(len(chunks), prev_chunks):
+            self.set_cookie(response, f'{self.cookie_name}.{index}', '', max_age=0)
+
     def write_cookie_if_necessary(
         self,
         *,
         new_data: typing.Optional[TData],
         prev_data: typing.Optional[TData],
         response: 'Response',
+        prev_chunks: int = 0,
+        refresh: bool = False,
     ) -> None:
-        """Write the cookie in the response after signing it, if there's data to write."""
-        if new_data is not None:
-            if self.should_write_cookie(new_data=new_data, prev_data=prev_data):
-                self.write_cookie(new_data, response)
+        """Write the cookie in the response after signing it, if there's data to write.
+
+        The data is written regardless of `should_write_cookie` if `refresh` is True.
+        """
+        if new_data is None:
+            return
 
-    async def dispatch(
+        with self.time_stage('should_write'):
+            write = refresh or self.should_write_cookie(new_data=new_data, prev_data=prev_data)
+
+        if write:
+            self.write_cookie(new_data, response, prev_chunks=prev_chunks)
+        else:
+            self.report_outcome('skipped')
+
+    def should_handle_path(self, path: str) -> bool:
+        """Return True if the middleware should act for given request path, False otherwise."""
+        if self.exclude_paths.match(path):
+            return False
+
+        return not self.include_paths or self.include_paths.match(path)
+
+    def load_cookie(
         self,
         request: 'Request',
-        call_next: 'RequestResponseEndpoint',
-    ) -> 'Response':
-        """Read data from, and write data to, a signed cookie.
+    ) -> CookieReadResult[TData]:
+        """Read data from the cookie, capturing any signature error.
 
-        This middleware with inject the data in the request state, and will write to the
-        cookie after the request handler has acted.
+        If the sliding expiry is enabled, data from a cookie older than its refresh age,
+        but younger than its time-to-live, is recovered and marked to be refreshed. Data
+        from a cookie signed with an old secret is marked to be refreshed as well.
 
         Returns:
-            A response.
+            A tuple of the data from the cookie, the signature exception if any, and
+            whether the cookie is due to be refreshed.
         """
-        data: typing.Optional[TData] = None
-        exception: typing.Optional[Exception] = None
         try:
             data = self.read_cookie(request)
+        except ExpiredSignatureError as exc:
+            outcome = self.get_expired_outcome(exc)
+            self.report_outcome(outcome)
+            if outcome == 'expired':
+                return None, exc, False
+
+            return self.data_from_expired(exc), None, True
         except SignedDataError as exc:  # some tampering, maybe we changed the secret...
-            exception = exc
+            self.report_outcome('tampered')
+            return None, exc, False
 
-        state_attribute_name = self.state_attribute_name
-        state = request.state
-        setattr(state, state_attribute_name, CookieData(data=data, exc=exception))
+        self.report_outcome('missing' if data is None else 'valid')
 
-        response = await call_next(request)
+        return data, None, data is not None and self.is_signed_with_old_key(request)
+
+    # noinspection PyMethodMayBeStatic
+    def estimate_payload_size(  # pylint: disable=R0201
+        self,
+        request: 'Request',
+        data: typing.Optional[TData] = None,
+    ) -> int:
+        """Estimate the size of the payload to check or sign, in bytes.
+
+        Without data, it is the size of the cookie in the request, to check. Otherwise, it
+        is the size of given data, to sign, which is only estimated up to the offload
+        threshold (see `estimate_size`).
+        """
+        if data is None:
+            return len(self.get_cookie_value(request))
+
+        return estimate_size(data, limit=self.offload_threshold or 0)
+
+    def should_offload(self, request: 'Request', data: typing.Optional[TData] = None) -> bool:
+        """Return True if the payload should be handled in a worker thread, False otherwise."""
+        if self.offload_threshold is None:
+            return False
+
+        return self.estimate_payload_size(request, data) >= self.offload_threshold
+
+    # noinspection PyMethodMayBeStatic
+    async def run_sync(  # pylint: disable=R0201
+        self,
+        func: typing.Callable[..., TResult],
+        *args: typing.Any,
+        offload: bool,
+        **kwargs: typing.Any,
+    ) -> TResult:
+        """Call given function, in a worker thread if it should be offloaded.
 
-        new_cookie: typing.Optional[CookieData] = getattr(state, state_attribute_name, None)
-        if new_cookie:
-            self.write_cookie_if_necessary(
-                new_data=new_cookie.data,
-                prev_data=data,
+        Args:
+            func: Function to call.
+            *args: Positional arguments for the function.
+
+        Keyword Args:
+            offload: True to call the function in a worker thread, False to call it
+                directly, blocking the event loop.
+            **kwargs: Keyword arguments for the function.
+
+        Returns:
+            The function result.
+        """
+        if offload:
+            return await run_in_threadpool(func, *args, **kwargs)
+
+        return func(*args, **kwargs)
+
+    def time_stage(self, stage: str) -> typing.ContextManager[None]:
+        """Get a context manager that times given stage for the observer, if any."""
+        observer = self.observer
+        if observer is None:
+            return NO_TIMING
+
+        return StageTimer(observer, self.cookie_name, stage)
+
+    def report_timing(self, stage: str, seconds: float) -> None:
+        """Notify the observer, if any, of the time spent in given stage."""
+        if self.observer is not None:
+            self.observer.on_timing(self.cookie_name, stage, seconds)
+
+    def report_size(self, direction: str, size: int) -> None:
+        """Notify the observer, if any, of the size of a signed cookie value."""
+        if self.observer is not None:
+            self.observer.on_size(self.cookie_name, direction, size)
+
+    def report_outcome(self, outcome: str) -> None:
+        """Notify the observer, if any, of the outcome of reading or writing the cookie."""
+        if self.observer is not None:
+            self.observer.on_outcome(self.cookie_name, outcome)
+
+    def get_span_attributes(self) -> typing.Dict[str, typing.Any]:
+        """Get the attributes of every span of the cookie."""
+        return {
+            'cookie.name': self.cookie_name,
+        }
+
+    def trace_span(self, name: str) -> typing.ContextManager[typing.Any]:
+        """Get a context manager that opens given span with the tracer, if any.
+
+        It yields the span, whose attributes can be set, or a no-op one if there's no tracer.
+        """
+        tracer = self.tracer
+        if tracer is None:
+            return NO_SPAN
+
+        return tracer.start_span(name, self.get_span_attributes())
+
+    def is_expired(self, timestamp: datetime) -> bool:
+        """Return True if a cookie signed at given time expired, False otherwise."""
+        return time() - timestamp.timestamp() > self.cookie_ttl
+
+    def get_expired_outcome(self, exc: ExpiredSignatureError) -> str:
+        """Get the outcome of reading a cookie whose signature is older than its max age.
+
+        Returns:
+            `refreshed` if the sliding expiry recovers the cookie to refresh it, or
+            `expired` otherwise.
+        """
+        if self.cookie_refresh_ratio is None or self.is_expired(exc.timestamp):
+            return 'expired'
+
+        return 'refreshed'
+
+    async def get_cookie_data(self, request: 'Request') -> CookieData[TData]:
+        """Get the cookie data container to inject in the request state.
+
+        Returns:
+            A lazy cookie data container if the middleware is lazy, or a cookie data
+            container with the data already read from the cookie otherwise.
+        """
+        if self.lazy:
+            return LazyCookieData(partial(self.load_cookie, request))
+
+        data, exception, refresh = await self.run_sync(
+            self.load_cookie,
+            request,
+            offload=self.should_offload(request),
+        )
+
+        return CookieData(data=data, exc=exception, refresh=refresh)
+
+    async def write_cookie_data(
+        self,
+        cookie: CookieData[TData],
+        *,
+        initial_cookie: CookieData[TData],
+        prev_data: typing.Optional[TData],
+        request: 'Request',
+        response: 'Response',
+    ) -> None:
+        """Write the cookie data set in the request state, if necessary.
+
+        Args:
+            cookie: Cookie data container from the request state.
+
+        Keyword Args:
+            initial_cookie: Cookie data container injected in the request state.
+            prev_data: Data originally read from the cookie (ignored if the initial
+                container is lazy).
+            request: The request.
+            response: Response to write the cookie into.
+        """
+        if isinstance(initial_cookie, LazyCookieData) and self.may_refresh():
+            initial_cookie.load()  # Read it if it wasn't, to know if it's due to be refreshed
+
+        refresh = initial_cookie.refresh
+        if cookie is initial_cookie and not (cookie.modified or refresh):
+            self.report_outcome('skipped')
+            return  # The data was neither set nor modified, so there's nothing to do
+
+        if isinstance(initial_cookie, LazyCookieData):
+            prev_data = initial_cookie.initial_data
+
+        new_data = cookie.data
+        await self.run_sync(
+            self.write_cookie_if_necessary,
+            new_data=new_data,
+            prev_data=prev_data,
+            response=response,
+            refresh=refresh,
+            prev_chunks=self.get_cookie_chunks(request) if self.cookie_chunk_size else 0,
+            offload=new_data is not None and self.should_offload(request, new_data),
+        )
+
+    async def inject_cookie_data(
+        self,
+        request: 'Request',
+    ) -> typing.Tuple[CookieData[TData], typing.Optional[TData]]:
+        """Inject the cookie data container in the request state.
+
+        Returns:
+            A tuple of the cookie data container, and the data originally read from the
+            cookie (None if the middleware is lazy).
+        """
+        cookie = await self.get_cookie_data(request)
+        prev_data = None if isinstance(cookie, LazyCookieData) else cookie.data
+
+        setattr(request.state, self.state_attribute_name, cookie)
+
+        return cookie, prev_data
+
+    async def write_state_cookie_data(
+        self,
+        request: 'Request',
+        response: 'Response',
+        *,
+        initial_cookie: CookieData[TData],
+        prev_data: typing.Optional[TData],
+    ) -> None:
+        """Write the cookie data container from the request state, if necessary.
+
+        Args:
+            request: The request.
+            response: Response to write the cookie into.
+
+        Keyword Args:
+            initial_cookie: Cookie data container injected in the request state.
+            prev_data: Data originally read from the cookie.
+        """
+        cookie: typing.Optional[CookieData[TData]] = getattr(
+            request.state,
+            self.state_attribute_name,
+            None,
+        )
+        if cookie:
+            await self.write_cookie_data(
+                cookie,
+                initial_cookie=initial_cookie,
+                prev_data=prev_data,
+                request=request,
                 response=response,
             )
 
-        return response
+    async def __call__(self, scope: 'Scope', receive: 'Receive', send: 'Send') -> None:
+        """Read data from, and write data to, a signed cookie.
+
+        This middleware will inject the data in the request state, and will write to the
+        cookie when the response starts, after the request handler has acted.
+        """
+        if scope['type'] != 'http' or not self.should_handle_path(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+
+        cookie, prev_data = await self.inject_cookie_data(request)
+        handler_start = perf_counter()
+
+        async def send_wrapper(message: 'Message') -> None:
+            if message['type'] == 'http.response.start':
+                self.report_timing('handler', perf_counter() - handler_start)
+                await self.write_state_cookie_data(
+                    request,
+                    ResponseStartMessage(message),
+                    initial_cookie=cookie,
+                    prev_data=prev_data,
+                )
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 
 class SimpleSignedCookieMiddleware(
@@ -255,11 +1334,17 @@ class SimpleSignedCookieMiddleware(
 
     def sign(self, data: str) -> str:
         """Sign data with the signer."""
-        return self.get_signer().sign(data).decode()
+        return self.add_key_id(self.signer.sign(data).decode())
 
     def unsign(self, data: str) -> str:
-        """Unsign data with the signer."""
-        return self.get_signer().unsign(data, max_age=self.cookie_ttl).decode()
+        """Unsign data with the signer of its key."""
+        signer, data = self.get_signer_for(data)
+
+        return signer.unsign(data, max_age=self.signature_max_age).decode()
+
+    def data_from_expired(self, exc: ExpiredSignatureError) -> str:
+        """Recover the data from an expired signature, to refresh the cookie."""
+        return exc.data.decode()
 
 
 class SerializedSignedCookieMiddleware(
@@ -268,8 +1353,8 @@ class SerializedSignedCookieMiddleware(
     """Middleware that can serialize data and sign it into a cookie.
 
     Use this middleware if you want to store certain complex data structures into a cookie.
-    Note that this middleware is slower than the SimpleSignedCookieMiddleware, but ideal
-    for any kind of data structure.
+    Note that this middleware is slower than the SimpleSignedCookieMiddleware (about 1.5
+    times as slow for strings, see the benchmarks), but ideal for any kind of data structure.
 
     It uses the `request.state` (see https://www.starlette.io/requests/#other-state) to
     communicate with request handlers (views), so simply define a name used with the state,
@@ -283,18 +1368,148 @@ class SerializedSignedCookieMiddleware(
     cookie_name: define the name of the cookie.
     cookie_ttl: define the time-to-live for the cookie, in seconds.
     state_attribute_name: define the name used for the state attribute.
+
+    Payloads are compressed when convenient, which can be tuned through the compression
+    options, and the compressor can be chosen through the signer kwargs, as in
+    `signer_kwargs={'compressor': GzipCompressor}` (defaults to zlib). Statistics of the
+    compression achieved are kept in `compression_stats`.
+
+    Data is serialized to JSON by default, but a faster or more compact serializer can be
+    chosen by name, as in `serializer='msgpack'`, see the `serializers` module. Cookies with
+    a fixed shape can be declared as a schema instead, as in `schema=Preferences` where it
+    is a NamedTuple or a dataclass, to pack its instances into a compact binary layout, see
+    the `schema` module. Note that, as instances are not tracked for changes, a new one must
+    be set in the state to write the cookie, as in `cookie.data = prefs._replace(...)`.
     """
 
-    def get_signer(self) -> Blake2SerializerSigner:
-        """Get an instance of the signer to use with `sign` and `unsign` methods."""
-        self.signer_kwargs.setdefault('max_age', self.cookie_ttl)
+    signer_attributes = SignedCookieMiddlewareBase.signer_attributes | frozenset((
+        'compression_threshold',
+        'compression_ratio',
+        'serializer',
+    ))
+
+    def __init__(
+        self,
+        app: 'ASGIApp',
+        *,
+        compress: bool = True,
+        compression_level: typing.Optional[int] = None,
+        compression_threshold: int = 0,
+        compression_ratio: float = 5.0,
+        serializer: typing.Union[str, typing.Type[SerializerInterface]] = 'json',
+        schema: typing.Optional[type] = None,
+        **kwargs: typing.Any,
+    ) -> None:  # noqa: D417  # it's a false positive
+        """Create a serialized signed cookie middleware.
+
+        Args:
+            app: An ASGI application instance.
+
+        Keyword Args:
+            compress (optional): True to compress payloads when convenient (default),
+                False to never compress them.
+            compression_level (optional): Compression level, from 1 (fastest and least
+                compressed) to 9 (slowest and most compressed), or None for the default
+                level of the compressor.
+            compression_threshold (optional): Minimum size, in bytes, of the serialized
+                payload to try compressing it (defaults to 0, to always try).
+            compression_ratio (optional): Minimum size reduction, as a percentage, for
+                a payload to be stored compressed, otherwise compression is skipped as
+                detrimental (defaults to 5%). A `compression_ratio` set in the signer
+                kwargs takes precedence over this one.
+            serializer (optional): Serializer name, one of `json` (default), `orjson`,
+                `msgpack` or `cbor`, or a serializer class. If the library required by the
+                serializer is not installed, it falls back to JSON. A `serializer` set in
+                the signer kwargs takes precedence over this one.
+            schema (optional): A NamedTuple or a dataclass describing the cookie data, to
+                pack it into a compact binary layout. It takes precedence over the
+                `serializer`.
+            **kwargs: Keyword arguments for the base middleware, see
+                `SignedCookieMiddlewareBase`.
 
-        return super().get_signer()
+        Raises:
+            ValueError: the serializer name is unknown, or the schema is not supported.
+        """
+        self.serializer: typing.Type[SerializerInterface] = (
+            get_serializer_class(serializer) if schema is None
+            else create_schema_serializer(schema)
+        )
+        self.compress: bool = compress
+        self.compression_level: typing.Optional[int] = compression_level
+        self.compression_threshold: int = compression_threshold
+        self.compression_ratio: float = compression_ratio
+        self.compression_stats: CompressionStats = CompressionStats()
+
+        super().__init__(app, **kwargs)
+
+    def get_signer_kwargs(self) -> typing.Dict[str, typing.Any]:
+        """Get the keyword arguments for the signer, including max age and compression."""
+        signer_kwargs = super().get_signer_kwargs()
+        signer_kwargs.setdefault('max_age', self.signature_max_age)
+        signer_kwargs.setdefault('serializer', self.serializer)
+
+        compression_ratio = signer_kwargs.setdefault('compression_ratio', self.compression_ratio)
+        signer_kwargs['compressor'] = create_compressor_class(
+            signer_kwargs.get('compressor', ZlibCompressor),
+            threshold=self.compression_threshold,
+            ratio=compression_ratio,
+            stats=self.compression_stats,
+        )
+
+        return signer_kwargs
+
+    def get_span_attributes(self) -> typing.Dict[str, typing.Any]:
+        """Get the attributes of every span of the cookie, including its serializer."""
+        serializer = self.signer_kwargs.get('serializer', self.serializer)
+        compressor = self.signer_kwargs.get('compressor', ZlibCompressor)
+
+        return {
+            **super().get_span_attributes(),
+            'cookie.serializer': serializer.__name__,
+            'cookie.compression': compressor.__name__ if self.compress else 'none',
+        }
 
     def sign(self, data: JSONTypes) -> str:
-        """Sign data with the signer."""
-        return self.get_signer().dumps(data)
+        """Sign data with the signer, compressing it if convenient."""
+        signed_data = self.signer.dumps(
+            data,
+            compress=self.compress,
+            compression_level=self.compression_level,
+        )
+
+        return self.add_key_id(signed_data)
 
     def unsign(self, data: str) -> JSONTypes:
-        """Unsign data with the signer."""
-        return self.get_signer().loads(data)
+        """Unsign data with the signer of its key."""
+        signer, data = self.get_signer_for(data)
+
+        return signer.loads(data)
+
+    def unsign_payload(self, data: str) -> bytes:
+        """Unsign data with the signer of its key, keeping it serialized to be cached.
+
+        The cache keeps the serialized data, which is immutable, so that every request
+        gets its own objects by unserializing it, which is faster than unsigning it again.
+        """
+        signer, data = self.get_signer_for(data)
+        # pylint: disable=W0212
+        parts = signer._decompose(force_bytes(data))
+        dumped_data, is_compressed = signer._remove_compression_flag_if_compressed(
+            signer._proper_unsign(parts),
+        )
+        decoded = signer._decode(dumped_data)
+        serialized: bytes = signer._decompress(decoded) if is_compressed else decoded
+
+        return serialized
+
+    def load_payload(self, payload: bytes) -> JSONTypes:
+        """Unserialize the data of a payload of the verified cookie cache."""
+        data: JSONTypes = self.signer._unserialize(payload)  # pylint: disable=W0212
+
+        return data
+
+    def data_from_expired(self, exc: ExpiredSignatureError) -> JSONTypes:
+        """Recover the data from an expired signature, to refresh the cookie."""
+        data: JSONTypes = self.signer.data_from_exc(exc)
+
+        return data
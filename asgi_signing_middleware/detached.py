@@ -0,0 +1,99 @@
+"""Detached signatures.
+
+A detached signature is sent apart from the data it signs, such as in a header or in a
+URL, while the verifier already knows the data, such as a body digest or a request path,
+so that the data is not sent twice.
+"""
+
+import typing
+
+from blake2signer import Blake2Signature
+from blake2signer import Blake2TimestampSigner
+from blake2signer.errors import ExpiredSignatureError
+from blake2signer.errors import InvalidSignatureError
+from blake2signer.errors import SignedDataError
+from blake2signer.utils import force_bytes
+
+from .types import Secrets
+
+
+class DetachedSigner:
+    """Signer of timestamped detached signatures.
+
+    Signatures are made with the newest secret, and verified with any of them, to rotate
+    keys. The signers are created once, to be reused for every signature.
+    """
+
+    def __init__(
+        self,
+        secret: Secrets,
+        *,
+        personalisation: str,
+        max_age: int,
+        signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    ) -> None:
+        """Create a detached signer.
+
+        Args:
+            secret: The signing secret, or a sequence of secrets ordered from newest to
+                oldest to rotate keys.
+
+        Keyword Args:
+            personalisation: The signer personalisation, extended by the one in the signer
+                kwargs, if any.
+            max_age: Maximum age of a signature, in seconds.
+            signer_kwargs (optional): Additional keyword arguments for the signer.
+
+        Raises:
+            ValueError: the secret was included in the signer kwargs.
+        """
+        signer_kwargs = dict(signer_kwargs or {})
+        if 'secret' in signer_kwargs:
+            raise ValueError('The `secret` should not be included in the signer kwargs')
+
+        signer_kwargs['personalisation'] = (
+            personalisation + signer_kwargs.get('personalisation', '')
+        )
+        secrets = (secret,) if isinstance(secret, (str, bytes)) else tuple(secret)
+
+        self.max_age: int = max_age
+        self.signers: typing.Tuple[Blake2TimestampSigner, ...] = tuple(
+            Blake2TimestampSigner(secret, **signer_kwargs) for secret in secrets
+        )
+
+    def sign(self, data: bytes) -> str:
+        """Sign data with the newest secret.
+
+        Args:
+            data: Data to sign.
+
+        Returns:
+            The detached signature.
+        """
+        signature: bytes = self.signers[0].sign_parts(data).signature
+
+        return signature.decode()
+
+    def verify(self, signature: str, data: bytes) -> None:
+        """Verify the detached signature of given data with any of the secrets.
+
+        Args:
+            signature: The detached signature.
+            data: The signed data.
+
+        Raises:
+            SignedDataError: the signature was wrong, expired, or otherwise incorrect.
+        """
+        parts = Blake2Signature(signature=force_bytes(signature), data=data)
+        error: SignedDataError = InvalidSignatureError('signature is not valid')
+        for signer in self.signers:
+            try:
+                signer.unsign_parts(parts, max_age=self.max_age)
+            except ExpiredSignatureError:
+                raise  # The signature is right, but old
+            except SignedDataError as exc:
+                error = exc
+            else:
+                return
+
+        raise error
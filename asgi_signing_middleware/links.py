@@ -0,0 +1,228 @@
+"""Signed link FastAPI/Starlette middleware.
+
+Presigned links, such as download links, carry a token that signs the link path, either
+in a query parameter, as in `/download/report.pdf?token=...`, or in a path segment, as in
+`/download/.../report.pdf`. Tokens are timestamped, so that links expire after the link
+time-to-live.
+
+Only the path is signed, so that the token is a detached signature, and other query
+parameters can be added to a link freely.
+"""
+
+import typing
+from dataclasses import dataclass
+from urllib.parse import quote
+from urllib.parse import unquote
+
+from blake2signer.errors import InvalidSignatureError
+from blake2signer.errors import SignedDataError
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.responses import Response
+
+from .detached import DetachedSigner
+from .paths import PathMatcher
+from .scanner import get_query_param
+from .types import PathPattern
+from .types import Secrets
+
+if typing.TYPE_CHECKING:
+    from starlette.types import ASGIApp
+    from starlette.types import Receive
+    from starlette.types import Scope
+    from starlette.types import Send
+
+
+@dataclass
+class LinkData:
+    """Signed link data container.
+
+    The `data` is the signed path, without the token, if the token is valid. Otherwise, it
+    is None, and `exc` holds the reason, which the request handler only gets to see if the
+    middleware doesn't reject bad tokens (see `reject` in the middleware).
+    """
+    data: typing.Optional[str]
+    exc: typing.Optional[Exception] = None
+
+
+class SignedLinkMiddleware:
+    """Middleware that verifies the tokens of presigned links.
+
+    This is a pure ASGI middleware: it takes the token from the raw query string, scanning
+    it for the token parameter only, or from the path, when a path pattern is given. Bad
+    tokens are rejected with a 403 response without running the application.
+
+    Links are minted with `mint_url`, or in bulk with `mint_urls`, which reuse the same
+    signer for every link.
+
+    It uses the `request.state` (see https://www.starlette.io/requests/#other-state) to
+    communicate the verification result to request handlers (views), as a `LinkData`.
+    """
+
+    # Placeholder of the token in the paths of links to mint, when using a path pattern
+    token_placeholder: typing.ClassVar[str] = '{token}'
+
+    def __init__(
+        self,
+        app: 'ASGIApp',
+        *,
+        secret: Secrets,
+        state_attribute_name: str,
+        link_ttl: int,
+        query_param: str = 'token',
+        path_pattern: typing.Optional[typing.Pattern[str]] = None,
+        reject: bool = True,
+        signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        include_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+        exclude_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+    ) -> None:
+        """Create a signed link middleware.
+
+        Args:
+            app: An ASGI application instance.
+
+        Keyword Args:
+            secret: The signing secret, or a sequence of secrets ordered from newest to
+                oldest to rotate keys: links are signed with the newest one, and verified
+                with any of them.
+            state_attribute_name: Name for the request state attribute.
+            link_ttl: Link time-to-live in seconds, after which its token expires.
+            query_param (optional): Name of the query parameter carrying the token.
+            path_pattern (optional): A compiled regular expression, matched from the
+                beginning of the path, whose `token` group is the token, as in
+                `re.compile(r'/download/(?P<token>[^/]+)/')`. If given, tokens are taken
+                from the path instead of the query string, and the signed path is the
+                path without the token.
+            reject (optional): True to reject requests whose token is missing or wrong
+                with a 403 response (default), False to let the request handler deal with
+                them.
+            signer_kwargs (optional): Additional keyword arguments for the signer.
+            include_paths (optional): Request paths for which the middleware acts, as
+                path prefixes or compiled regular expressions (defaults to all paths).
+            exclude_paths (optional): Request paths for which the middleware doesn't act,
+                as path prefixes or compiled regular expressions (defaults to none). It
+                takes precedence over `include_paths`.
+
+        Raises:
+            ValueError: the secret was included in the signer kwargs, or the path pattern
+                has no `token` group.
+        """
+        if path_pattern is not None and 'token' not in path_pattern.groupindex:
+            raise ValueError('The path pattern must have a `token` group')
+
+        self.app: 'ASGIApp' = app
+        self.state_attribute_name: str = state_attribute_name
+        self.query_param: str = query_param
+        self.path_pattern: typing.Optional[typing.Pattern[str]] = path_pattern
+        self.reject: bool = reject
+        self.include_paths: PathMatcher = PathMatcher(include_paths or ())
+        self.exclude_paths: PathMatcher = PathMatcher(exclude_paths or ())
+        # The personalisation follows the one of the signed cookie middlewares
+        self.signer: DetachedSigner = DetachedSigner(
+            secret,
+            personalisation=type(self).__name__ + query_param,
+            max_age=link_ttl,
+            signer_kwargs=signer_kwargs,
+        )
+
+    def sign(self, path: str) -> str:
+        """Sign a decoded path, as found in the request scope, returning its token."""
+        return self.signer.sign(path.encode())
+
+    def mint_url(self, path: str, *, base_url: str = '') -> str:
+        """Mint a presigned link to given path.
+
+        Args:
+            path: The link path, percent-encoded as it goes in the link, which may include
+                a query string. When using a path pattern, it must include the token
+                placeholder where the token goes, as in `/download/{token}/report.pdf`.
+
+        Keyword Args:
+            base_url (optional): Scheme and host to prepend to the path, if any.
+
+        Returns:
+            The presigned link.
+
+        Raises:
+            ValueError: the path lacks the token placeholder, when using a path pattern.
+        """
+        if self.path_pattern is not None:
+            if self.token_placeholder not in path:
+                raise ValueError(f'The path must include the token placeholder: {path!r}')
+
+            token = self.sign(unquote(path.partition('?')[0].replace(self.token_placeholder, '')))
+
+            return base_url + path.replace(self.token_placeholder, quote(token, safe=''))
+
+        token = self.sign(unquote(path.partition('?')[0]))
+        separator = '&' if '?' in path else '?'
+
+        return f'{base_url}{path}{separator}{self.query_param}={quote(token, safe="")}'
+
+    def mint_urls(self, paths: typing.Iterable[str], *, base_url: str = '') -> typing.List[str]:
+        """Mint presigned links to given paths, see `mint_url`."""
+        return [self.mint_url(path, base_url=base_url) for path in paths]
+
+    def get_token(self, scope: 'Scope') -> typing.Tuple[str, str]:
+        """Get the token of a request, and the path it signs.
+
+        Returns:
+            The token, or an empty string if there's none, and the signed path.
+        """
+        path: str = scope['path']
+        if self.path_pattern is None:
+            token = get_query_param(scope.get('query_string', b''), self.query_param)
+
+            return token or '', path
+
+        match = self.path_pattern.match(path)
+        if match is None:
+            return '', path
+
+        start, end = match.span('token')
+
+        return match['token'], path[:start] + path[end:]
+
+    def get_link_data(self, scope: 'Scope') -> LinkData:
+        """Get the signed link data container of a request, verifying its token."""
+        token, path = self.get_token(scope)
+        if not token:
+            return LinkData(data=None, exc=InvalidSignatureError('token is missing'))
+
+        try:
+            self.signer.verify(token, path.encode())
+        except SignedDataError as exc:
+            return LinkData(data=None, exc=exc)
+
+        return LinkData(data=path)
+
+    def should_handle_path(self, path: str) -> bool:
+        """Return True if the middleware should act for given request path, False otherwise."""
+        if self.exclude_paths.match(path):
+            return False
+
+        return not self.include_paths or self.include_paths.match(path)
+
+    # noinspection PyMethodMayBeStatic
+    def get_rejection_response(self, link: LinkData) -> Response:  # pylint: disable=R0201
+        """Get the response for a request whose token is missing or wrong."""
+        return PlainTextResponse('Invalid link', status_code=403)
+
+    async def __call__(self, scope: 'Scope', receive: 'Receive', send: 'Send') -> None:
+        """Verify the link token before running the application.
+
+        This middleware will inject the verification result in the request state.
+        """
+        if scope['type'] != 'http' or not self.should_handle_path(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        link = self.get_link_data(scope)
+        if self.reject and link.data is None:
+            response = self.get_rejection_response(link)
+            await response(scope, receive, send)
+            return
+
+        setattr(Request(scope).state, self.state_attribute_name, link)
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,157 @@
+"""Multiple signed cookies FastAPI/Starlette middleware.
+
+This middleware manages several signed cookies in a single pass, instead of stacking one
+middleware per cookie, each one wrapping the application again.
+"""
+
+import typing
+from dataclasses import dataclass
+from dataclasses import field
+
+from starlette.requests import Request
+
+from .cookie import ResponseStartMessage
+from .cookie import SerializedSignedCookieMiddleware
+from .cookie import SignedCookieMiddlewareBase
+from .paths import PathMatcher
+from .types import PathPattern
+from .types import Secrets
+
+if typing.TYPE_CHECKING:
+    from starlette.types import ASGIApp
+    from starlette.types import Message
+    from starlette.types import Receive
+    from starlette.types import Scope
+    from starlette.types import Send
+
+
+@dataclass
+class CookieSpec:
+    """Specification of a signed cookie, for the `MultiSignedCookieMiddleware`.
+
+    The middleware class defines how data is signed, such as the
+    `SimpleSignedCookieMiddleware` for strings, or the `SerializedSignedCookieMiddleware`
+    (default) for any JSON type, whose serializer can be set in the signer kwargs. Any
+    other keyword argument for the middleware class can be set in `options`.
+    """
+    cookie_name: str
+    state_attribute_name: str
+    cookie_ttl: int
+    middleware_class: typing.Type[SignedCookieMiddlewareBase[typing.Any, typing.Any]] = (
+        SerializedSignedCookieMiddleware
+    )
+    signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None
+    secret: typing.Optional[Secrets] = None
+    options: typing.Dict[str, typing.Any] = field(default_factory=dict)
+
+    def create_middleware(
+        self,
+        app: 'ASGIApp',
+        *,
+        secret: Secrets,
+    ) -> SignedCookieMiddlewareBase[typing.Any, typing.Any]:
+        """Create the middleware instance that handles this cookie.
+
+        Args:
+            app: An ASGI application instance.
+
+        Keyword Args:
+            secret: The signing secret, used if this spec doesn't define one.
+
+        Returns:
+            A middleware instance.
+        """
+        return self.middleware_class(
+            app,
+            secret=secret if self.secret is None else self.secret,
+            state_attribute_name=self.state_attribute_name,
+            cookie_name=self.cookie_name,
+            cookie_ttl=self.cookie_ttl,
+            signer_kwargs=self.signer_kwargs,
+            **self.options,
+        )
+
+
+class MultiSignedCookieMiddleware:
+    """Middleware that manages several signed cookies at once.
+
+    Each cookie is handled by its own middleware instance, created from its spec, but
+    the application is wrapped once: the request is created once, every cookie is read
+    from the raw cookie header and injected in the request state in a single pass, and
+    every cookie is written in a single pass over the response start message.
+    """
+
+    def __init__(
+        self,
+        app: 'ASGIApp',
+        *,
+        secret: Secrets,
+        cookies: typing.Sequence[CookieSpec],
+        include_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+        exclude_paths: typing.Optional[typing.Iterable[PathPattern]] = None,
+    ) -> None:
+        """Create a multiple signed cookies middleware.
+
+        Args:
+            app: An ASGI application instance.
+
+        Keyword Args:
+            secret: The signing secret, or a sequence of secrets to rotate keys, for
+                cookies whose spec doesn't define one.
+            cookies: The cookie specs.
+            include_paths (optional): Request paths for which the middleware acts, as
+                path prefixes or compiled regular expressions (defaults to all paths).
+            exclude_paths (optional): Request paths for which the middleware doesn't act,
+                as path prefixes or compiled regular expressions (defaults to none). It
+                takes precedence over `include_paths`.
+
+        Raises:
+            ValueError: the cookie names or state attribute names are not unique.
+        """
+        names = {spec.cookie_name for spec in cookies}
+        attributes = {spec.state_attribute_name for spec in cookies}
+        if len(names) != len(cookies) or len(attributes) != len(cookies):
+            raise ValueError('Cookie names and state attribute names must be unique')
+
+        self.app: 'ASGIApp' = app
+        self.include_paths: PathMatcher = PathMatcher(include_paths or ())
+        self.exclude_paths: PathMatcher = PathMatcher(exclude_paths or ())
+        self.handlers: typing.Tuple[SignedCookieMiddlewareBase[typing.Any, typing.Any], ...] = (
+            tuple(spec.create_middleware(app, secret=secret) for spec in cookies)
+        )
+
+    def should_handle_path(self, path: str) -> bool:
+        """Return True if the middleware should act for given request path, False otherwise."""
+        if self.exclude_paths.match(path):
+            return False
+
+        return not self.include_paths or self.include_paths.match(path)
+
+    async def __call__(self, scope: 'Scope', receive: 'Receive', send: 'Send') -> None:
+        """Read data from, and write data to, every signed cookie.
+
+        This middleware will inject the data of every cookie in the request state, and will
+        write to the cookies when the response starts, after the request handler has acted.
+        """
+        if scope['type'] != 'http' or not self.should_handle_path(scope['path']):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+
+        injected = [await handler.inject_cookie_data(request) for handler in self.handlers]
+
+        async def send_wrapper(message: 'Message') -> None:
+            if message['type'] == 'http.response.start':
+                response = ResponseStartMessage(message)
+                for handler, (cookie, prev_data) in zip(self.handlers, injected):
+                    await handler.write_state_cookie_data(
+                        request,
+                        response,
+                        initial_cookie=cookie,
+                        prev_data=prev_data,
+                    )
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,159 @@
+"""Middleware observers.
+
+Observers are notified by the signed cookie middlewares of the time spent in every stage
+of handling a cookie, of the cookie sizes, and of the outcome of reading and writing it,
+so that their cost can be monitored.
+
+Stages are:
+
+parse: finding the cookie in the cookie header.
+unsign: checking the signature, and decoding the data.
+handler: running the application until the response starts.
+should_write: deciding whether the cookie has to be written.
+sign: encoding the data, and signing it.
+set_cookie: writing the cookie headers.
+
+Sizes are of the signed cookie values, either `in` (read) or `out` (written), in bytes.
+
+Outcomes are either `missing`, `valid`, `refreshed` (recovered by the sliding expiry),
+`tampered` or `expired` when reading a cookie, and `written` or `skipped` when writing it.
+
+Note that observers may be notified from worker threads (see `offload_threshold`).
+"""
+
+import typing
+from contextlib import nullcontext
+from time import perf_counter
+
+from .utils import import_optional
+
+# Context manager used instead of a stage timer when there's no observer
+NO_TIMING: typing.ContextManager[None] = nullcontext()
+
+
+class CookieObserver:
+    """Observer of the signed cookie middlewares, that ignores every event.
+
+    Inherit from this class and override the methods of the events to observe.
+    """
+
+    def on_timing(self, cookie_name: str, stage: str, seconds: float) -> None:
+        """Observe the time spent in a stage of handling a cookie.
+
+        Args:
+            cookie_name: The cookie name.
+            stage: The stage name.
+            seconds: The time spent, in seconds.
+        """
+
+    def on_size(self, cookie_name: str, direction: str, size: int) -> None:
+        """Observe the size of a signed cookie value.
+
+        Args:
+            cookie_name: The cookie name.
+            direction: Either `in` for a cookie read, or `out` for a cookie written.
+            size: The size, in bytes.
+        """
+
+    def on_outcome(self, cookie_name: str, outcome: str) -> None:
+        """Observe the outcome of reading or writing a cookie.
+
+        Args:
+            cookie_name: The cookie name.
+            outcome: The outcome name.
+        """
+
+
+class StageTimer:
+    """Context manager that notifies an observer of the time spent in a stage."""
+
+    __slots__ = ('observer', 'cookie_name', 'stage', 'start')
+
+    def __init__(self, observer: CookieObserver, cookie_name: str, stage: str) -> None:
+        """Create a stage timer.
+
+        Args:
+            observer: The observer to notify.
+            cookie_name: The cookie name.
+            stage: The stage name.
+        """
+        self.observer: CookieObserver = observer
+        self.cookie_name: str = cookie_name
+        self.stage: str = stage
+        self.start: float = 0.0
+
+    def __enter__(self) -> None:
+        """Start timing the stage."""
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info: typing.Any) -> None:
+        """Stop timing the stage, notifying the observer."""
+        self.observer.on_timing(self.cookie_name, self.stage, perf_counter() - self.start)
+
+
+class PrometheusObserver(CookieObserver):
+    """Observer that keeps Prometheus metrics, which requires prometheus_client.
+
+    The metrics are histograms of the time spent per stage and of the cookie sizes, and a
+    counter of the outcomes, all of them labeled by cookie name.
+    """
+
+    # Histogram buckets of the cookie sizes, in bytes
+    size_buckets: typing.ClassVar[typing.Tuple[float, ...]] = (
+        64, 128, 256, 512, 1024, 2048, 3072, 4096, 8192, float('inf'),
+    )
+
+    def __init__(
+        self,
+        *,
+        namespace: str = 'asgi_signing_middleware',
+        registry: typing.Any = None,
+    ) -> None:
+        """Create a Prometheus observer.
+
+        Keyword Args:
+            namespace (optional): The metrics namespace.
+            registry (optional): The metrics registry (defaults to the global one).
+
+        Raises:
+            ImportError: prometheus_client is not installed.
+        """
+        prometheus_client = import_optional('prometheus_client')
+        if prometheus_client is None:
+            raise ImportError('The prometheus_client package is required by this observer')
+
+        options = {
+            'namespace': namespace,
+            'registry': prometheus_client.REGISTRY if registry is None else registry,
+        }
+        self.stage_seconds: typing.Any = prometheus_client.Histogram(
+            'cookie_stage_seconds',
+            'Time spent in a stage of handling a signed cookie.',
+            ('cookie', 'stage'),
+            **options,
+        )
+        self.size_bytes: typing.Any = prometheus_client.Histogram(
+            'cookie_size_bytes',
+            'Size of signed cookie values.',
+            ('cookie', 'direction'),
+            buckets=self.size_buckets,
+            **options,
+        )
+        self.outcomes: typing.Any = prometheus_client.Counter(
+            'cookie_outcomes',
+            'Outcomes of reading and writing signed cookies.',
+            ('cookie', 'outcome'),
+            **options,
+        )
+
+    def on_timing(self, cookie_name: str, stage: str, seconds: float) -> None:
+        """Observe the time spent in a stage of handling a cookie."""
+        self.stage_seconds.labels(cookie_name, stage).observe(seconds)
+
+    def on_size(self, cookie_name: str, direction: str, size: int) -> None:
+        """Observe the size of a signed cookie value."""
+        self.size_bytes.labels(cookie_name, direction).observe(size)
+
+    def on_outcome(self, cookie_name: str, outcome: str) -> None:
+        """Observe the outcome of reading or writing a cookie."""
+        self.outcomes.labels(cookie_name, outcome).inc()
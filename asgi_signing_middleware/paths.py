@@ -0,0 +1,49 @@
+"""Request path matching.
+
+Utilities to decide whether a middleware should act on a request, given its path, before
+building any request object.
+"""
+
+import typing
+
+from .types import PathPattern
+
+
+class PathMatcher:
+    """Match request paths against prefixes and regular expressions.
+
+    String patterns are matched as path prefixes, by whole segments, so that `/app` matches
+    `/app` and `/app/some/view` but not `/application`, whereas compiled regular expressions
+    are matched from the beginning of the path (as in `re.match`).
+    """
+
+    __slots__ = ('paths', 'prefixes', 'regexes')
+
+    def __init__(self, patterns: typing.Iterable[PathPattern] = ()) -> None:
+        """Create a path matcher.
+
+        Args:
+            patterns (optional): Path prefixes, and/or compiled regular expressions.
+        """
+        patterns = tuple(patterns)
+
+        self.paths: typing.FrozenSet[str] = frozenset(
+            pattern for pattern in patterns if isinstance(pattern, str)
+        )
+        self.prefixes: typing.Tuple[str, ...] = tuple(
+            path.rstrip('/') + '/' for path in self.paths
+        )
+        self.regexes: typing.Tuple[typing.Pattern[str], ...] = tuple(
+            pattern for pattern in patterns if not isinstance(pattern, str)
+        )
+
+    def __bool__(self) -> bool:
+        """Return True if there's any pattern to match, False otherwise."""
+        return bool(self.prefixes or self.regexes)
+
+    def match(self, path: str) -> bool:
+        """Return True if given path matches any pattern, False otherwise."""
+        if path in self.paths or path.startswith(self.prefixes):
+            return True
+
+        return any(regex.match(path) for regex in self.regexes)
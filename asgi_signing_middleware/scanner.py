@@ -0,0 +1,145 @@
+"""Cookie header and query string scanner.
+
+Scans the raw `cookie` header for given cookie names only, instead of parsing every cookie
+in it as `request.cookies` does, which is costly when requests carry many cookies.
+Likewise, scans the raw query string for a given parameter only.
+
+Values are parsed as Starlette does, where the last occurrence of a cookie or parameter
+wins, except that there must be no whitespace between the cookie name and the equal sign.
+"""
+
+import typing
+from http.cookies import _unquote
+from urllib.parse import quote_plus
+from urllib.parse import unquote_plus
+
+# ASCII codes of the cookie separator and whitespace
+SEPARATOR = ord(';')
+WHITESPACE = frozenset(b' \t')
+
+# ASCII code of the query parameter separator
+QUERY_SEPARATOR = ord('&')
+
+
+def get_cookie_header(headers: typing.Iterable[typing.Tuple[bytes, bytes]]) -> bytes:
+    """Get the raw cookie header from the ASGI scope headers, joining it if repeated."""
+    return b'; '.join([value for key, value in headers if key == b'cookie'])
+
+
+def count_cookies(header: bytes) -> int:
+    """Count the cookies in the raw cookie header, which may include empty ones."""
+    if not header:
+        return 0
+
+    return header.count(b';') + 1
+
+
+def is_at_cookie_start(header: bytes, index: int) -> bool:
+    """Return True if given index of the raw cookie header is where a cookie starts."""
+    index -= 1
+    while index >= 0 and header[index] in WHITESPACE:
+        index -= 1
+
+    return index < 0 or header[index] == SEPARATOR
+
+
+def find_cookie(header: bytes, name: bytes) -> typing.Optional[bytes]:
+    """Find the raw value of a cookie in the raw cookie header.
+
+    Args:
+        header: The raw cookie header.
+        name: The cookie name.
+
+    Returns:
+        The raw value of the last cookie with given name, or None if there's none.
+    """
+    key = name + b'='
+    index = header.rfind(key)
+    while index != -1 and not is_at_cookie_start(header, index):
+        index = header.rfind(key, 0, index)
+
+    if index == -1:
+        return None
+
+    start = index + len(key)
+    end = header.find(b';', start)
+
+    return header[start:None if end == -1 else end].strip()
+
+
+def decode_cookie_value(value: bytes) -> str:
+    """Decode a raw cookie value, unquoting it if necessary."""
+    decoded = value.decode('latin-1')
+    if decoded.startswith('"'):
+        unquoted: str = _unquote(decoded)
+
+        return unquoted
+
+    return decoded
+
+
+def get_cookie(header: bytes, name: str) -> str:
+    """Get the value of a cookie from the raw cookie header.
+
+    Args:
+        header: The raw cookie header.
+        name: The cookie name.
+
+    Returns:
+        The value of the last cookie with given name, or an empty string if there's none.
+    """
+    value = find_cookie(header, name.encode('latin-1'))
+    if value is None:
+        return ''
+
+    return decode_cookie_value(value)
+
+
+class CookieScanner:
+    """Scanner of the raw cookie header of a request, which keeps the cookies it finds.
+
+    The header is joined and its cookies are counted once, and every cookie is scanned
+    once, however many times it is needed while handling the request.
+    """
+
+    def __init__(self, headers: typing.Iterable[typing.Tuple[bytes, bytes]]) -> None:
+        """Create a cookie scanner.
+
+        Args:
+            headers: The ASGI scope headers.
+        """
+        self.header: bytes = get_cookie_header(headers)
+        self.count: int = count_cookies(self.header)
+        self.cookies: typing.Dict[str, str] = {}
+
+    def get(self, name: str) -> str:
+        """Get the value of a cookie, or an empty string if there's none (see `get_cookie`)."""
+        value = self.cookies.get(name)
+        if value is None:
+            value = self.cookies[name] = get_cookie(self.header, name)
+
+        return value
+
+
+def get_query_param(query_string: bytes, name: str) -> typing.Optional[str]:
+    """Get the value of a parameter from the raw query string, without parsing the rest.
+
+    Args:
+        query_string: The raw query string, from the ASGI scope.
+        name: The parameter name.
+
+    Returns:
+        The value of the last parameter with given name, or None if there's none.
+    """
+    key = quote_plus(name).encode() + b'='
+    index = query_string.rfind(key)
+    while index > 0 and query_string[index - 1] != QUERY_SEPARATOR:
+        index = query_string.rfind(key, 0, index)
+
+    if index == -1:
+        return None
+
+    start = index + len(key)
+    end = query_string.find(b'&', start)
+
+    return unquote_plus(query_string[start:None if end == -1 else end].decode('latin-1'))
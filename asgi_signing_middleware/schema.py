@@ -0,0 +1,357 @@
+"""Schema codec for serialized cookies.
+
+Cookies with a fixed shape can be declared as a NamedTuple or a dataclass, whose fields are
+packed into a compact binary layout instead of being serialized to JSON, without field
+names nor delimiters. The layout starts with a varint of flag bits, holding the value of
+boolean fields and whether optional fields are set, followed by the remaining fields in
+order: integers as zigzag varints, floats as 8 bytes, and strings and bytes prefixed by
+their varint length.
+
+Supported field types are `bool`, `int`, `float`, `str` and `bytes`, and optional ones.
+"""
+
+import dataclasses
+import hashlib
+import itertools
+import struct
+import typing
+
+from blake2signer.interfaces import SerializerInterface
+
+FLOAT = struct.Struct('<d')
+
+# Type of a schema: a NamedTuple or a dataclass
+TSchema = typing.TypeVar('TSchema')
+
+# Encoder and decoder of a field type
+Codec = typing.Tuple[
+    typing.Callable[[typing.Any], bytes],
+    typing.Callable[[bytes, int], typing.Tuple[typing.Any, int]],
+]
+
+
+def encode_varint(value: int) -> bytes:
+    """Encode a non-negative integer as a varint, 7 bits per byte, least significant first."""
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+
+    encoded.append(value)
+
+    return bytes(encoded)
+
+
+def decode_varint(data: bytes, offset: int) -> typing.Tuple[int, int]:
+    """Decode a varint from given data at given offset.
+
+    Args:
+        data: Encoded data.
+        offset: Position of the varint in the data.
+
+    Returns:
+        The integer, and the position after it.
+
+    Raises:
+        ValueError: the data is truncated.
+    """
+    value = 0
+    for shift in itertools.count(step=7):
+        if offset >= len(data):
+            raise ValueError('Truncated data')
+
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+
+    return value, offset
+
+
+def encode_int(value: int) -> bytes:
+    """Encode an integer as a zigzag varint, so that small negative ones stay small."""
+    return encode_varint(value * 2 if value >= 0 else -value * 2 - 1)
+
+
+def decode_int(data: bytes, offset: int) -> typing.Tuple[int, int]:
+    """Decode a zigzag varint from given data at given offset."""
+    value, offset = decode_varint(data, offset)
+
+    return (-(value >> 1) - 1 if value & 1 else value >> 1), offset
+
+
+def encode_float(value: float) -> bytes:
+    """Encode a float as a double."""
+    return FLOAT.pack(value)
+
+
+def decode_float(data: bytes, offset: int) -> typing.Tuple[float, int]:
+    """Decode a double from given data at given offset."""
+    end = offset + FLOAT.size
+    if end > len(data):
+        raise ValueError('Truncated data')
+
+    value: float = FLOAT.unpack_from(data, offset)[0]
+
+    return value, end
+
+
+def encode_bytes(value: bytes) -> bytes:
+    """Encode bytes prefixed by their varint length."""
+    return encode_varint(len(value)) + value
+
+
+def decode_bytes(data: bytes, offset: int) -> typing.Tuple[bytes, int]:
+    """Decode bytes prefixed by their varint length from given data at given offset."""
+    length, offset = decode_varint(data, offset)
+    end = offset + length
+    if end > len(data):
+        raise ValueError('Truncated data')
+
+    return data[offset:end], end
+
+
+def encode_str(value: str) -> bytes:
+    """Encode a string as UTF-8 prefixed by its varint length."""
+    return encode_bytes(value.encode())
+
+
+def decode_str(data: bytes, offset: int) -> typing.Tuple[str, int]:
+    """Decode a string from given data at given offset."""
+    value, offset = decode_bytes(data, offset)
+
+    return value.decode(), offset
+
+
+# Encoder and decoder of every field type, except booleans, which are flag bits
+CODECS: typing.Dict[type, Codec] = {
+    int: (encode_int, decode_int),
+    float: (encode_float, decode_float),
+    str: (encode_str, decode_str),
+    bytes: (encode_bytes, decode_bytes),
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class SchemaField:
+    """Field of a schema."""
+
+    name: str
+    type: type
+    optional: bool
+
+
+def parse_field(name: str, annotation: typing.Any) -> SchemaField:
+    """Parse a schema field from its type annotation.
+
+    Args:
+        name: The field name.
+        annotation: The field type annotation.
+
+    Returns:
+        A schema field.
+
+    Raises:
+        ValueError: the field type is not supported.
+    """
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    optional = typing.get_origin(annotation) is typing.Union and len(args) == 1
+    field_type = args[0] if optional else annotation
+    if field_type is not bool and field_type not in CODECS:
+        raise ValueError(f'Unsupported type for the schema field {name!r}: {annotation!r}')
+
+    return SchemaField(name=name, type=field_type, optional=optional)
+
+
+def get_schema_fields(schema: type) -> typing.Tuple[SchemaField, ...]:
+    """Get the fields of a schema, in order.
+
+    Args:
+        schema: A NamedTuple or a dataclass.
+
+    Returns:
+        The schema fields.
+
+    Raises:
+        ValueError: the schema is not a NamedTuple nor a dataclass, or a field type is not
+            supported.
+    """
+    if dataclasses.is_dataclass(schema):
+        names: typing.Sequence[str] = [field.name for field in dataclasses.fields(schema)]
+    elif issubclass(schema, tuple) and hasattr(schema, '_fields'):
+        names = schema._fields  # pylint: disable=W0212
+    else:
+        raise ValueError('The schema must be a NamedTuple or a dataclass')
+
+    hints = typing.get_type_hints(schema)
+
+    return tuple(parse_field(name, hints[name]) for name in names)
+
+
+class SchemaCodec(typing.Generic[TSchema]):
+    """Codec that packs instances of a schema into a compact binary layout."""
+
+    def __init__(self, schema: typing.Type[TSchema]) -> None:
+        """Create a codec for given schema.
+
+        Args:
+            schema: A NamedTuple or a dataclass.
+
+        Raises:
+            ValueError: the schema is not a NamedTuple nor a dataclass, or a field type is
+                not supported.
+        """
+        self.schema: typing.Type[TSchema] = schema
+        self.fields: typing.Tuple[SchemaField, ...] = get_schema_fields(schema)
+
+    @property
+    def layout_id(self) -> str:
+        """Get an identifier of the schema layout, which changes when its fields do."""
+        layout = repr([
+            (field.name, field.type.__name__, field.optional) for field in self.fields
+        ])
+
+        return hashlib.blake2b(layout.encode(), digest_size=4).hexdigest()
+
+    @staticmethod
+    def encode_field(
+        field: SchemaField,
+        value: typing.Any,
+    ) -> typing.Tuple[typing.List[bool], bytes]:
+        """Encode the value of a field into its flag bits and its payload."""
+        bits = []
+        if field.optional:
+            bits.append(value is not None)
+            if value is None:
+                return bits, b''
+
+        if field.type is bool:
+            bits.append(bool(value))
+            return bits, b''
+
+        return bits, CODECS[field.type][0](value)
+
+    def encode(self, obj: TSchema) -> bytes:
+        """Encode an instance of the schema.
+
+        Args:
+            obj: An instance of the schema.
+
+        Returns:
+            Encoded data.
+
+        Raises:
+            TypeError: the object is not an instance of the schema.
+        """
+        if not isinstance(obj, self.schema):
+            raise TypeError(f'Expected an instance of {self.schema.__name__}')
+
+        bits: typing.List[bool] = []
+        payloads = []
+        for field in self.fields:
+            field_bits, payload = self.encode_field(field, getattr(obj, field.name))
+            bits.extend(field_bits)
+            payloads.append(payload)
+
+        flags = sum(1 << index for index, bit in enumerate(bits) if bit)
+
+        return encode_varint(flags) + b''.join(payloads)
+
+    @staticmethod
+    def decode_field(
+        field: SchemaField,
+        data: bytes,
+        offset: int,
+        bits: typing.Iterator[bool],
+    ) -> typing.Tuple[typing.Any, int]:
+        """Decode the value of a field from its flag bits and its payload, if any."""
+        if field.optional and not next(bits):
+            return None, offset
+
+        if field.type is bool:
+            return next(bits), offset
+
+        value, offset = CODECS[field.type][1](data, offset)
+
+        return value, offset
+
+    def decode(self, data: bytes) -> TSchema:
+        """Decode an instance of the schema.
+
+        Args:
+            data: Encoded data.
+
+        Returns:
+            An instance of the schema.
+
+        Raises:
+            ValueError: the data is malformed.
+        """
+        flags, offset = decode_varint(data, 0)
+        bits = (bool(flags >> index & 1) for index in itertools.count())
+
+        values = {}
+        for field in self.fields:
+            values[field.name], offset = self.decode_field(field, data, offset, bits)
+
+        if offset != len(data):
+            raise ValueError('Unexpected trailing data')
+
+        return self.schema(**values)
+
+
+def create_schema_serializer(schema: type) -> typing.Type[SerializerInterface]:
+    """Create a serializer class for given schema.
+
+    The created class is named after the schema layout, because the signer uses it as part
+    of the personalisation, so that changing the schema fields invalidates existing
+    cookies instead of misreading them.
+
+    Args:
+        schema: A NamedTuple or a dataclass.
+
+    Returns:
+        A serializer class.
+
+    Raises:
+        ValueError: the schema is not a NamedTuple nor a dataclass, or a field type is not
+            supported.
+    """
+    codec: SchemaCodec[typing.Any] = SchemaCodec(schema)
+
+    class SchemaSerializer(SerializerInterface):
+        """Serializer that packs instances of a schema into a compact binary layout."""
+
+        def serialize(self, data: typing.Any, **kwargs: typing.Any) -> bytes:
+            """Serialize given instance of the schema.
+
+            Args:
+                data: Data to serialize.
+
+            Keyword Args:
+                **kwargs: Ignored.
+
+            Returns:
+                Serialized data.
+            """
+            return codec.encode(data)
+
+        def unserialize(self, data: bytes, **kwargs: typing.Any) -> typing.Any:
+            """Unserialize given data into an instance of the schema.
+
+            Args:
+                data: Serialized data to unserialize.
+
+            Keyword Args:
+                **kwargs: Ignored.
+
+            Returns:
+                Original data.
+            """
+            return codec.decode(data)
+
+    SchemaSerializer.__name__ = f'SchemaSerializer{codec.layout_id}'
+    SchemaSerializer.__qualname__ = SchemaSerializer.__name__
+
+    return SchemaSerializer
@@ -0,0 +1,189 @@
+"""Serializers for serialized cookies.
+
+Besides blake2signer's JSON serializer, these serializers use faster libraries, or compact
+binary formats that produce smaller cookies. Those libraries are optional extras: when one
+is not installed, its serializer falls back to JSON.
+
+Note that the serializer class name is part of the signer personalisation, so changing the
+serializer invalidates existing cookies, except between the JSON serializers.
+"""
+
+import typing
+import warnings
+
+from blake2signer.interfaces import SerializerInterface
+from blake2signer.serializers import JSONSerializer
+
+from .utils import import_optional
+
+# Optional serialization libraries, by serializer name
+BACKENDS: typing.Dict[str, typing.Any] = {
+    'orjson': import_optional('orjson'),
+    'msgpack': import_optional('msgpack'),
+    'cbor': import_optional('cbor2'),
+}
+
+
+class OrjsonSerializer(JSONSerializer):
+    """JSON serializer using orjson, if installed, or the standard json module otherwise.
+
+    It is interchangeable with blake2signer's JSON serializer. Note that orjson only
+    accepts string keys, and that it is used unless serializer kwargs are given, as those
+    are meant for the json module.
+    """
+
+    def serialize(self, data: typing.Any, **kwargs: typing.Any) -> bytes:
+        """Serialize given data to JSON.
+
+        Args:
+            data: Data to serialize.
+
+        Keyword Args:
+            **kwargs: Additional arguments for `json.dumps`.
+
+        Returns:
+            Serialized data.
+        """
+        orjson = BACKENDS['orjson']
+        if orjson is None or kwargs:
+            return super().serialize(data, **kwargs)
+
+        serialized: bytes = orjson.dumps(data)
+
+        return serialized
+
+    def unserialize(self, data: bytes, **kwargs: typing.Any) -> typing.Any:
+        """Unserialize given JSON data.
+
+        Args:
+            data: Serialized data to unserialize.
+
+        Keyword Args:
+            **kwargs: Additional arguments for `json.loads`.
+
+        Returns:
+            Original data.
+        """
+        orjson = BACKENDS['orjson']
+        if orjson is None or kwargs:
+            return super().unserialize(data, **kwargs)
+
+        return orjson.loads(data)
+
+
+# The signer uses the serializer class name as part of the personalisation, so keep the
+# name of the JSON serializer to remain compatible with it
+OrjsonSerializer.__name__ = JSONSerializer.__name__
+
+
+class MsgpackSerializer(SerializerInterface):
+    """MessagePack serializer, which requires msgpack."""
+
+    def serialize(self, data: typing.Any, **kwargs: typing.Any) -> bytes:
+        """Serialize given data to MessagePack.
+
+        Args:
+            data: Data to serialize.
+
+        Keyword Args:
+            **kwargs: Additional arguments for `msgpack.packb`.
+
+        Returns:
+            Serialized data.
+        """
+        serialized: bytes = BACKENDS['msgpack'].packb(data, use_bin_type=True, **kwargs)
+
+        return serialized
+
+    def unserialize(self, data: bytes, **kwargs: typing.Any) -> typing.Any:
+        """Unserialize given MessagePack data.
+
+        Args:
+            data: Serialized data to unserialize.
+
+        Keyword Args:
+            **kwargs: Additional arguments for `msgpack.unpackb`.
+
+        Returns:
+            Original data.
+        """
+        return BACKENDS['msgpack'].unpackb(data, raw=False, **kwargs)
+
+
+class CBORSerializer(SerializerInterface):
+    """CBOR serializer, which requires cbor2."""
+
+    def serialize(self, data: typing.Any, **kwargs: typing.Any) -> bytes:
+        """Serialize given data to CBOR.
+
+        Args:
+            data: Data to serialize.
+
+        Keyword Args:
+            **kwargs: Additional arguments for `cbor2.dumps`.
+
+        Returns:
+            Serialized data.
+        """
+        serialized: bytes = BACKENDS['cbor'].dumps(data, **kwargs)
+
+        return serialized
+
+    def unserialize(self, data: bytes, **kwargs: typing.Any) -> typing.Any:
+        """Unserialize given CBOR data.
+
+        Args:
+            data: Serialized data to unserialize.
+
+        Keyword Args:
+            **kwargs: Additional arguments for `cbor2.loads`.
+
+        Returns:
+            Original data.
+        """
+        return BACKENDS['cbor'].loads(data, **kwargs)
+
+
+# Serializers by name
+SERIALIZERS: typing.Dict[str, typing.Type[SerializerInterface]] = {
+    'json': JSONSerializer,
+    'orjson': OrjsonSerializer,
+    'msgpack': MsgpackSerializer,
+    'cbor': CBORSerializer,
+}
+
+
+def get_serializer_class(
+    serializer: typing.Union[str, typing.Type[SerializerInterface]],
+) -> typing.Type[SerializerInterface]:
+    """Get a serializer class by name.
+
+    If the library required by the serializer is not installed, a warning is issued and
+    the JSON serializer is used instead.
+
+    Args:
+        serializer: The serializer name, one of `SERIALIZERS`, or a serializer class,
+            which is returned as-is.
+
+    Returns:
+        A serializer class.
+
+    Raises:
+        ValueError: the serializer name is unknown.
+    """
+    if not isinstance(serializer, str):
+        return serializer
+
+    if serializer not in SERIALIZERS:
+        names = ', '.join(SERIALIZERS)
+        raise ValueError(f'Unknown serializer {serializer!r}, choose one of: {names}')
+
+    if serializer in BACKENDS and BACKENDS[serializer] is None:
+        warnings.warn(
+            f'The {serializer} serializer is not installed, falling back to JSON',
+            RuntimeWarning,
+            stacklevel=3,
+        )
+        return OrjsonSerializer
+
+    return SERIALIZERS[serializer]
@@ -0,0 +1,194 @@
+"""Server-side session FastAPI/Starlette middleware.
+
+This middleware keeps data in a session store, server-side, whereas the cookie only carries
+a signed session ID. This keeps the cookie small regardless of the amount of data, and
+avoids serializing and signing the data on every write.
+"""
+
+import secrets
+import typing
+from dataclasses import dataclass
+
+from blake2signer import Blake2TimestampSigner
+from blake2signer.errors import ExpiredSignatureError
+
+from .cookie import CookieData
+from .cookie import SignedCookieMiddlewareBase
+from .stores import SessionStore
+from .types import JSONTypes
+from .types import TData
+
+if typing.TYPE_CHECKING:
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from starlette.types import ASGIApp
+
+
+@dataclass
+class SessionData(CookieData[TData]):
+    """Session data container.
+
+    It behaves just like `CookieData`, additionally holding the session ID, if any.
+    """
+    session_id: typing.Optional[str] = None
+
+
+class SessionSignedCookieMiddleware(
+        SignedCookieMiddlewareBase[Blake2TimestampSigner, JSONTypes],
+):
+    """Middleware that stores data server-side, and a signed session ID into a cookie.
+
+    Use this middleware if you want to store big data structures, that would otherwise
+    make the cookie too big, or to keep the data out of the client.
+
+    It uses the `request.state` (see https://www.starlette.io/requests/#other-state) to
+    communicate with request handlers (views), so simply define a name used with the state,
+    as in `request.state.my_session`, where data read from the store is stored there, and
+    data produced by the request handler (stored in the state) is written to the store.
+
+    Note that the session lasts for the cookie time-to-live since it was created.
+    """
+
+    def __init__(
+        self,
+        app: 'ASGIApp',
+        *,
+        store: SessionStore,
+        **kwargs: typing.Any,
+    ) -> None:  # noqa: D417  # it's a false positive
+        """Create a server-side session middleware.
+
+        Args:
+            app: An ASGI application instance.
+
+        Keyword Args:
+            store: The session store, see the `stores` module.
+            **kwargs: Keyword arguments for the base middleware, see
+                `SignedCookieMiddlewareBase`. Note that the lazy mode is not supported.
+
+        Raises:
+            ValueError: the lazy mode was requested.
+        """
+        if kwargs.get('lazy'):
+            raise ValueError('The lazy mode is not supported by this middleware')
+
+        self.store: SessionStore = store
+
+        super().__init__(app, **kwargs)
+
+    # noinspection PyMethodMayBeStatic
+    def generate_session_id(self) -> str:  # pylint: disable=R0201
+        """Generate a new random session ID."""
+        return secrets.token_urlsafe(16)
+
+    def sign(self, data: JSONTypes) -> str:
+        """Sign the session ID with the signer."""
+        return self.add_key_id(self.signer.sign(typing.cast(str, data)).decode())
+
+    def unsign(self, data: str) -> str:
+        """Unsign the session ID with the signer of its key."""
+        signer, data = self.get_signer_for(data)
+
+        return signer.unsign(data, max_age=self.signature_max_age).decode()
+
+    def data_from_expired(self, exc: ExpiredSignatureError) -> str:
+        """Recover the session ID from an expired signature, to refresh the cookie."""
+        return exc.data.decode()
+
+    async def get_cookie_data(self, request: 'Request') -> SessionData[JSONTypes]:
+        """Get the session data container to inject in the request state.
+
+        Returns:
+            A session data container with the data from the store, if any.
+        """
+        session_id, exception, refresh = self.load_cookie(request)
+
+        data = None
+        if session_id is not None:
+            data = await self.store.get(typing.cast(str, session_id))
+
+        return SessionData(
+            data=data,
+            exc=exception,
+            refresh=refresh,
+            session_id=typing.cast(typing.Optional[str], session_id),
+        )
+
+    async def write_cookie_data(
+        self,
+        cookie: CookieData[JSONTypes],
+        *,
+        initial_cookie: CookieData[JSONTypes],
+        prev_data: typing.Optional[JSONTypes],
+        request: 'Request',
+        response: 'Response',
+    ) -> None:
+        """Write the session data set in the request state to the store, if necessary.
+
+        If there's no session yet, a new one is created, and its ID is written to the
+        cookie. If the cookie is due to be refreshed, it is written again, and the session
+        time-to-live in the store is extended. If the data was cleared, the session is
+        deleted from the store, and the cookie is expired.
+
+        Args:
+            cookie: Session data container from the request state.
+
+        Keyword Args:
+            initial_cookie: Session data container injected in the request state.
+            prev_data: Data originally read from the store.
+            request: The request.
+            response: Response to write the cookie into.
+        """
+        refresh = initial_cookie.refresh
+        if cookie is initial_cookie and not (cookie.modified or refresh):
+            return
+
+        session_id = typing.cast(SessionData[JSONTypes], initial_cookie).session_id
+        new_data = cookie.data
+        if new_data is None:
+            if session_id is not None:
+                await self.delete_session(session_id, response)
+
+            return
+
+        if refresh or self.should_write_cookie(new_data=new_data, prev_data=prev_data):
+            session_id = self.write_session_id(session_id, response, refresh=refresh)
+            await self.store.set(session_id, new_data, ttl=self.cookie_ttl)
+
+    async def delete_session(self, session_id: str, response: 'Response') -> None:
+        """Delete a session from the store, and expire its cookie.
+
+        Args:
+            session_id: The session ID.
+            response: Response to expire the cookie in.
+        """
+        await self.store.delete(session_id)
+        self.set_cookie(response, self.cookie_name, '', max_age=0)
+
+    def write_session_id(
+        self,
+        session_id: typing.Optional[str],
+        response: 'Response',
+        *,
+        refresh: bool,
+    ) -> str:
+        """Write the session ID to the cookie if it's new or due to be refreshed.
+
+        Args:
+            session_id: The current session ID, if any, or None to create a new one.
+            response: Response to write the cookie into.
+
+        Keyword Args:
+            refresh: True if the cookie is due to be refreshed, False otherwise.
+
+        Returns:
+            The session ID.
+        """
+        if session_id is None:
+            session_id = self.generate_session_id()
+        elif not refresh:
+            return session_id
+
+        self.write_cookie(session_id, response)
+
+        return session_id
@@ -0,0 +1,253 @@
+"""Session stores.
+
+Stores keep session data server-side, for the session middleware, so that the cookie only
+needs to carry a signed session ID. They are asynchronous, and those doing blocking I/O
+run it in a worker thread.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from anyio.to_thread import run_sync
+
+from .types import JSONTypes
+
+
+class SessionStore(ABC):
+    """Interface for session stores.
+
+    Implement your own store inheriting from this class.
+    """
+
+    @abstractmethod
+    async def get(self, session_id: str) -> typing.Optional[JSONTypes]:
+        """Get the data of a session.
+
+        Args:
+            session_id: The session ID.
+
+        Returns:
+            The session data, or None if the session doesn't exist or expired.
+        """
+
+    @abstractmethod
+    async def set(self, session_id: str, data: JSONTypes, *, ttl: int) -> None:
+        """Set the data of a session.
+
+        Args:
+            session_id: The session ID.
+            data: The session data.
+
+        Keyword Args:
+            ttl: The session time-to-live in seconds.
+        """
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """Delete a session, if it exists.
+
+        Args:
+            session_id: The session ID.
+        """
+
+
+class MemorySessionStore(SessionStore):
+    """In-process session store, that evicts the least recently used sessions.
+
+    Data is stored as-is, without serializing it, so it is shared with request handlers.
+    Note that sessions are lost when the process ends, and are not shared between
+    processes.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        """Create an in-process session store.
+
+        Args:
+            max_size (optional): Maximum amount of sessions to keep (defaults to 1024).
+        """
+        self.max_size: int = max_size
+        self._sessions: 'OrderedDict[str, typing.Tuple[float, JSONTypes]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        """Get the amount of sessions stored, including expired ones not yet evicted."""
+        return len(self._sessions)
+
+    async def get(self, session_id: str) -> typing.Optional[JSONTypes]:
+        """Get the data of a session, if it exists and is not expired."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+
+        expires, data = session
+        if expires <= time.monotonic():
+            del self._sessions[session_id]
+            return None
+
+        self._sessions.move_to_end(session_id)
+
+        return data
+
+    async def set(self, session_id: str, data: JSONTypes, *, ttl: int) -> None:
+        """Set the data of a session, evicting the least recently used ones if necessary."""
+        self._sessions[session_id] = (time.monotonic() + ttl, data)
+        self._sessions.move_to_end(session_id)
+
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+
+    async def delete(self, session_id: str) -> None:
+        """Delete a session, if it exists."""
+        self._sessions.pop(session_id, None)
+
+
+class FileSessionStore(SessionStore):
+    """File-backed session store, that keeps each session in a JSON file.
+
+    Files are written atomically, and expired sessions are removed when read.
+    """
+
+    def __init__(self, directory: typing.Union[str, os.PathLike]) -> None:
+        """Create a file-backed session store.
+
+        Args:
+            directory: The directory to store sessions in, created if necessary.
+        """
+        self.directory: Path = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get_path(self, session_id: str) -> Path:
+        """Get the path of the file of a session."""
+        return self.directory / f'{session_id}.json'
+
+    def _get(self, session_id: str) -> typing.Optional[JSONTypes]:
+        """Get the data of a session, if it exists and is not expired (blocking)."""
+        path = self.get_path(session_id)
+        try:
+            session = json.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+
+        if session['expires'] <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+
+        data: JSONTypes = session['data']
+
+        return data
+
+    def _set(self, session_id: str, data: JSONTypes, ttl: int) -> None:
+        """Set the data of a session, writing the file atomically (blocking)."""
+        session = {
+            'expires': time.time() + ttl,
+            'data': data,
+        }
+        with NamedTemporaryFile(
+                'w',
+                dir=self.directory,
+                suffix='.tmp',
+                delete=False,
+                encoding='utf-8',
+        ) as file:
+            json.dump(session, file, separators=(',', ':'))
+
+        os.replace(file.name, self.get_path(session_id))
+
+    def _delete(self, session_id: str) -> None:
+        """Delete a session, if it exists (blocking)."""
+        self.get_path(session_id).unlink(missing_ok=True)
+
+    async def get(self, session_id: str) -> typing.Optional[JSONTypes]:
+        """Get the data of a session, if it exists and is not expired."""
+        return await run_sync(self._get, session_id)
+
+    async def set(self, session_id: str, data: JSONTypes, *, ttl: int) -> None:
+        """Set the data of a session."""
+        await run_sync(self._set, session_id, data, ttl)
+
+    async def delete(self, session_id: str) -> None:
+        """Delete a session, if it exists."""
+        await run_sync(self._delete, session_id)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite session store, using write-ahead logging.
+
+    Data is stored as JSON, and expired sessions are removed when read, or when calling
+    `purge`.
+    """
+
+    def __init__(self, database: typing.Union[str, os.PathLike]) -> None:
+        """Create a SQLite session store.
+
+        Args:
+            database: The path to the database file, created if necessary.
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            database,
+            check_same_thread=False,
+            isolation_level=None,  # autocommit
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS sessions ('
+            'id TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL'
+            ')',
+        )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _execute(self, sql: str, *parameters: typing.Any) -> typing.List[typing.Any]:
+        """Execute a query, returning all rows (blocking)."""
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _get(self, session_id: str) -> typing.Optional[JSONTypes]:
+        """Get the data of a session, if it exists and is not expired (blocking)."""
+        rows = self._execute('SELECT data, expires FROM sessions WHERE id = ?', session_id)
+        if not rows:
+            return None
+
+        data, expires = rows[0]
+        if expires <= time.time():
+            self._execute('DELETE FROM sessions WHERE id = ?', session_id)
+            return None
+
+        loaded: JSONTypes = json.loads(data)
+
+        return loaded
+
+    async def get(self, session_id: str) -> typing.Optional[JSONTypes]:
+        """Get the data of a session, if it exists and is not expired."""
+        return await run_sync(self._get, session_id)
+
+    async def set(self, session_id: str, data: JSONTypes, *, ttl: int) -> None:
+        """Set the data of a session."""
+        await run_sync(
+            self._execute,
+            'INSERT OR REPLACE INTO sessions (id, data, expires) VALUES (?, ?, ?)',
+            session_id,
+            json.dumps(data, separators=(',', ':')),
+            time.time() + ttl,
+        )
+
+    async def delete(self, session_id: str) -> None:
+        """Delete a session, if it exists."""
+        await run_sync(self._execute, 'DELETE FROM sessions WHERE id = ?', session_id)
+
+    async def purge(self) -> None:
+        """Delete all expired sessions."""
+        await run_sync(self._execute, 'DELETE FROM sessions WHERE expires <= ?', time.time())
@@ -0,0 +1,134 @@
+"""Tests for the batch module."""
+
+import copyreg
+import multiprocessing
+import pickle
+import time
+from datetime import datetime
+from datetime import timezone
+from unittest import mock
+
+import pytest
+from blake2signer.errors import ExpiredSignatureError
+
+from ..batch import WorkerExpiredSignatureError
+from ..batch import init_worker
+from ..batch import map_in_processes
+from ..batch import sign_in_worker
+from ..batch import unsign_in_worker
+from ..cookie import SerializedSignedCookieMiddleware
+from ..cookie import SimpleSignedCookieMiddleware
+
+
+def test_expired_signature_errors_are_picklable() -> None:
+    """Test that expired signature errors can be sent back from worker processes."""
+    timestamp = datetime.now(timezone.utc)
+    error = WorkerExpiredSignatureError(
+        'signature has expired',
+        timestamp=timestamp,
+        data=b'data',
+    )
+
+    unpickled = pickle.loads(pickle.dumps(error))
+
+    assert isinstance(unpickled, WorkerExpiredSignatureError)
+    assert ('signature has expired',) == unpickled.args
+    assert timestamp == unpickled.timestamp
+    assert b'data' == unpickled.data
+
+
+def test_pickling_is_not_changed_globally() -> None:
+    """Test that pickling expired signature errors is left as is outside of workers."""
+    assert ExpiredSignatureError not in copyreg.dispatch_table
+
+
+def test_expired_signature_errors_are_raised_picklable() -> None:
+    """Test that the worker raises expired signature errors that can be pickled."""
+    middleware = SimpleSignedCookieMiddleware(
+        None,  # type: ignore
+        secret=b'secretsecretsecret',
+        state_attribute_name='cookie',
+        cookie_name='my_cookie',
+        cookie_ttl=60,
+    )
+    init_worker(middleware)
+
+    with mock.patch('blake2signer.bases.time', return_value=time.time() - 70):
+        signed_data = middleware.sign('data')
+
+    with pytest.raises(WorkerExpiredSignatureError) as exc_info:
+        unsign_in_worker(signed_data)
+
+    unpickled = pickle.loads(pickle.dumps(exc_info.value))
+    assert isinstance(unpickled, ExpiredSignatureError)
+    assert b'data' == unpickled.data
+
+
+def test_results_are_yielded_in_order() -> None:
+    """Test that results are yielded in the order of the items, window after window."""
+    results = map_in_processes(
+        str,
+        iter(range(25)),
+        middleware=None,
+        processes=2,
+        chunk_size=4,
+    )
+
+    assert [str(number) for number in range(25)] == list(results)
+
+
+def test_no_items_yield_no_results() -> None:
+    """Test that no items yield no results."""
+    results = map_in_processes(str, (), middleware=None, processes=1, chunk_size=4)
+
+    assert [] == list(results)
+
+
+def test_worker_functions_use_the_worker_middleware() -> None:
+    """Test that the worker functions sign and unsign with the middleware of the worker."""
+    middleware = SimpleSignedCookieMiddleware(
+        None,  # type: ignore
+        secret=b'secretsecretsecret',
+        state_attribute_name='cookie',
+        cookie_name='my_cookie',
+        cookie_ttl=60,
+    )
+
+    init_worker(pickle.loads(pickle.dumps(middleware)))
+
+    assert 'data' == unsign_in_worker(sign_in_worker('data'))
+    assert 'data' == middleware.unsign(sign_in_worker('data'))
+
+
+@pytest.mark.parametrize('serializer', ('json', 'orjson'))
+def test_worker_processes_can_be_spawned(serializer: str) -> None:
+    """Test that work is spread over spawned worker processes, which import everything."""
+    middleware = SerializedSignedCookieMiddleware(
+        None,  # type: ignore
+        secret=b'secretsecretsecret',
+        state_attribute_name='cookie',
+        cookie_name='my_cookie',
+        cookie_ttl=60,
+        serializer=serializer,
+    )
+    items = [{'index': index} for index in range(5)]
+    with mock.patch('blake2signer.bases.time', return_value=time.time() - 70):
+        expired = middleware.sign({'index': -1})
+
+    signed_items = list(middleware.sign_many(
+        items,
+        processes=1,
+        chunk_size=2,
+        mp_context=multiprocessing.get_context('spawn'),
+    ))
+
+    assert items == [middleware.unsign(signed_data) for signed_data in signed_items]
+    with pytest.raises(ExpiredSignatureError):
+        list(map_in_processes(
+            unsign_in_worker,
+            [expired],
+            middleware=middleware,
+            processes=1,
+            chunk_size=1,
+            mp_context=multiprocessing.get_context('spawn'),
+        ))
@@ -0,0 +1,424 @@
+"""Tests for the body module."""
+
+import time
+import typing
+from unittest import mock
+
+import anyio
+import pytest
+from blake2signer.errors import ExpiredSignatureError
+from blake2signer.errors import InvalidSignatureError
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from ..body import BodyData
+from ..body import SignedBodyMiddleware
+from ..body import SignedResponseMiddleware
+from ..body import get_body_digest
+
+
+class TestsSignedBodyMiddleware:
+    """Tests for the SignedBodyMiddleware."""
+
+    secret = b'secretsecretsecret'
+    header_name = 'x-body-signature'
+
+    def create_middleware(self, **kwargs: typing.Any) -> SignedBodyMiddleware:
+        """Create a middleware instance directly, wrapping a dummy app."""
+        kwargs.setdefault('secret', self.secret)
+        kwargs.setdefault('state_attribute_name', 'body')
+
+        return SignedBodyMiddleware(mock.AsyncMock(), **kwargs)
+
+    def sign(self, body: bytes, **kwargs: typing.Any) -> str:
+        """Sign a request body with a middleware created with given kwargs."""
+        return self.create_middleware(**kwargs).sign(body)
+
+    def create_test_client(self, **kwargs: typing.Any) -> TestClient:
+        """Create a test client for an application using the signed body middleware."""
+
+        async def webhook(request: Request) -> JSONResponse:
+            """Endpoint that returns the verification result, and the body size."""
+            body: BodyData = request.state.body
+
+            return JSONResponse({
+                'verified': body.verified,
+                'error': type(body.exc).__name__ if body.exc else None,
+                'size': len(await request.body()),
+            })
+
+        def unsigned(request: Request) -> JSONResponse:
+            """Endpoint that doesn't require a signed body."""
+            return JSONResponse({
+                'has_state': hasattr(request.state, 'body'),
+            })
+
+        kwargs.setdefault('secret', self.secret)
+        kwargs.setdefault('state_attribute_name', 'body')
+        app = Starlette(
+            routes=[
+                Route('/webhook', webhook, methods=['POST']),
+                Route('/unsigned', unsigned, methods=['POST']),
+            ],
+            middleware=[Middleware(SignedBodyMiddleware, **kwargs)],
+        )
+
+        return TestClient(app)
+
+    def test_signed_body_is_verified(self) -> None:
+        """Test that a correctly signed body is verified, and readable by the app."""
+        client = self.create_test_client()
+        body = b'{"event": "paid"}'
+
+        response = client.post('/webhook', data=body, headers={
+            self.header_name: self.sign(body),
+        })
+
+        assert 200 == response.status_code
+        assert {'verified': True, 'error': None, 'size': len(body)} == response.json()
+
+    def test_streamed_body_is_verified(self) -> None:
+        """Test that a body received in chunks is hashed incrementally, and replayed."""
+        client = self.create_test_client(spool_size=1024)
+        chunks = [bytes([index]) * 1000 for index in range(10)]
+
+        def stream() -> typing.Iterator[bytes]:
+            yield from chunks
+
+        with mock.patch(
+                'asgi_signing_middleware.body.run_in_threadpool',
+                wraps=run_in_threadpool,
+        ) as mock_run_in_threadpool:
+            response = client.post('/webhook', data=stream(), headers={
+                self.header_name: self.sign(b''.join(chunks)),
+            })
+
+        assert {'verified': True, 'error': None, 'size': 10000} == response.json()
+        # Spooled to disk from the second chunk on, including the last empty one
+        offloaded = [call.args[0].__name__ for call in mock_run_in_threadpool.call_args_list]
+        assert ['write'] * 10 + ['read'] == offloaded
+
+    def test_body_declared_too_large_is_rejected(self) -> None:
+        """Test that a body whose declared size is too large is rejected without reading it."""
+        client = self.create_test_client(max_body_size=10)
+        body = b'{"event": "paid", "amount": 100}'
+
+        response = client.post('/webhook', data=body, headers={
+            self.header_name: self.sign(body),
+        })
+
+        assert 413 == response.status_code
+        assert 'Body too large' == response.text
+
+    def test_streamed_body_too_large_is_rejected(self) -> None:
+        """Test that a streamed body is rejected as soon as it is too large."""
+        middleware = self.create_middleware(max_body_size=10)
+        receive = mock.AsyncMock(side_effect=(
+            {'type': 'http.request', 'body': b'chunk1', 'more_body': True},
+            {'type': 'http.request', 'body': b'chunk2', 'more_body': True},
+            {'type': 'http.request', 'body': b'chunk3', 'more_body': False},
+        ))
+        send = mock.AsyncMock()
+        headers = [(self.header_name.encode(), self.sign(b'chunk1chunk2chunk3').encode())]
+        scope = {'type': 'http', 'path': '/', 'headers': headers}
+
+        anyio.run(middleware, scope, receive, send)
+
+        assert 2 == receive.call_count
+        assert 413 == send.call_args_list[0].args[0]['status']
+        middleware.app.assert_not_called()  # type: ignore[attr-defined]
+
+    def test_body_size_is_not_limited(self) -> None:
+        """Test that the body size can be left unlimited."""
+        client = self.create_test_client(max_body_size=None)
+        body = b'x' * 20 * 1024 * 1024
+
+        response = client.post('/webhook', data=body, headers={
+            self.header_name: self.sign(body),
+        })
+
+        assert {'verified': True, 'error': None, 'size': len(body)} == response.json()
+
+    @pytest.mark.parametrize(
+        'headers',
+        (
+            {},
+            {header_name: ''},
+            {header_name: 'wrong.signature'},
+        ),
+    )
+    def test_bad_signatures_are_rejected(self, headers: typing.Dict[str, str]) -> None:
+        """Test that requests whose signature is missing or wrong are rejected."""
+        client = self.create_test_client()
+
+        response = client.post('/webhook', data=b'body', headers=headers)
+
+        assert 403 == response.status_code
+        assert 'Invalid body signature' == response.text
+
+    def test_tampered_body_is_rejected(self) -> None:
+        """Test that a body that doesn't match its signature is rejected."""
+        client = self.create_test_client()
+
+        response = client.post('/webhook', data=b'tampered', headers={
+            self.header_name: self.sign(b'body'),
+        })
+
+        assert 403 == response.status_code
+
+    def test_expired_signature_is_rejected(self) -> None:
+        """Test that an old signature is rejected, to limit replays."""
+        client = self.create_test_client(signature_ttl=60)
+        with mock.patch('blake2signer.bases.time', return_value=time.time() - 70):
+            signature = self.sign(b'body')
+
+        response = client.post('/webhook', data=b'body', headers={
+            self.header_name: signature,
+        })
+
+        assert 403 == response.status_code
+
+    @pytest.mark.parametrize(
+        ('signature', 'error'),
+        (
+            (None, 'InvalidSignatureError'),
+            ('wrong.signature', 'InvalidSignatureError'),
+        ),
+    )
+    def test_bad_signatures_can_be_handled_by_the_app(
+        self,
+        signature: typing.Optional[str],
+        error: str,
+    ) -> None:
+        """Test that bad signatures are left to the app when not rejecting them."""
+        client = self.create_test_client(reject=False)
+        headers = {} if signature is None else {self.header_name: signature}
+
+        response = client.post('/webhook', data=b'body', headers=headers)
+
+        assert 200 == response.status_code
+        assert {'verified': False, 'error': error, 'size': 4} == response.json()
+
+    def test_rotating_keys(self) -> None:
+        """Test that bodies signed with an older secret are verified."""
+        old_secret = b'oldsecretoldsecret'
+        client = self.create_test_client(secret=[b'newsecretnewsecret', old_secret])
+
+        response = client.post('/webhook', data=b'body', headers={
+            self.header_name: self.sign(b'body', secret=old_secret),
+        })
+
+        assert {'verified': True, 'error': None, 'size': 4} == response.json()
+
+    def test_bodies_are_signed_with_the_newest_secret(self) -> None:
+        """Test that bodies are signed with the newest secret when rotating keys."""
+        middleware = self.create_middleware(secret=[self.secret, b'oldsecretoldsecret'])
+        digest = get_body_digest(b'body')
+
+        self.create_middleware().verify(middleware.sign(b'body'), digest)
+
+    def test_expired_signature_is_not_checked_with_older_secrets(self) -> None:
+        """Test that an expired signature fails as such, instead of as a wrong one."""
+        middleware = self.create_middleware(secret=[self.secret, b'oldsecretoldsecret'])
+        with mock.patch('blake2signer.bases.time', return_value=time.time() - 400):
+            signature = middleware.sign(b'body')
+
+        with pytest.raises(ExpiredSignatureError):
+            middleware.verify(signature, get_body_digest(b'body'))
+
+    def test_signer_kwargs(self) -> None:
+        """Test that the signer kwargs are used, and the personalisation is extended."""
+        middleware = self.create_middleware(signer_kwargs={'personalisation': 'webhooks'})
+        signature = middleware.sign(b'body')
+
+        with pytest.raises(InvalidSignatureError):
+            self.create_middleware().verify(signature, get_body_digest(b'body'))
+
+    def test_secret_in_signer_kwargs_is_rejected(self) -> None:
+        """Test that the secret can't be set in the signer kwargs."""
+        with pytest.raises(ValueError, match='secret'):
+            self.create_middleware(signer_kwargs={'secret': self.secret})
+
+    def test_excluded_paths_are_not_verified(self) -> None:
+        """Test that the middleware doesn't act for excluded paths."""
+        client = self.create_test_client(exclude_paths=['/unsigned'])
+
+        response = client.post('/unsigned', data=b'body')
+
+        assert {'has_state': False} == response.json()
+
+    def test_body_is_not_read_without_a_signature(self) -> None:
+        """Test that the body of a request without a signature is not even read."""
+        middleware = self.create_middleware()
+        receive = mock.AsyncMock()
+
+        scope = {'type': 'http', 'path': '/', 'headers': []}
+
+        anyio.run(middleware, scope, receive, mock.AsyncMock())
+
+        receive.assert_not_called()
+        middleware.app.assert_not_called()  # type: ignore[attr-defined]
+
+    def test_app_is_not_run_if_the_client_disconnects(self) -> None:
+        """Test that the app is not run if the client disconnects while sending the body."""
+        middleware = self.create_middleware()
+        receive = mock.AsyncMock(side_effect=(
+            {'type': 'http.request', 'body': b'bo', 'more_body': True},
+            {'type': 'http.disconnect'},
+        ))
+        headers = [(self.header_name.encode(), self.sign(b'body').encode())]
+        scope = {'type': 'http', 'path': '/', 'headers': headers}
+
+        anyio.run(middleware, scope, receive, mock.AsyncMock())
+
+        middleware.app.assert_not_called()  # type: ignore[attr-defined]
+
+    def test_app_receives_as_usual_after_the_body(self) -> None:
+        """Test that the app receives disconnections after the body is replayed."""
+        middleware = self.create_middleware(spool_size=1)
+        receive = mock.AsyncMock(side_effect=(
+            {'type': 'http.request', 'body': b'body'},
+            {'type': 'http.disconnect'},
+        ))
+        messages = []
+
+        async def app(scope: typing.Any, receive: typing.Any, send: typing.Any) -> None:
+            for _ in range(3):
+                messages.append(await receive())
+
+        middleware.app = app
+        headers = [(self.header_name.encode(), self.sign(b'body').encode())]
+        scope = {'type': 'http', 'path': '/', 'headers': headers}
+
+        with mock.patch.object(SignedBodyMiddleware, 'replay_chunk_size', 2):
+            anyio.run(middleware, scope, receive, mock.AsyncMock())
+
+        assert [
+            {'type': 'http.request', 'body': b'bo', 'more_body': True},
+            {'type': 'http.request', 'body': b'dy', 'more_body': False},
+            {'type': 'http.disconnect'},
+        ] == messages
+
+
+class TestsSignedResponseMiddleware:
+    """Tests for the SignedResponseMiddleware."""
+
+    secret = b'secretsecretsecret'
+    header_name = 'x-body-signature'
+    chunks = (b'first chunk, ', b'second chunk, ', b'last chunk')
+
+    def create_middleware(
+        self,
+        app: typing.Any = None,
+        **kwargs: typing.Any,
+    ) -> SignedResponseMiddleware:
+        """Create a middleware instance directly."""
+        kwargs.setdefault('secret', self.secret)
+
+        return SignedResponseMiddleware(app or mock.AsyncMock(), **kwargs)
+
+    def stream_endpoint(self, request: Request) -> StreamingResponse:
+        """Endpoint that streams its body in chunks."""
+
+        async def stream() -> typing.AsyncIterator[bytes]:
+            for chunk in self.chunks:
+                yield chunk
+
+        return StreamingResponse(stream())
+
+    def create_test_client(self, **kwargs: typing.Any) -> TestClient:
+        """Create a test client for an application using the signed response middleware."""
+
+        def endpoint(request: Request) -> JSONResponse:
+            """Endpoint that sends its body at once."""
+            return JSONResponse({'hello': 'world'})
+
+        kwargs.setdefault('secret', self.secret)
+        app = Starlette(
+            routes=[
+                Route('/', endpoint),
+                Route('/stream', self.stream_endpoint),
+            ],
+            middleware=[Middleware(SignedResponseMiddleware, **kwargs)],
+        )
+
+        return TestClient(app)
+
+    def run(
+        self,
+        middleware: SignedResponseMiddleware,
+        **scope: typing.Any,
+    ) -> typing.List[typing.Dict[str, typing.Any]]:
+        """Run the middleware for a request to given scope, returning the messages sent."""
+        messages = []
+
+        async def send(message: typing.Dict[str, typing.Any]) -> None:
+            messages.append(message)
+
+        async def receive() -> typing.Any:
+            await anyio.sleep_forever()  # The client never disconnects
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/', 'headers': [], **scope}
+        anyio.run(middleware, scope, receive, send)
+
+        return messages
+
+    def test_body_sent_at_once_is_signed_in_a_header(self) -> None:
+        """Test that a body sent at once is signed in the signature header."""
+        client = self.create_test_client()
+
+        response = client.get('/')
+
+        assert {'hello': 'world'} == response.json()
+        middleware = self.create_middleware()
+        middleware.verify(response.headers[self.header_name], get_body_digest(response.content))
+
+    def test_streamed_body_is_signed_in_a_trailer(self) -> None:
+        """Test that a streamed body is signed in a trailer, if the server supports them."""
+        middleware = self.create_middleware(app=self.stream_endpoint(mock.MagicMock()))
+
+        messages = self.run(middleware, extensions={'http.response.trailers': {}})
+
+        start, *bodies, trailers = messages
+        assert start['trailers'] is True
+        assert (b'trailer', self.header_name.encode()) in start['headers']
+        assert b''.join(self.chunks) == b''.join(message['body'] for message in bodies)
+        assert 'http.response.trailers' == trailers['type']
+        assert trailers['more_trailers'] is False
+        ((name, signature),) = trailers['headers']
+        assert self.header_name.encode() == name
+        middleware.verify(signature.decode(), get_body_digest(b''.join(self.chunks)))
+
+    def test_streamed_body_is_not_signed_without_trailers(self) -> None:
+        """Test that a streamed body is not signed if the server doesn't support trailers."""
+        client = self.create_test_client()
+
+        response = client.get('/stream')
+
+        assert b''.join(self.chunks) == response.content
+        assert self.header_name not in response.headers
+        assert 'trailer' not in response.headers
+
+    def test_other_messages_are_sent_as_is(self) -> None:
+        """Test that messages other than the response start and body are sent untouched."""
+
+        async def app(scope: typing.Any, receive: typing.Any, send: typing.Any) -> None:
+            await send({'type': 'http.response.other'})
+
+        messages = self.run(self.create_middleware(app=app))
+
+        assert [{'type': 'http.response.other'}] == messages
+
+    def test_excluded_paths_are_not_signed(self) -> None:
+        """Test that the middleware doesn't act for excluded paths."""
+        client = self.create_test_client(exclude_paths=['/'])
+
+        response = client.get('/')
+
+        assert self.header_name not in response.headers
@@ -0,0 +1,159 @@
+"""Tests for the cache module."""
+
+import time
+import typing
+from unittest import mock
+
+import pytest
+from blake2signer.errors import InvalidSignatureError
+from blake2signer.errors import SignedDataError
+from blake2signer.errors import UnserializationError
+
+from ..cache import CacheStats
+from ..cache import RejectedCookieCache
+from ..cache import VerifiedCookieCache
+from ..cache import copy_error
+
+
+def test_cache_get_and_set() -> None:
+    """Test that cached cookies are got back, keeping statistics."""
+    cache = VerifiedCookieCache()
+    now = time.time()
+
+    assert cache.get('signed', max_age=60) is None
+
+    cache.set('signed', {'some': 'data'}, signed_at=now)
+    entry = cache.get('signed', max_age=60)
+
+    assert entry is not None
+    assert {'some': 'data'} == entry.data
+    assert now == entry.signed_at
+    assert CacheStats(hits=1, misses=1) == cache.stats
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """Test that the least recently used cookies are evicted."""
+    cache = VerifiedCookieCache(2)
+    now = time.time()
+    cache.set('first', 1, signed_at=now)
+    cache.set('second', 2, signed_at=now)
+    cache.get('first', max_age=60)
+
+    cache.set('third', 3, signed_at=now)
+
+    assert 2 == len(cache)
+    assert cache.get('second', max_age=60) is None
+    assert cache.get('first', max_age=60) is not None
+    assert 1 == cache.stats.evictions
+
+
+@pytest.mark.parametrize(
+    ('signature_age', 'cache_age', 'ttl', 'expired'),
+    (
+        (10, 10, None, False),
+        (60, 0, None, True),
+        (10, 30, 60, False),
+        (10, 60, 60, True),
+    ),
+)
+def test_cache_expires_entries(
+    signature_age: int,
+    cache_age: int,
+    ttl: typing.Optional[float],
+    expired: bool,
+) -> None:
+    """Test that entries expire with their signature, or after the cache TTL."""
+    cache = VerifiedCookieCache(ttl=ttl)
+    now = time.time()
+    with mock.patch('asgi_signing_middleware.cache.time', return_value=now - cache_age):
+        cache.set('signed', 'data', signed_at=now - signature_age)
+
+    with mock.patch('asgi_signing_middleware.cache.time', return_value=now):
+        entry = cache.get('signed', max_age=60)
+
+    assert expired is (entry is None)
+    assert int(expired) == cache.stats.expirations
+    assert int(not expired) == len(cache)
+
+
+def test_cache_shares_payloads() -> None:
+    """Test that payloads are cached as they are, without copying them."""
+    cache = VerifiedCookieCache()
+    payload = b'{"items": []}'
+    cache.set('signed', payload, signed_at=time.time())
+
+    entry = cache.get('signed', max_age=60)
+
+    assert entry is not None
+    assert payload is entry.data
+
+
+def test_cache_clear() -> None:
+    """Test that the cache can be cleared."""
+    cache = VerifiedCookieCache()
+    cache.set('signed', 'data', signed_at=time.time())
+
+    cache.clear()
+
+    assert 0 == len(cache)
+
+
+@pytest.mark.parametrize(
+    'error',
+    (
+        InvalidSignatureError('signature is not valid'),
+        UnserializationError('data can not be unserialized'),
+    ),
+)
+def test_copy_error(error: SignedDataError) -> None:
+    """Test that errors are copied into new equal ones."""
+    copied = copy_error(error)
+
+    assert copied is not error
+    assert type(error) is type(copied)
+    assert error.args == copied.args
+
+
+def test_rejected_cache_get_and_set() -> None:
+    """Test that rejected cookies are got back with a copy of their error."""
+    cache = RejectedCookieCache()
+    error = InvalidSignatureError('signature is not valid')
+
+    assert cache.get('signed') is None
+
+    cache.set('signed', error)
+    cached = cache.get('signed')
+
+    assert isinstance(cached, InvalidSignatureError)
+    assert cached is not error
+    assert CacheStats(hits=1, misses=1) == cache.stats
+
+
+def test_rejected_cache_keeps_hashes() -> None:
+    """Test that rejected cookies are kept by a fixed size hash of their value."""
+    cache = RejectedCookieCache()
+
+    key = cache.get_key('signed' * 1000)
+
+    assert 16 == len(key)
+    assert key != cache.get_key('signed')
+
+
+def test_rejected_cache_evicts_least_recently_used() -> None:
+    """Test that the least recently used rejected cookies are evicted."""
+    cache = RejectedCookieCache(2)
+    error = InvalidSignatureError('signature is not valid')
+    cache.set('first', error)
+    cache.set('second', error)
+    cache.get('first')
+
+    cache.set('third', error)
+
+    assert 2 == len(cache)
+    assert cache.get('second') is None
+    assert cache.get('first') is not None
+    assert 1 == cache.stats.evictions
+
+    cache.clear()
+
+    assert 0 == len(cache)
@@ -0,0 +1,89 @@
+"""Tests for the compression module."""
+
+import zlib
+
+import pytest
+from blake2signer.compressors import GzipCompressor
+from blake2signer.compressors import ZlibCompressor
+
+from ..compression import CompressionStats
+from ..compression import create_compressor_class
+
+
+def test_compression_stats_ratio() -> None:
+    """Test the compression ratio of the stats."""
+    stats = CompressionStats()
+    assert 0.0 == stats.ratio
+
+    stats.size_in = 200
+    stats.size_out = 50
+    assert 75.0 == stats.ratio
+
+
+@pytest.mark.parametrize(
+    'compressor_class',
+    (
+        ZlibCompressor,
+        GzipCompressor,
+    ),
+)
+def test_compressor_class_keeps_name(compressor_class: type) -> None:
+    """Test that the compressor class keeps the name of the original one."""
+    compressor = create_compressor_class(
+        compressor_class,
+        threshold=0,
+        ratio=5.0,
+        stats=CompressionStats(),
+    )
+
+    assert compressor_class.__name__ == compressor.__name__
+    assert issubclass(compressor, compressor_class)
+
+
+def test_compressor_skips_below_threshold() -> None:
+    """Test that payloads below the threshold are not compressed."""
+    stats = CompressionStats()
+    compressor = create_compressor_class(
+        ZlibCompressor,
+        threshold=100,
+        ratio=5.0,
+        stats=stats,
+    )()
+
+    data = b'a' * 99
+    assert data == compressor.compress(data, level=6)
+    assert CompressionStats(skipped_below_threshold=1) == stats
+
+
+def test_compressor_skips_detrimental() -> None:
+    """Test that payloads are not compressed when it is detrimental."""
+    stats = CompressionStats()
+    compressor = create_compressor_class(
+        ZlibCompressor,
+        threshold=0,
+        ratio=5.0,
+        stats=stats,
+    )()
+
+    data = b'abc'
+    assert data == compressor.compress(data, level=6)
+    assert CompressionStats(skipped_detrimental=1) == stats
+
+
+def test_compressor_compresses() -> None:
+    """Test that payloads are compressed, keeping statistics."""
+    stats = CompressionStats()
+    compressor = create_compressor_class(
+        ZlibCompressor,
+        threshold=100,
+        ratio=5.0,
+        stats=stats,
+    )()
+
+    data = b'a' * 100
+    compressed = compressor.compress(data, level=6)
+    assert zlib.compress(data, level=6) == compressed
+    assert 1 == stats.compressed
+    assert 100 == stats.size_in
+    assert len(compressed) == stats.size_out
+    assert 0 < stats.ratio
@@ -1,27 +1,87 @@
 """Tests for the signed cookie module for Starlette."""
 # pylint: disable=R0801
 
+import json
+import pickle
+import re
+import time
 import typing
 from abc import abstractmethod
 from unittest import mock
 
 import pytest
+from blake2signer.compressors import GzipCompressor
+from blake2signer.errors import ExpiredSignatureError
 from blake2signer.errors import InvalidSignatureError
+from blake2signer.serializers import NullSerializer
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
 from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware import Middleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
+from starlette.responses import StreamingResponse
 from starlette.routing import Route
 from starlette.testclient import TestClient
 
+from ..compression import CompressionStats
 from ..cookie import CookieProperties
 from ..cookie import JSONTypes
+from ..cookie import ResponseStartMessage
 from ..cookie import SerializedSignedCookieMiddleware
+from ..cookie import SignedCookieMiddlewareBase
 from ..cookie import SimpleSignedCookieMiddleware
 from ..cookie import TData
+from ..observers import CookieObserver
+from ..scanner import CookieScanner
+from ..tracing import CookieTracer
+from ..types import Secrets
 from ..types import TMiddleware
 
 
+class RecordingObserver(CookieObserver):
+    """Observer that records every event."""
+
+    def __init__(self) -> None:
+        """Create a recording observer."""
+        self.timings: typing.List[typing.Tuple[str, str, float]] = []
+        self.sizes: typing.List[typing.Tuple[str, str, int]] = []
+        self.outcomes: typing.List[typing.Tuple[str, str]] = []
+
+    @property
+    def stages(self) -> typing.List[str]:
+        """Get the stages timed, in order."""
+        return [stage for _, stage, _ in self.timings]
+
+    def on_timing(self, cookie_name: str, stage: str, seconds: float) -> None:
+        """Record the time spent in a stage."""
+        self.timings.append((cookie_name, stage, seconds))
+
+    def on_size(self, cookie_name: str, direction: str, size: int) -> None:
+        """Record the size of a signed cookie value."""
+        self.sizes.append((cookie_name, direction, size))
+
+    def on_outcome(self, cookie_name: str, outcome: str) -> None:
+        """Record the outcome of reading or writing a cookie."""
+        self.outcomes.append((cookie_name, outcome))
+
+
+def create_tracer() -> typing.Tuple[CookieTracer, InMemorySpanExporter]:
+    """Create a cookie tracer that exports spans to memory."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    return CookieTracer(provider.get_tracer('test')), exporter
+
+
+def get_spans(exporter: InMemorySpanExporter) -> typing.List[typing.Any]:
+    """Get the finished spans exported to memory."""
+    return list(exporter.get_finished_spans())
+
+
 class SignedCookieMiddlewareTestsForStarletteBase(typing.Generic[TMiddleware, TData]):
     """Base tests for a SignedCookieMiddleware for Starlette."""
 
@@ -44,13 +104,14 @@ class SignedCookieMiddlewareTestsForStarletteBase(typing.Generic[TMiddleware, TD
     def create_app(
         self,
         *,
-        secret: typing.Optional[typing.Union[str, bytes]] = None,
+        secret: typing.Optional[Secrets] = None,
         state_attribute_name: typing.Optional[str] = None,
         cookie_name: typing.Optional[str] = None,
         cookie_ttl: typing.Optional[int] = None,
         cookie_properties: typing.Optional[CookieProperties] = None,
         signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
         routes: typing.Optional[typing.List[Route]] = None,
+        **kwargs: typing.Any,
     ) -> Starlette:
         """Create a FastAPI application for the tests."""
         if state_attribute_name is None:
@@ -64,101 +125,1114 @@ class SignedCookieMiddlewareTestsForStarletteBase(typing.Generic[TMiddleware, TD
                 'hello': 'world',
             })
 
-        def cookie_endpoint(request: Request) -> JSONResponse:
-            """Endpoint that writes a cookie."""
-            cookie_data = getattr(request.state, state_attr)
-            modified_data = self.modify_cookie_value(cookie_data.data)
-            cookie_data.data = modified_data
+        def cookie_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that writes a cookie."""
+            cookie_data = getattr(request.state, state_attr)
+            modified_data = self.modify_cookie_value(cookie_data.data)
+            cookie_data.data = modified_data
+
+            return JSONResponse()
+
+        all_routes = [
+            Route('/', root),
+            Route('/cookie', cookie_endpoint),
+        ]
+        if routes:
+            all_routes.extend(routes)
+
+        middleware = (
+            Middleware(
+                self.middleware_class,
+                secret=self.secret if secret is None else secret,
+                state_attribute_name=state_attr,
+                cookie_name=self.cookie_name if cookie_name is None else cookie_name,
+                cookie_ttl=self.cookie_ttl if cookie_ttl is None else cookie_ttl,
+                cookie_properties=cookie_properties,
+                signer_kwargs=signer_kwargs,
+                **kwargs,
+            ),
+        )
+
+        app = Starlette(debug=True, routes=all_routes, middleware=middleware)
+
+        return app
+
+    def create_test_client(
+        self,
+        *,
+        secret: typing.Optional[Secrets] = None,
+        state_attribute_name: typing.Optional[str] = None,
+        cookie_name: typing.Optional[str] = None,
+        cookie_ttl: typing.Optional[int] = None,
+        cookie_properties: typing.Optional[CookieProperties] = None,
+        signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        routes: typing.Optional[typing.List[Route]] = None,
+        **kwargs: typing.Any,
+    ) -> TestClient:
+        """Create a test client directly."""
+        app = self.create_app(
+            secret=secret,
+            state_attribute_name=state_attribute_name,
+            cookie_name=cookie_name,
+            cookie_ttl=cookie_ttl,
+            cookie_properties=cookie_properties,
+            signer_kwargs=signer_kwargs,
+            routes=routes,
+            **kwargs,
+        )
+
+        return TestClient(app)
+
+    def test_state_is_used(self) -> None:
+        """Test that `request.state` is used."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that asserts the state value."""
+            assert 'existing' == request.state.msgs.data
+            assert request.state.msgs.exc is None
+
+            return JSONResponse()
+
+        client = self.create_test_client(
+            state_attribute_name='msgs',
+            routes=[
+                Route('/state', state_endpoint),
+            ],
+        )
+
+        with mock.patch.object(
+                self.middleware_class,
+                'read_cookie',
+                return_value='existing',
+        ) as mock_read_cookie:
+            response = client.get('/state')
+
+        assert 200 == response.status_code
+        assert response.json() is None
+        mock_read_cookie.assert_called_once()
+
+    def test_middleware_does_nothing_for_endpoints_that_wont_use_it(self) -> None:
+        """Test that the middleware does not interfere with endpoints that won't use it."""
+        client = self.create_test_client()
+
+        with mock.patch.object(self.middleware_class, 'write_cookie') as mock_write_cookie:
+            response = client.get('/')
+
+        assert 200 == response.status_code
+        assert {
+            'hello': 'world',
+        } == response.json()
+        mock_write_cookie.assert_not_called()
+
+    def test_middleware_ignores_non_http_scopes(self) -> None:
+        """Test that the middleware passes through non HTTP scopes, such as lifespan."""
+        client = self.create_test_client()
+
+        with mock.patch.object(self.middleware_class, 'read_cookie') as mock_read_cookie:
+            with client:  # Runs the lifespan protocol
+                pass
+
+        mock_read_cookie.assert_not_called()
+
+    def test_cookie_is_written_for_streaming_responses(self) -> None:
+        """Test that the cookie is written in the response start of a streaming response."""
+
+        def stream_endpoint(request: Request) -> StreamingResponse:
+            """Endpoint that writes a cookie and streams the response."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            cookie_data.data = self.modify_cookie_value(cookie_data.data)
+
+            return StreamingResponse(iter((b'some', b' ', b'chunks')))
+
+        client = self.create_test_client(
+            routes=[
+                Route('/stream', stream_endpoint),
+            ],
+        )
+
+        response = client.get('/stream')
+
+        assert 200 == response.status_code
+        assert b'some chunks' == response.content
+        assert [self.cookie_name] == response.cookies.keys()
+
+    def create_middleware(self, **kwargs: typing.Any) -> typing.Any:
+        """Create a middleware instance directly, wrapping a dummy app."""
+        kwargs.setdefault('secret', self.secret)
+        kwargs.setdefault('state_attribute_name', self.state_attribute_name)
+        kwargs.setdefault('cookie_name', self.cookie_name)
+        kwargs.setdefault('cookie_ttl', self.cookie_ttl)
+
+        return self.middleware_class(mock.AsyncMock(), **kwargs)  # type: ignore
+
+    def test_signer_is_cached(self) -> None:
+        """Test that the signer is created only once."""
+        middleware = self.create_middleware()
+
+        with mock.patch.object(
+                self.middleware_class,
+                'get_signer',
+                wraps=middleware.get_signer,
+        ) as mock_get_signer:
+            middleware.unsign(middleware.sign(self.modify_cookie_value(None)))
+            middleware.sign(self.modify_cookie_value(None))
+
+        mock_get_signer.assert_called_once()
+        assert middleware.signer is middleware.signer
+
+    @pytest.mark.parametrize(
+        ('attribute', 'value'),
+        (
+            ('secret', b'anothersecretsecret'),
+            ('signer_kwargs', {'digest_size': 32}),
+            ('cookie_name', 'another_cookie'),
+            ('cookie_ttl', 120),
+        ),
+    )
+    def test_signer_is_reset(self, attribute: str, value: typing.Any) -> None:
+        """Test that the cached signer is reset when an attribute it depends on changes."""
+        middleware = self.create_middleware()
+        signer = middleware.signer
+
+        setattr(middleware, attribute, value)
+
+        assert signer is not middleware.signer
+
+    def test_signer_is_reset_manually(self) -> None:
+        """Test that the cached signer can be reset manually."""
+        middleware = self.create_middleware()
+        signer = middleware.signer
+
+        middleware.reset_signer()
+
+        assert signer is not middleware.signer
+
+    def test_signer_kwargs_are_not_mutated(self) -> None:
+        """Test that the signer kwargs are not mutated when creating the signer."""
+        signer_kwargs = {'deterministic': True, 'personalisation': 'person'}
+        middleware = self.create_middleware(signer_kwargs=signer_kwargs)
+
+        middleware.get_signer()
+
+        assert {'deterministic': True, 'personalisation': 'person'} == signer_kwargs
+        assert signer_kwargs == middleware.signer_kwargs
+
+    def test_many_payloads_are_signed_with_the_same_signer(self) -> None:
+        """Test that signing and unsigning many payloads doesn't create a signer each."""
+        middleware = self.create_middleware()
+        items = [self.modify_cookie_value(None) for _ in range(10)]
+
+        with mock.patch.object(
+                self.middleware_class,
+                'get_signer',
+                wraps=middleware.get_signer,
+        ) as mock_get_signer:
+            signed_items = middleware.sign_many(iter(items))
+            mock_get_signer.assert_not_called()  # Payloads are signed lazily
+            assert items == list(middleware.unsign_many(signed_items))
+
+        mock_get_signer.assert_called_once()
+
+    def test_many_payloads_are_signed_in_processes(self) -> None:
+        """Test that many payloads can be signed and unsigned in worker processes."""
+        middleware = self.create_middleware(
+            secret=(self.secret, b'oldsecretoldsecret'),
+            cookie_cache_size=10,
+        )
+        items = [self.modify_cookie_value(None) for _ in range(10)]
+
+        signed_items = list(middleware.sign_many(items, processes=2, chunk_size=3))
+
+        assert items == list(middleware.unsign_many(signed_items, processes=2, chunk_size=3))
+        assert items == list(middleware.unsign_many(signed_items))
+
+    def test_middleware_is_picklable(self) -> None:
+        """Test that the middleware is pickled without its app, signers and caches."""
+        middleware = self.create_middleware(cookie_cache_size=10, observer=RecordingObserver())
+        signed_data = middleware.sign(self.modify_cookie_value(None))
+
+        unpickled = pickle.loads(pickle.dumps(middleware))
+
+        assert unpickled.app is None
+        assert unpickled.verified_cache is None
+        assert unpickled.observer is None
+        assert middleware.unsign(signed_data) == unpickled.unsign(signed_data)
+        assert middleware.signer is not None  # The original middleware is left untouched
+
+    def test_expired_payloads_are_rejected_in_processes(self) -> None:
+        """Test that errors unsigning payloads in worker processes are raised."""
+        middleware = self.create_middleware()
+        with mock.patch('blake2signer.bases.time', return_value=time.time() - 70):
+            signed_data = middleware.sign(self.modify_cookie_value(None))
+
+        with pytest.raises(ExpiredSignatureError):
+            list(middleware.unsign_many([signed_data], processes=1))
+
+    def test_lazy_cookie_is_not_read_if_not_used(self) -> None:
+        """Test that a lazy cookie is not read when the handler doesn't use it."""
+        client = self.create_test_client(lazy=True)
+
+        with mock.patch.object(self.middleware_class, 'unsign') as mock_unsign:
+            with mock.patch.object(self.middleware_class, 'write_cookie') as mock_write_cookie:
+                response = client.get(
+                    '/',
+                    cookies={self.cookie_name: 'some data'},
+                )
+
+        assert 200 == response.status_code
+        mock_unsign.assert_not_called()
+        mock_write_cookie.assert_not_called()
+
+    def test_lazy_cookie_is_read_once(self) -> None:
+        """Test that a lazy cookie is read only once, when the handler uses it."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that asserts the state value."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            assert cookie_data.data == 'some data'
+            assert cookie_data.exc is None
+            assert cookie_data.data == 'some data'
+
+            return JSONResponse()
+
+        client = self.create_test_client(
+            lazy=True,
+            routes=[
+                Route('/state', state_endpoint),
+            ],
+        )
+
+        with mock.patch.object(
+                self.middleware_class,
+                'unsign',
+                return_value='some data',
+        ) as mock_unsign:
+            response = client.get(
+                '/state',
+                cookies={self.cookie_name: 'some data'},
+            )
+
+        assert 200 == response.status_code
+        mock_unsign.assert_called_once_with('some data')
+
+    def test_lazy_cookie_state_signer_exception(self) -> None:
+        """Test that we can read the signer exception from a lazy cookie."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that asserts the state value."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            assert isinstance(cookie_data.exc, InvalidSignatureError)
+            assert cookie_data.data is None
+
+            return JSONResponse()
+
+        client = self.create_test_client(
+            lazy=True,
+            routes=[
+                Route('/state', state_endpoint),
+            ],
+        )
+
+        with mock.patch.object(
+                self.middleware_class,
+                'unsign',
+                side_effect=InvalidSignatureError,
+        ) as mock_unsign:
+            response = client.get(
+                '/state',
+                cookies={self.cookie_name: 'some data'},
+            )
+
+        assert 200 == response.status_code
+        mock_unsign.assert_called_once_with('some data')
+
+    def test_lazy_cookie_is_written_without_being_read_first(self) -> None:
+        """Test that a lazy cookie set without reading it is compared and written."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that sets the state value without reading it."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            cookie_data.data = 'new data'
+
+            return JSONResponse()
+
+        client = self.create_test_client(
+            lazy=True,
+            routes=[
+                Route('/state', state_endpoint),
+            ],
+        )
+
+        with mock.patch.object(self.middleware_class, 'write_cookie') as mock_write_cookie:
+            with mock.patch.object(
+                    self.middleware_class,
+                    'should_write_cookie',
+                    return_value=True,
+            ) as mock_should_write_cookie:
+                with mock.patch.object(
+                        self.middleware_class,
+                        'unsign',
+                        return_value='some data',
+                ) as mock_unsign:
+                    response = client.get(
+                        '/state',
+                        cookies={self.cookie_name: 'some data'},
+                    )
+
+        assert 200 == response.status_code
+        mock_unsign.assert_called_once_with('some data')
+        mock_should_write_cookie.assert_called_once_with(
+            new_data='new data',
+            prev_data='some data',
+        )
+        mock_write_cookie.assert_called_once()
+        assert 'new data' == mock_write_cookie.call_args[0][0]
+
+    def test_lazy_cookie_signer_exception_can_be_reset(self) -> None:
+        """Test that the signer exception of a lazy cookie can be set."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that resets the exception."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            cookie_data.exc = None
+            assert cookie_data.exc is None
+
+            return JSONResponse()
+
+        client = self.create_test_client(
+            lazy=True,
+            routes=[
+                Route('/state', state_endpoint),
+            ],
+        )
+
+        with mock.patch.object(
+                self.middleware_class,
+                'unsign',
+                side_effect=InvalidSignatureError,
+        ) as mock_unsign:
+            response = client.get(
+                '/state',
+                cookies={self.cookie_name: 'some data'},
+            )
+
+        assert 200 == response.status_code
+        mock_unsign.assert_called_once_with('some data')
+
+    @pytest.mark.parametrize(
+        ('include_paths', 'exclude_paths', 'path', 'handled'),
+        (
+            (None, None, '/filtered', True),
+            (('/',), None, '/filtered', True),
+            (('/filt',), None, '/filtered', False),
+            ((re.compile(r'/f\w+'),), None, '/filtered', True),
+            (('/other',), None, '/filtered', False),
+            (None, ('/filtered',), '/filtered', False),
+            (None, (re.compile('/other'),), '/filtered', True),
+            (('/filtered',), ('/filtered',), '/filtered', False),
+        ),
+    )
+    def test_include_exclude_paths(
+        self,
+        include_paths: typing.Optional[typing.Tuple[typing.Any, ...]],
+        exclude_paths: typing.Optional[typing.Tuple[typing.Any, ...]],
+        path: str,
+        handled: bool,
+    ) -> None:
+        """Test that the middleware acts only on included, and not excluded, paths."""
+
+        def optional_state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that writes a cookie, if the state was set."""
+            cookie_data = getattr(request.state, self.state_attribute_name, None)
+            if cookie_data is not None:
+                cookie_data.data = self.modify_cookie_value(cookie_data.data)
+
+            return JSONResponse({'state': cookie_data is not None})
+
+        client = self.create_test_client(
+            include_paths=include_paths,
+            exclude_paths=exclude_paths,
+            routes=[
+                Route('/filtered', optional_state_endpoint),
+            ],
+        )
+
+        with mock.patch.object(
+                self.middleware_class,
+                'read_cookie',
+                return_value=None,
+        ) as mock_read_cookie:
+            response = client.get(path, cookies={self.cookie_name: 'some data'})
+
+        assert 200 == response.status_code
+        assert {'state': handled} == response.json()
+        assert handled is mock_read_cookie.called
+        assert handled is (self.cookie_name in response.cookies)
+
+    def test_cookie_is_chunked(self) -> None:
+        """Test that a big cookie is split in chunks, and reassembled when read."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that returns the state value."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            assert cookie_data.exc is None
+
+            return JSONResponse({'data': cookie_data.data})
+
+        client = self.create_test_client(
+            cookie_chunk_size=10,
+            routes=[
+                Route('/state', state_endpoint),
+            ],
+        )
+
+        response = client.get('/cookie')
+
+        assert 200 == response.status_code
+        chunks = int(response.cookies[self.cookie_name] or '')
+        assert 1 < chunks
+        assert sorted(
+            [self.cookie_name] + [f'{self.cookie_name}.{index}' for index in range(chunks)],
+        ) == sorted(response.cookies.keys())
+
+        response = client.get('/state')
+
+        assert 200 == response.status_code
+        assert {'data': self.modify_cookie_value(None)} == response.json()
+
+    def test_cookie_header_is_scanned_once(self) -> None:
+        """Test that the cookie header is scanned once per request, even if used many times."""
+        secrets = (b'new secret, for newer cookies', b'old secret, that is rotated')
+        client = self.create_test_client(secret=secrets, cookie_chunk_size=10, offload_threshold=1)
+        cookie = self.create_middleware(secret=secrets[1]).sign(self.modify_cookie_value(None))
+
+        with mock.patch(
+                'asgi_signing_middleware.cookie.CookieScanner',
+                wraps=CookieScanner,
+        ) as mock_scanner:
+            response = client.get('/cookie', cookies={self.cookie_name: cookie})
+
+        assert 200 == response.status_code
+        assert self.cookie_name in response.cookies
+        mock_scanner.assert_called_once()
+
+    def test_cookie_stale_chunks_are_expired(self) -> None:
+        """Test that chunks no longer used are expired when writing the cookie."""
+        middleware = self.create_middleware(cookie_chunk_size=4096)
+        message: typing.Dict[str, typing.Any] = {'type': 'http.response.start', 'status': 200}
+
+        middleware.write_cookie(
+            self.modify_cookie_value(None),
+            ResponseStartMessage(message),
+            prev_chunks=2,
+        )
+
+        headers = [value.decode() for _, value in message['headers']]
+        assert 3 == len(headers)
+        assert headers[0].startswith(f'{self.cookie_name}=')
+        assert 'Max-Age=0' not in headers[0]
+        for index, header in enumerate(headers[1:]):
+            assert header.startswith(f'{self.cookie_name}.{index}=')
+            assert 'Max-Age=0' in header
+
+    def test_cookie_stale_chunks_manifest_is_not_trusted(self) -> None:
+        """Test that only chunks that may be in the request are expired."""
+        client = self.create_test_client(cookie_chunk_size=4096)
+
+        response = client.get('/cookie', cookies={self.cookie_name: '20000'})
+
+        assert 200 == response.status_code
+        assert 2 == len(response.raw.headers.getlist('set-cookie'))
+
+    @pytest.mark.parametrize(
+        ('offload_threshold', 'offloaded'),
+        (
+            (None, False),
+            (0, True),
+            (4096, False),
+        ),
+    )
+    def test_cookie_is_offloaded_to_a_thread(
+        self,
+        offload_threshold: typing.Optional[int],
+        offloaded: bool,
+    ) -> None:
+        """Test that the cookie is read and written in a worker thread past the threshold."""
+        client = self.create_test_client(offload_threshold=offload_threshold)
+
+        with mock.patch(
+                'asgi_signing_middleware.cookie.run_in_threadpool',
+                wraps=run_in_threadpool,
+        ) as mock_run_in_threadpool:
+            response = client.get('/cookie')
+
+        assert 200 == response.status_code
+        assert self.modify_cookie_value(None) == self.create_middleware().unsign(
+            response.cookies[self.cookie_name] or '',
+        )
+        assert (2 if offloaded else 0) == mock_run_in_threadpool.call_count
+
+    def test_payload_size_is_estimated(self) -> None:
+        """Test that the payload size is the size of the cookie, or of the data to sign."""
+        middleware = self.create_middleware(offload_threshold=4096)
+        cookie = f'_ga={"a" * 3000}; {self.cookie_name}={"b" * 100}'.encode()
+        request = Request({'type': 'http', 'headers': [(b'cookie', cookie)]})
+
+        assert 100 == middleware.estimate_payload_size(request)
+        assert 12 == middleware.estimate_payload_size(request, 'c' * 10)
+        assert 202 == middleware.estimate_payload_size(request, 'c' * 200)
+
+    def test_other_cookies_are_not_offloaded(self) -> None:
+        """Test that other cookies in the request don't make reading the cookie offloaded."""
+        middleware = self.create_middleware(offload_threshold=1024)
+        cookie = f'_ga={"a" * 3000}'.encode()
+        request = Request({'type': 'http', 'headers': [(b'cookie', cookie)]})
+
+        assert not middleware.should_offload(request)
+
+    def test_cookie_chunks_manifest_is_not_trusted(self) -> None:
+        """Test that a manifest with more chunks than available ones fails the signature."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that asserts the state value."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            assert cookie_data.data is None
+            assert cookie_data.exc is not None
+
+            return JSONResponse()
+
+        client = self.create_test_client(
+            routes=[
+                Route('/state', state_endpoint),
+            ],
+        )
+
+        with mock.patch.object(
+                self.middleware_class,
+                'unsign',
+                side_effect=InvalidSignatureError,
+        ) as mock_unsign:
+            response = client.get(
+                '/state',
+                cookies={
+                    self.cookie_name: '1000000',
+                    f'{self.cookie_name}.0': 'some',
+                    f'{self.cookie_name}.1': 'data',
+                },
+            )
+
+        assert 200 == response.status_code
+        mock_unsign.assert_called_once_with('somedata')
+
+    def test_cookie_not_modified_is_not_compared(self) -> None:
+        """Test that the cookie data is not compared, nor written, if it wasn't modified."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that reads the cookie data without modifying it."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            assert cookie_data.data is not None
+            assert not cookie_data.modified
+
+            return JSONResponse()
+
+        client = self.create_test_client(routes=[Route('/state', state_endpoint)])
+        cookie = self.create_middleware().sign(self.modify_cookie_value(None))
+
+        with mock.patch.object(
+                self.middleware_class,
+                'should_write_cookie',
+        ) as mock_should_write_cookie:
+            response = client.get('/state', cookies={self.cookie_name: cookie})
+
+        assert 200 == response.status_code
+        assert self.cookie_name not in response.cookies
+        mock_should_write_cookie.assert_not_called()
+
+    def test_cookie_marked_as_modified_is_written(self) -> None:
+        """Test that the cookie is written if marked as modified, even if data is the same."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that marks the cookie data as modified."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            cookie_data.modified = True
+
+            return JSONResponse()
+
+        client = self.create_test_client(routes=[Route('/state', state_endpoint)])
+        cookie = self.create_middleware().sign(self.modify_cookie_value(None))
+
+        with mock.patch.object(self.middleware_class, 'write_cookie') as mock_write_cookie:
+            response = client.get('/state', cookies={self.cookie_name: cookie})
+
+        assert 200 == response.status_code
+        mock_write_cookie.assert_called_once()
+        assert self.modify_cookie_value(None) == mock_write_cookie.call_args[0][0]
+
+    def sign_at(self, data: TData, age: int, **kwargs: typing.Any) -> str:
+        """Sign data as if it was signed `age` seconds ago."""
+        with mock.patch('blake2signer.bases.time', return_value=time.time() - age):
+            signed: str = self.create_middleware(**kwargs).sign(data)
+
+        return signed
+
+    def create_cookie_request(self, cookie: str) -> Request:
+        """Create a request carrying given signed cookie value."""
+        header = f'{self.cookie_name}={cookie}'.encode()
+
+        return Request({'type': 'http', 'headers': [(b'cookie', header)]})
+
+    def test_verified_cookies_are_cached(self) -> None:
+        """Test that a cookie sent again is read from the cache, skipping its signature."""
+        middleware = self.create_middleware(cookie_cache_size=10)
+        data = self.modify_cookie_value(None)
+        request = self.create_cookie_request(middleware.sign(data))
+
+        with mock.patch.object(
+                self.middleware_class,
+                'unsign_payload',
+                autospec=True,
+                side_effect=self.middleware_class.unsign_payload,  # type: ignore[attr-defined]
+        ) as mock_unsign_payload:
+            assert data == middleware.read_cookie(request)
+            assert data == middleware.read_cookie(request)
+
+        mock_unsign_payload.assert_called_once()
+        assert 1 == middleware.verified_cache.stats.hits
+        assert 1 == middleware.verified_cache.stats.misses
+
+    def test_cached_cookies_expire_with_their_signature(self) -> None:
+        """Test that the cookie time-to-live is enforced for cached cookies."""
+        middleware = self.create_middleware(cookie_cache_size=10)
+        request = self.create_cookie_request(self.sign_at(self.modify_cookie_value(None), 50))
+        middleware.read_cookie(request)
+
+        with mock.patch('asgi_signing_middleware.cache.time', return_value=time.time() + 20):
+            with mock.patch('blake2signer.bases.time', return_value=time.time() + 20):
+                with pytest.raises(ExpiredSignatureError):
+                    middleware.read_cookie(request)
+
+        assert 1 == middleware.verified_cache.stats.expirations
+        assert 0 == len(middleware.verified_cache)
+
+    def test_cached_cookies_are_verified_by_key_id(self) -> None:
+        """Test that cached cookies are timestamped with the signer of their key ID."""
+        secrets = (b'newsecretnewsecret', self.secret)
+        middleware = self.create_middleware(secret=secrets, cookie_cache_size=10)
+        data = self.modify_cookie_value(None)
+        signed = self.sign_at(data, 10, secret=secrets)
+
+        assert data == middleware.read_cookie(self.create_cookie_request(signed))
+
+        entry = middleware.verified_cache.get(signed, max_age=self.cookie_ttl)
+        assert entry is not None
+        assert 9 <= time.time() - entry.signed_at <= 11
+
+    def test_verified_cache_is_cleared_with_the_signer(self) -> None:
+        """Test that cached cookies are forgotten when the signer changes."""
+        middleware = self.create_middleware(cookie_cache_size=10)
+        request = self.create_cookie_request(middleware.sign(self.modify_cookie_value(None)))
+        middleware.read_cookie(request)
+
+        middleware.secret = b'othersecretothersecret'
+
+        assert 0 == len(middleware.verified_cache)
+        with pytest.raises(InvalidSignatureError):
+            middleware.read_cookie(request)
+
+    def test_rejected_cookies_are_cached(self) -> None:
+        """Test that a rejected cookie sent again fails without checking its signature."""
+        middleware = self.create_middleware(rejected_cache_size=10)
+        request = self.create_cookie_request('tampered.cookie')
+
+        with mock.patch.object(
+                self.middleware_class,
+                'unsign',
+                autospec=True,
+                side_effect=self.middleware_class.unsign,  # type: ignore[attr-defined]
+        ) as mock_unsign:
+            for _ in range(3):
+                with pytest.raises(InvalidSignatureError):
+                    middleware.read_cookie(request)
+
+        mock_unsign.assert_called_once()
+        assert 2 == middleware.rejected_cache.stats.hits
+        assert {'InvalidSignatureError': 3} == middleware.signature_errors
+
+    @pytest.mark.parametrize('rejected_cache_size', (None, 10))
+    def test_expired_cookies_are_not_rejected(
+        self,
+        rejected_cache_size: typing.Optional[int],
+    ) -> None:
+        """Test that expired cookies are neither cached as rejected nor counted as failures."""
+        middleware = self.create_middleware(
+            rejected_cache_size=rejected_cache_size,
+            cookie_refresh_ratio=0.5,
+        )
+        data = self.modify_cookie_value(None)
+        request = self.create_cookie_request(self.sign_at(data, 40, cookie_refresh_ratio=0.5))
+
+        assert (data, None, True) == middleware.load_cookie(request)
+        assert (data, None, True) == middleware.load_cookie(request)
+        assert not middleware.signature_errors
+        assert not middleware.rejected_cache
+
+    def test_rejected_cache_is_cleared_with_the_signer(self) -> None:
+        """Test that rejected cookies are forgotten when the signer changes."""
+        other_secret = b'othersecretothersecret'
+        middleware = self.create_middleware(rejected_cache_size=10)
+        data = self.modify_cookie_value(None)
+        request = self.create_cookie_request(self.sign_at(data, 0, secret=other_secret))
+        with pytest.raises(InvalidSignatureError):
+            middleware.read_cookie(request)
+
+        middleware.secret = other_secret
+
+        assert 0 == len(middleware.rejected_cache)
+        assert data == middleware.read_cookie(request)
+
+    def test_cookie_caches_are_disabled_by_default(self) -> None:
+        """Test that there are no verified nor rejected cookie caches by default."""
+        middleware = self.create_middleware()
+
+        assert middleware.verified_cache is None
+        assert middleware.rejected_cache is None
+
+    def test_observer_is_notified_of_every_stage(self) -> None:
+        """Test that the observer is notified of the stages, sizes and outcomes."""
+        observer = RecordingObserver()
+        client = self.create_test_client(observer=observer)
+
+        response = client.get('/cookie')
+        signed_size = len(response.cookies.get(self.cookie_name) or '')
+
+        assert ['parse', 'handler', 'should_write', 'sign', 'set_cookie'] == observer.stages
+        assert [(self.cookie_name, 'out', signed_size)] == observer.sizes
+        assert [(self.cookie_name, 'missing'), (self.cookie_name, 'written')] == observer.outcomes
+        assert all(seconds >= 0 for _, _, seconds in observer.timings)
+
+        observer.timings.clear()
+        client.get('/cookie')
+
+        assert ['parse', 'unsign', 'handler', 'should_write'] == observer.stages[:4]
+        assert (self.cookie_name, 'in', signed_size) == observer.sizes[1]
+        assert (self.cookie_name, 'valid') == observer.outcomes[2]
+
+    def test_observer_is_notified_of_skipped_cookies(self) -> None:
+        """Test that the observer is notified when the cookie is not written."""
+        observer = RecordingObserver()
+        client = self.create_test_client(observer=observer)
+
+        client.get('/')
+
+        assert ['parse', 'handler'] == observer.stages
+        assert not observer.sizes
+        assert [(self.cookie_name, 'missing'), (self.cookie_name, 'skipped')] == observer.outcomes
+
+    def test_observer_is_notified_of_rejected_cookies(self) -> None:
+        """Test that the observer is notified of tampered and expired cookies."""
+        observer = RecordingObserver()
+        middleware = self.create_middleware(observer=observer)
+        data = self.modify_cookie_value(None)
+
+        middleware.load_cookie(self.create_cookie_request('tampered.cookie'))
+        middleware.load_cookie(self.create_cookie_request(self.sign_at(data, 70)))
+
+        assert [(self.cookie_name, 'tampered'), (self.cookie_name, 'expired')] == (
+            observer.outcomes
+        )
+
+    def test_refreshed_cookies_are_not_observed_as_expired(self) -> None:
+        """Test that cookies recovered by the sliding expiry are reported as refreshed."""
+        observer = RecordingObserver()
+        tracer, exporter = create_tracer()
+        middleware = self.create_middleware(
+            observer=observer,
+            tracer=tracer,
+            cookie_refresh_ratio=0.5,
+        )
+        data = self.modify_cookie_value(None)
+
+        _, exception, refresh = middleware.load_cookie(
+            self.create_cookie_request(self.sign_at(data, 40)),
+        )
+
+        assert exception is None
+        assert refresh
+        assert [(self.cookie_name, 'refreshed')] == observer.outcomes
+        assert 'refreshed' == get_spans(exporter)[-1].attributes['cookie.outcome']
+
+    def test_unchanged_data_is_observed_as_skipped(self) -> None:
+        """Test that the observer is notified when the data is not worth writing."""
+        observer = RecordingObserver()
+        middleware = self.create_middleware(observer=observer)
+        data = self.modify_cookie_value(None)
+
+        with mock.patch.object(middleware, 'should_write_cookie', return_value=False):
+            middleware.write_cookie_if_necessary(
+                new_data=data,
+                prev_data=data,
+                response=mock.MagicMock(),
+            )
+
+        assert ['should_write'] == observer.stages
+        assert [(self.cookie_name, 'skipped')] == observer.outcomes
+
+    def test_tracer_spans_reading_and_writing(self) -> None:
+        """Test that the tracer opens spans around reading, unsigning, signing and writing."""
+        tracer, exporter = create_tracer()
+        client = self.create_test_client(tracer=tracer)
+
+        response = client.get('/cookie')
+        signed_size = len(response.cookies.get(self.cookie_name) or '')
+
+        read_span, sign_span, write_span = get_spans(exporter)
+        assert ['read_cookie', 'sign', 'write_cookie'] == [
+            read_span.name, sign_span.name, write_span.name,
+        ]
+        assert self.cookie_name == read_span.attributes['cookie.name']
+        assert 'missing' == read_span.attributes['cookie.outcome']
+        assert write_span.context.span_id == sign_span.parent.span_id
+        assert signed_size == write_span.attributes['cookie.size']
+        assert 'written' == write_span.attributes['cookie.outcome']
+
+        exporter.clear()
+        client.get('/cookie')
+
+        unsign_span, read_span = get_spans(exporter)[:2]
+        assert 'unsign' == unsign_span.name
+        assert read_span.context.span_id == unsign_span.parent.span_id
+        assert signed_size == read_span.attributes['cookie.size']
+        assert 'valid' == read_span.attributes['cookie.outcome']
+
+    @pytest.mark.parametrize(
+        ('age', 'outcome', 'error'),
+        (
+            (70, 'expired', 'ExpiredSignatureError'),
+            (None, 'tampered', 'InvalidSignatureError'),
+        ),
+    )
+    def test_tracer_spans_rejected_cookies(
+        self,
+        age: typing.Optional[int],
+        outcome: str,
+        error: str,
+    ) -> None:
+        """Test that rejected cookies are traced with their outcome and error."""
+        tracer, exporter = create_tracer()
+        middleware = self.create_middleware(tracer=tracer)
+        data = self.modify_cookie_value(None)
+        cookie = 'tampered.cookie' if age is None else self.sign_at(data, age)
+
+        middleware.load_cookie(self.create_cookie_request(cookie))
+
+        unsign_span, read_span = get_spans(exporter)
+        assert outcome == read_span.attributes['cookie.outcome']
+        assert f'blake2signer.errors.{error}' == (
+            unsign_span.events[0].attributes['exception.type']
+        )
+
+    @pytest.mark.parametrize('lazy', (False, True))
+    @pytest.mark.parametrize(
+        ('cookie_refresh_ratio', 'age', 'refreshed'),
+        (
+            (None, 40, False),
+            (0.5, 10, False),
+            (0.5, 40, True),
+            (0.5, 70, False),  # Expired
+        ),
+    )
+    def test_cookie_is_refreshed(
+        self,
+        cookie_refresh_ratio: typing.Optional[float],
+        age: int,
+        refreshed: bool,
+        lazy: bool,
+    ) -> None:
+        """Test that the cookie is refreshed when it's older than its refresh age."""
+        data = self.modify_cookie_value(None)
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that reads the cookie data."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            if age < self.cookie_ttl:
+                assert data == cookie_data.data
+                assert cookie_data.exc is None
+            else:
+                assert cookie_data.data is None
+                assert isinstance(cookie_data.exc, ExpiredSignatureError)
 
-            return JSONResponse()
+            assert refreshed is cookie_data.refresh
 
-        all_routes = [
-            Route('/', root),
-            Route('/cookie', cookie_endpoint),
-        ]
-        if routes:
-            all_routes.extend(routes)
+            return JSONResponse()
 
-        middleware = (
-            Middleware(
-                self.middleware_class,
-                secret=self.secret if secret is None else secret,
-                state_attribute_name=state_attr,
-                cookie_name=self.cookie_name if cookie_name is None else cookie_name,
-                cookie_ttl=self.cookie_ttl if cookie_ttl is None else cookie_ttl,
-                cookie_properties=cookie_properties,
-                signer_kwargs=signer_kwargs,
-            ),
+        client = self.create_test_client(
+            routes=[Route('/state', state_endpoint)],
+            cookie_refresh_ratio=cookie_refresh_ratio,
+            lazy=lazy,
         )
+        cookie = self.sign_at(data, age, cookie_refresh_ratio=cookie_refresh_ratio)
 
-        app = Starlette(debug=True, routes=all_routes, middleware=middleware)
+        response = client.get('/state', cookies={self.cookie_name: cookie})
 
-        return app
+        assert 200 == response.status_code
+        assert refreshed is (self.cookie_name in response.cookies)
+        if refreshed:
+            refreshed_cookie = response.cookies[self.cookie_name] or ''
+            assert cookie != refreshed_cookie
+            assert data == self.create_middleware().unsign(refreshed_cookie)
 
-    def create_test_client(
+    @pytest.mark.parametrize(
+        ('kwargs', 'age', 'refreshed'),
+        (
+            ({'cookie_refresh_ratio': 0.5}, 10, False),
+            ({'cookie_refresh_ratio': 0.5}, 40, True),
+            ({'secret': (b'new secret, for newer cookies', secret)}, 10, True),  # Old key
+        ),
+    )
+    def test_lazy_cookie_is_refreshed_if_not_used(
         self,
-        *,
-        secret: typing.Optional[typing.Union[str, bytes]] = None,
-        state_attribute_name: typing.Optional[str] = None,
-        cookie_name: typing.Optional[str] = None,
-        cookie_ttl: typing.Optional[int] = None,
-        cookie_properties: typing.Optional[CookieProperties] = None,
-        signer_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
-        routes: typing.Optional[typing.List[Route]] = None,
-    ) -> TestClient:
-        """Create a test client directly."""
-        app = self.create_app(
-            secret=secret,
-            state_attribute_name=state_attribute_name,
-            cookie_name=cookie_name,
-            cookie_ttl=cookie_ttl,
-            cookie_properties=cookie_properties,
-            signer_kwargs=signer_kwargs,
-            routes=routes,
-        )
+        kwargs: typing.Dict[str, typing.Any],
+        age: int,
+        refreshed: bool,
+    ) -> None:
+        """Test that a lazy cookie the handler doesn't use is read to refresh it if due."""
+        data = self.modify_cookie_value(None)
+        client = self.create_test_client(lazy=True, **kwargs)
+        cookie = self.sign_at(data, age, cookie_refresh_ratio=0.5)
 
-        return TestClient(app)
+        response = client.get('/', cookies={self.cookie_name: cookie})
 
-    def test_state_is_used(self) -> None:
-        """Test that `request.state` is used."""
+        assert 200 == response.status_code
+        assert refreshed is (self.cookie_name in response.cookies)
+        if refreshed:
+            refreshed_cookie = response.cookies[self.cookie_name] or ''
+            assert data == self.create_middleware(**kwargs).unsign(refreshed_cookie)
+
+    def test_cookie_is_refreshed_regardless_of_should_write_cookie(self) -> None:
+        """Test that the cookie is refreshed even if the data is set to the same value."""
 
         def state_endpoint(request: Request) -> JSONResponse:
-            """Endpoint that asserts the state value."""
-            assert 'existing' == request.state.msgs.data
-            assert request.state.msgs.exc is None
+            """Endpoint that sets the cookie data to the same value."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            cookie_data.data = self.modify_cookie_value(None)
 
             return JSONResponse()
 
         client = self.create_test_client(
-            state_attribute_name='msgs',
-            routes=[
-                Route('/state', state_endpoint),
-            ],
+            routes=[Route('/state', state_endpoint)],
+            cookie_refresh_ratio=0.5,
         )
+        cookie = self.sign_at(self.modify_cookie_value(None), 40)
 
-        with mock.patch.object(
-                self.middleware_class,
-                'read_cookie',
-                return_value='existing',
-        ) as mock_read_cookie:
-            response = client.get('/state')
+        with mock.patch.object(self.middleware_class, 'write_cookie') as mock_write_cookie:
+            response = client.get('/state', cookies={self.cookie_name: cookie})
 
         assert 200 == response.status_code
-        assert response.json() is None
-        mock_read_cookie.assert_called_once()
+        mock_write_cookie.assert_called_once()
 
-    def test_middleware_does_nothing_for_endpoints_that_wont_use_it(self) -> None:
-        """Test that the middleware does not interfere with endpoints that won't use it."""
-        client = self.create_test_client()
+    def test_signature_max_age(self) -> None:
+        """Test that the signature max age depends on the refresh ratio."""
+        assert self.cookie_ttl == self.create_middleware().signature_max_age
+        assert 45 == self.create_middleware(cookie_refresh_ratio=0.75).signature_max_age
+
+    @pytest.mark.parametrize('cookie_refresh_ratio', (0, -0.5, 1.5, 2))
+    def test_wrong_cookie_refresh_ratio_is_rejected(self, cookie_refresh_ratio: float) -> None:
+        """Test that the refresh ratio must be a fraction of the cookie time-to-live."""
+        with pytest.raises(ValueError, match='refresh ratio'):
+            self.create_middleware(cookie_refresh_ratio=cookie_refresh_ratio)
+
+    def test_data_from_expired_not_implemented(self) -> None:
+        """Test that the sliding expiry is not supported by default."""
+        with pytest.raises(NotImplementedError, match='does not support the sliding expiry'):
+            SignedCookieMiddlewareBase.data_from_expired(
+                self.create_middleware(),
+                mock.Mock(),
+            )
 
-        with mock.patch.object(self.middleware_class, 'write_cookie') as mock_write_cookie:
-            response = client.get('/')
+    @pytest.mark.parametrize(
+        ('signing_secret', 'refreshed'),
+        (
+            (b'old secret, that is rotated', True),  # Before rotating keys: no key ID
+            ((b'old secret, that is rotated',), True),
+            ((b'new secret, for newer cookies', b'old secret, that is rotated'), False),
+        ),
+    )
+    def test_key_rotation(self, signing_secret: typing.Any, refreshed: bool) -> None:
+        """Test that cookies are verified with the secret of their key ID, and refreshed."""
+        secrets = (b'new secret, for newer cookies', b'old secret, that is rotated')
+        data = self.modify_cookie_value(None)
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that reads the cookie data."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            assert data == cookie_data.data
+            assert cookie_data.exc is None
+            assert refreshed is cookie_data.refresh
+
+            return JSONResponse()
+
+        client = self.create_test_client(routes=[Route('/state', state_endpoint)], secret=secrets)
+        cookie = self.create_middleware(secret=signing_secret).sign(data)
+
+        response = client.get('/state', cookies={self.cookie_name: cookie})
 
         assert 200 == response.status_code
-        assert {
-            'hello': 'world',
-        } == response.json()
-        mock_write_cookie.assert_not_called()
+        assert refreshed is (self.cookie_name in response.cookies)
+        if refreshed:
+            refreshed_cookie = response.cookies[self.cookie_name] or ''
+            middleware = self.create_middleware(secret=secrets)
+            assert refreshed_cookie.startswith(middleware.get_key_id(secrets[0]) + '~')
+            assert data == middleware.unsign(refreshed_cookie)
+
+    def test_key_rotation_unknown_key_id(self) -> None:
+        """Test that a cookie with an unknown key ID is handled as not having one."""
+        middleware = self.create_middleware(secret=(self.secret,))
+        signed = middleware.sign(self.modify_cookie_value(None))
+        key_id = middleware.get_key_id(self.secret)
+
+        with pytest.raises(InvalidSignatureError):
+            middleware.unsign(signed.replace(key_id, 'abcd', 1))
+
+        with pytest.raises(InvalidSignatureError):
+            self.create_middleware().unsign(signed)  # Not rotating keys
+
+    def test_key_rotation_signers(self) -> None:
+        """Test that a signer is created, and cached, per secret."""
+        secrets = (b'new secret, for newer cookies', b'old secret, that is rotated')
+        middleware = self.create_middleware(secret=secrets)
+
+        with mock.patch.object(
+                self.middleware_class,
+                'get_signer',
+                wraps=middleware.get_signer,
+        ) as mock_get_signer:
+            signers = middleware.signers
+            assert signers is middleware.signers
+
+        assert [mock.call(secret) for secret in secrets] == mock_get_signer.call_args_list
+        assert [middleware.get_key_id(secret) for secret in secrets] == list(signers)
+        assert signers[middleware.get_key_id(secrets[0])] is middleware.signer
+
+        middleware.secret = secrets[:1]
+        assert signers is not middleware.signers
+        assert 1 == len(middleware.signers)
+
+    def test_key_rotation_secrets_must_be_unique(self) -> None:
+        """Test that secrets must be unique."""
+        middleware = self.create_middleware(secret=(self.secret, self.secret))
+
+        with pytest.raises(ValueError, match='Secrets must be unique'):
+            middleware.signer  # pylint: disable=W0104
+
+    def test_get_key_id(self) -> None:
+        """Test that the key ID is a short identifier derived from the secret."""
+        middleware = self.create_middleware()
+
+        key_id = middleware.get_key_id(self.secret)
+
+        assert 4 == len(key_id)
+        assert key_id == middleware.get_key_id(self.secret.decode())
+        assert key_id != middleware.get_key_id(self.secret + b'.')
 
     @abstractmethod
     def test_cookie_is_set_and_signed(self) -> None:
@@ -226,27 +1300,86 @@ class SignedCookieMiddlewareTestsForStarletteBase(typing.Generic[TMiddleware, TD
             },
         )
 
-        with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-            with mock.patch.object(
-                    self.middleware_class,
-                    'sign',
-                    return_value='signed_data',
-            ):
-                response = client.get('/cookie')
+        with mock.patch.object(
+                self.middleware_class,
+                'sign',
+                return_value='signed_data',
+        ):
+            response = client.get('/cookie')
 
         assert 200 == response.status_code
         assert response.json() is None
 
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='signed_data',
-            max_age=self.cookie_ttl,
-            path='/cookie',
-            domain='hackan.net',
-            secure=False,
-            httponly=False,
-            samesite='lax',
+        assert (
+            f'{self.cookie_name}='
+            'signed_data'
+            f'; Max-Age={self.cookie_ttl}; Path=/cookie; SameSite=lax; Domain=hackan.net'
+        ) == response.headers['set-cookie']
+
+    def test_cookie_is_set_with_flags(self) -> None:
+        """Test that the cookie is set with the flags that are enabled, quoting empty values."""
+        middleware = self.create_middleware(
+            cookie_properties={'path': None, 'samesite': 'strict', 'secure': True},
         )
+        response = ResponseStartMessage({'type': 'http.response.start', 'status': 200})
+
+        middleware.set_cookie(response, self.cookie_name, '', max_age=0)
+
+        assert [
+            (b'set-cookie', f'{self.cookie_name}=""; Max-Age=0; SameSite=strict; Secure'.encode()),
+        ] == response.raw_headers
+
+    def test_cookie_suffix_is_cached(self) -> None:
+        """Test that the cookie suffix is created once, until the cookie properties change."""
+        middleware = self.create_middleware()
+        suffix = middleware.cookie_suffix
+
+        with mock.patch.object(self.middleware_class, 'get_cookie_suffix') as mock_get_suffix:
+            assert suffix is middleware.cookie_suffix
+            mock_get_suffix.assert_not_called()
+
+        middleware._cookie_properties = {'httponly': True}  # pylint: disable=W0212
+
+        assert '; Path=/; SameSite=lax; HttpOnly' == middleware.cookie_suffix
+
+    def test_cookie_is_set_with_expires(self) -> None:
+        """Test that the cookie expiry is set, as a date from seconds from now, or as is."""
+        middleware = self.create_middleware(cookie_properties={'expires': 3600})
+        response = ResponseStartMessage({'type': 'http.response.start', 'status': 200})
+
+        with mock.patch(
+                'asgi_signing_middleware.cookie.format_cookie_date',
+                return_value='Sun, 18 Oct 2026 13:00:00 GMT',
+        ) as mock_format_cookie_date:
+            middleware.set_cookie(response, self.cookie_name, 'value', max_age=60)
+
+        mock_format_cookie_date.assert_called_once_with(3600)
+        assert [(
+            b'set-cookie',
+            f'{self.cookie_name}=value; Max-Age=60; Expires=Sun, 18 Oct 2026 13:00:00 GMT'
+            '; Path=/; SameSite=lax'.encode(),
+        )] == response.raw_headers
+
+        date = 'Wed, 21 Oct 2026 07:28:00 GMT'
+        middleware._cookie_properties = {'expires': date}  # pylint: disable=W0212
+
+        assert f'; Expires={date}; Path=/; SameSite=lax' == middleware.cookie_suffix
+
+    def test_unknown_cookie_properties_are_rejected(self) -> None:
+        """Test that unknown cookie properties are rejected when creating the middleware."""
+        with pytest.raises(ValueError, match='Unknown cookie properties: httpsonly, max_age'):
+            self.create_middleware(cookie_properties={'httpsonly': True, 'max_age': 10})
+
+        middleware = self.create_middleware()
+        with pytest.raises(ValueError, match='Unknown cookie properties: samsite'):
+            middleware._cookie_properties = {'samsite': 'lax'}  # pylint: disable=W0212
+
+    def test_wrong_samesite_is_rejected(self) -> None:
+        """Test that the samesite property must be a valid one."""
+        middleware = self.create_middleware(cookie_properties={'samesite': 'loose'})
+
+        with pytest.raises(ValueError, match='samesite'):
+            middleware.get_cookie_suffix()
 
     def test_no_cookie_no_sig_check(self) -> None:
         """Test that when there's no cookie, no signature is checked."""
@@ -424,6 +1557,22 @@ class TestSimpleSignedCookieMiddlewareForStarlette(
         """Modify the cookie data as wanted. This is used by the `cookie_endpoint`."""
         return (data or '') + 'changed'
 
+    @pytest.mark.parametrize(
+        'secret',
+        (
+            b'secretsecretsecret',
+            (b'secretsecretsecret',),
+            (b'new secret, for newer cookies', b'secretsecretsecret'),
+        ),
+    )
+    def test_data_with_key_id_separator(self, secret: Secrets) -> None:
+        """Test that data containing the key ID separator is read back, with or without keys."""
+        middleware = self.create_middleware(secret=secret)
+        legacy_signed = self.create_middleware().sign('some~data')
+
+        assert 'some~data' == middleware.unsign(middleware.sign('some~data'))
+        assert 'some~data' == middleware.unsign(legacy_signed)
+
     def test_cookie_is_set_and_signed(self) -> None:
         """Test that the cookie is properly set and signed."""
         client = self.create_test_client()
@@ -451,48 +1600,36 @@ class TestSimpleSignedCookieMiddlewareForStarlette(
         )
 
         with mock.patch('blake2signer.bases.time', return_value=10000):
-            with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-                response = client.get('/cookie')
+            response = client.get('/cookie')
 
         assert 200 == response.status_code
         assert response.json() is None
 
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='4dr7vcAheoRHyIDvveX4iFRtkiEBdkoy5W0GvefVbL0.AAAnEA.changed',
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}='
+            '4dr7vcAheoRHyIDvveX4iFRtkiEBdkoy5W0GvefVbL0.AAAnEA.changed'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
 
     def test_existing_signed_cookie_is_read(self) -> None:
         """Test that existing signed cookie is read."""
         client = self.create_test_client(signer_kwargs={'deterministic': True})
 
-        with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-            with mock.patch('blake2signer.bases.time', return_value=10000):
-                response = client.get(
-                    '/cookie',
-                    cookies={
-                        self.cookie_name: 'jUSF_Zqz8NWPjT-c3cMvMQ.AAAnEA.existing',
-                    },
-                )
+        with mock.patch('blake2signer.bases.time', return_value=10000):
+            response = client.get(
+                '/cookie',
+                cookies={
+                    self.cookie_name: 'jUSF_Zqz8NWPjT-c3cMvMQ.AAAnEA.existing',
+                },
+            )
 
         assert 200 == response.status_code
         assert response.json() is None
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='2eOBgs64SlxJ6_8G0OKjyg.AAAnEA.existingchanged',
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}='
+            '2eOBgs64SlxJ6_8G0OKjyg.AAAnEA.existingchanged'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
 
 
 class TestSimpleSignedCookieMiddlewareForStarlettePy38(
@@ -558,22 +1695,16 @@ class TestSerializedSignedCookieMiddlewareForStarlette(
         )
 
         with mock.patch('blake2signer.bases.time', return_value=10000):
-            with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-                response = client.get('/cookie')
+            response = client.get('/cookie')
 
         assert 200 == response.status_code
         assert response.json() is None
 
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='mNZnpY_lP9TKGJQs92mSKRo2aoBiQ9LhXXbH9rIXCjI.AAAnEA.eyJleHRyYSI6ImRhdGEifQ',
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}='
+            'mNZnpY_lP9TKGJQs92mSKRo2aoBiQ9LhXXbH9rIXCjI.AAAnEA.eyJleHRyYSI6ImRhdGEifQ'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
 
     @pytest.mark.parametrize(
         ('existing_value', 'expected_value'),
@@ -604,28 +1735,291 @@ class TestSerializedSignedCookieMiddlewareForStarlette(
         """Test that existing signed cookie is read."""
         client = self.create_test_client(signer_kwargs={'deterministic': True})
 
-        with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-            with mock.patch('blake2signer.bases.time', return_value=10000):
-                response = client.get(
-                    '/cookie',
-                    cookies={
-                        self.cookie_name: existing_value,
-                    },
-                )
+        with mock.patch('blake2signer.bases.time', return_value=10000):
+            response = client.get(
+                '/cookie',
+                cookies={
+                    self.cookie_name: existing_value,
+                },
+            )
 
         assert 200 == response.status_code
         assert response.json() is None
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value=expected_value,
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
+        assert (
+            f'{self.cookie_name}={expected_value}'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
+
+    def test_large_payloads_are_compressed(self) -> None:
+        """Test that large payloads are compressed, keeping statistics."""
+        middleware = self.create_middleware()
+
+        data = {'messages': ['some repeated message'] * 50}
+        signed = middleware.sign(data)
+
+        assert data == middleware.unsign(signed)
+        assert len(signed) < len(json.dumps(data))
+        assert 1 == middleware.compression_stats.compressed
+        assert 0 < middleware.compression_stats.ratio
+
+    def test_payloads_below_threshold_are_not_compressed(self) -> None:
+        """Test that payloads below the compression threshold are not compressed."""
+        middleware = self.create_middleware(compression_threshold=4096)
+
+        data = {'messages': ['some repeated message'] * 50}
+        signed = middleware.sign(data)
+
+        assert data == middleware.unsign(signed)
+        assert len(signed) > len(json.dumps(data))
+        assert 0 == middleware.compression_stats.compressed
+        assert 1 == middleware.compression_stats.skipped_below_threshold
+
+    @pytest.mark.parametrize('lazy', (False, True))
+    def test_cookie_modified_in_place_is_written(self, lazy: bool) -> None:
+        """Test that the cookie is written if its data is modified in place."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that modifies the cookie data in place."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            cookie_data.data['messages'][0]['seen'] = True
+
+            return JSONResponse()
+
+        client = self.create_test_client(routes=[Route('/state', state_endpoint)], lazy=lazy)
+        cookie = self.create_middleware().sign({'messages': [{'seen': False}]})
+
+        response = client.get('/state', cookies={self.cookie_name: cookie})
+
+        assert 200 == response.status_code
+        assert {'messages': [{'seen': True}]} == self.create_middleware().unsign(
+            response.cookies[self.cookie_name] or '',
+        )
+
+    def test_big_new_data_is_offloaded(self) -> None:
+        """Test that writing big data set by the handler is offloaded, without a cookie."""
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that sets big data."""
+            getattr(request.state, self.state_attribute_name).data = {
+                'messages': [f'message {index}' for index in range(200)],
+            }
+
+            return JSONResponse()
+
+        client = self.create_test_client(
+            routes=[Route('/state', state_endpoint)],
+            offload_threshold=1024,
+        )
+
+        with mock.patch(
+                'asgi_signing_middleware.cookie.run_in_threadpool',
+                wraps=run_in_threadpool,
+        ) as mock_run_in_threadpool:
+            response = client.get('/state')
+
+        assert 200 == response.status_code
+        assert self.cookie_name in response.cookies
+        mock_run_in_threadpool.assert_called_once()
+
+    def test_cached_cookies_are_not_shared_between_requests(self) -> None:
+        """Test that modifying cached data in place doesn't affect other requests."""
+
+        def modify_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that modifies the cookie data in place."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            cookie_data.data['messages'][0]['seen'] = True
+            cookie_data.data['messages'].append({'seen': True})
+
+            return JSONResponse()
+
+        def read_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that returns the cookie data."""
+            return JSONResponse(getattr(request.state, self.state_attribute_name).data)
+
+        client = self.create_test_client(
+            routes=[Route('/modify', modify_endpoint), Route('/read', read_endpoint)],
+            cookie_cache_size=10,
+        )
+        cookie = self.create_middleware().sign({'messages': [{'seen': False}]})
+
+        client.get('/modify', cookies={self.cookie_name: cookie})
+        response = client.get('/read', cookies={self.cookie_name: cookie})
+
+        assert {'messages': [{'seen': False}]} == response.json()
+
+    def test_cached_cookies_are_not_shared_through_copies(self) -> None:
+        """Test that modifying a shallow copy of cached data doesn't affect other requests."""
+
+        def add_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that sets a modified shallow copy of the cookie data."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            data = {**cookie_data.data}
+            data['items'].append('x')
+            cookie_data.data = data
+
+            return JSONResponse()
+
+        def read_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that returns the cookie data."""
+            return JSONResponse(getattr(request.state, self.state_attribute_name).data)
+
+        client = self.create_test_client(
+            routes=[Route('/add', add_endpoint), Route('/read', read_endpoint)],
+            cookie_cache_size=10,
+        )
+        cookie = self.create_middleware().sign({'items': []})
+
+        client.get('/add', cookies={self.cookie_name: cookie})
+        client.get('/add', cookies={self.cookie_name: cookie})
+        response = client.get('/read', cookies={self.cookie_name: cookie})
+
+        assert {'items': []} == response.json()
+
+    def test_compression_can_be_disabled(self) -> None:
+        """Test that compression can be disabled."""
+        middleware = self.create_middleware(compress=False)
+
+        data = {'messages': ['some repeated message'] * 50}
+        signed = middleware.sign(data)
+
+        assert data == middleware.unsign(signed)
+        assert len(signed) > len(json.dumps(data))
+        assert CompressionStats() == middleware.compression_stats
+
+    def test_compression_level_and_compressor(self) -> None:
+        """Test that the compression level and compressor are used."""
+        middleware = self.create_middleware(
+            compression_level=9,
+            signer_kwargs={'compressor': GzipCompressor},
+        )
+
+        with mock.patch.object(
+                GzipCompressor,
+                'compress',
+                autospec=True,
+                return_value=b'compressed',
+        ) as mock_compress:
+            middleware.sign({'messages': ['some repeated message'] * 50})
+
+        mock_compress.assert_called_once()
+        assert 9 == mock_compress.call_args.kwargs['level']
+
+    @pytest.mark.parametrize('serializer', ('json', 'orjson', 'msgpack', 'cbor'))
+    def test_serializer(self, serializer: str) -> None:
+        """Test that data is serialized with the chosen serializer."""
+        client = self.create_test_client(serializer=serializer)
+
+        response = client.get('/cookie')
+
+        assert 200 == response.status_code
+        cookie = response.cookies[self.cookie_name] or ''
+        assert {'extra': 'data'} == self.create_middleware(serializer=serializer).unsign(cookie)
+
+    def test_json_serializers_are_interchangeable(self) -> None:
+        """Test that cookies serialized with orjson can be read with json, and vice versa."""
+        json_middleware = self.create_middleware()
+        orjson_middleware = self.create_middleware(serializer='orjson')
+
+        data = {'messages': ['some message']}
+
+        assert data == json_middleware.unsign(orjson_middleware.sign(data))
+        assert data == orjson_middleware.unsign(json_middleware.sign(data))
+
+    def test_binary_serializer_cookies_are_smaller(self) -> None:
+        """Test that binary serializers produce smaller cookies than JSON."""
+        data = {'ids': list(range(100, 150)), 'flag': True}
+
+        json_cookie = self.create_middleware(compress=False).sign(data)
+        msgpack_cookie = self.create_middleware(compress=False, serializer='msgpack').sign(data)
+
+        assert len(msgpack_cookie) < len(json_cookie)
+
+    def test_serializer_in_signer_kwargs_takes_precedence(self) -> None:
+        """Test that the serializer set in the signer kwargs is used over the argument."""
+        middleware = self.create_middleware(
+            serializer='msgpack',
+            signer_kwargs={'serializer': NullSerializer},
+        )
+
+        assert b'data' == middleware.unsign(middleware.sign('data'))
+
+    @pytest.mark.parametrize(
+        ('kwargs', 'serializer', 'compression'),
+        (
+            ({}, 'JSONSerializer', 'ZlibCompressor'),
+            ({'serializer': 'msgpack', 'compress': False}, 'MsgpackSerializer', 'none'),
+            (
+                {'signer_kwargs': {'serializer': NullSerializer, 'compressor': GzipCompressor}},
+                'NullSerializer',
+                'GzipCompressor',
+            ),
+        ),
+    )
+    def test_spans_have_serializer_and_compression(
+        self,
+        kwargs: typing.Dict[str, typing.Any],
+        serializer: str,
+        compression: str,
+    ) -> None:
+        """Test that spans have attributes for the serializer and compression used."""
+        tracer, exporter = create_tracer()
+        middleware = self.create_middleware(tracer=tracer, **kwargs)
+
+        middleware.write_cookie('data', mock.MagicMock())
+
+        for span in get_spans(exporter):
+            assert serializer == span.attributes['cookie.serializer']
+            assert compression == span.attributes['cookie.compression']
+
+    def test_unknown_serializer_is_rejected(self) -> None:
+        """Test that an unknown serializer name is rejected."""
+        with pytest.raises(ValueError, match='Unknown serializer'):
+            self.create_middleware(serializer='pickle')
+
+    def test_schema(self) -> None:
+        """Test that data is packed with the schema, and read back into its instances."""
+
+        class Preferences(typing.NamedTuple):
+            """Cookie schema."""
+
+            user_id: int
+            theme: str
+            beta: bool
+
+        def state_endpoint(request: Request) -> JSONResponse:
+            """Endpoint that sets the preferences, or changes its theme."""
+            cookie_data = getattr(request.state, self.state_attribute_name)
+            if cookie_data.data is None:
+                cookie_data.data = Preferences(user_id=1, theme='light', beta=False)
+            else:
+                cookie_data.data = cookie_data.data._replace(theme='dark')
+
+            return JSONResponse(cookie_data.data._asdict())
+
+        client = self.create_test_client(
+            routes=[Route('/state', state_endpoint)],
+            schema=Preferences,
         )
 
+        response = client.get('/state')
+
+        assert 200 == response.status_code
+        cookie = response.cookies[self.cookie_name] or ''
+        json_cookie = self.create_middleware().sign({'user_id': 1, 'theme': 'light'})
+        assert len(cookie) < len(json_cookie)
+
+        response = client.get('/state', cookies={self.cookie_name: cookie})
+
+        assert {'user_id': 1, 'theme': 'dark', 'beta': False} == response.json()
+        assert Preferences(user_id=1, theme='dark', beta=False) == self.create_middleware(
+            schema=Preferences,
+        ).unsign(response.cookies[self.cookie_name] or '')
+
+    def test_unsupported_schema_is_rejected(self) -> None:
+        """Test that an unsupported schema is rejected."""
+        with pytest.raises(ValueError, match='must be a NamedTuple or a dataclass'):
+            self.create_middleware(schema=dict)
+
 
 class TestSerializedSignedCookieMiddlewareForStarlettePy38(
         TestSerializedSignedCookieMiddlewareForStarlette,
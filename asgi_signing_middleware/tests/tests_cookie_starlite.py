@@ -238,27 +238,21 @@ class SignedCookieMiddlewareTestsForStarliteBase(typing.Generic[TMiddleware, TDa
             },
         )
 
-        with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-            with mock.patch.object(
-                    self.middleware_class,
-                    'sign',
-                    return_value='signed_data',
-            ):
-                response = client.get('/cookie')
+        with mock.patch.object(
+                self.middleware_class,
+                'sign',
+                return_value='signed_data',
+        ):
+            response = client.get('/cookie')
 
         assert 200 == response.status_code
         assert response.json() is None
 
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='signed_data',
-            max_age=self.cookie_ttl,
-            path='/cookie',
-            domain='hackan.net',
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}='
+            'signed_data'
+            f'; Max-Age={self.cookie_ttl}; Path=/cookie; SameSite=lax; Domain=hackan.net'
+        ) == response.headers['set-cookie']
 
     def test_no_cookie_no_sig_check(self) -> None:
         """Test that when there's no cookie, no signature is checked."""
@@ -458,48 +452,36 @@ class TestSimpleSignedCookieMiddlewareForStarlite(
         )
 
         with mock.patch('blake2signer.bases.time', return_value=10000):
-            with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-                response = client.get('/cookie')
+            response = client.get('/cookie')
 
         assert 200 == response.status_code
         assert response.json() is None
 
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='4dr7vcAheoRHyIDvveX4iFRtkiEBdkoy5W0GvefVbL0.AAAnEA.changed',
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}='
+            '4dr7vcAheoRHyIDvveX4iFRtkiEBdkoy5W0GvefVbL0.AAAnEA.changed'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
 
     def test_existing_signed_cookie_is_read(self) -> None:
         """Test that existing signed cookie is read."""
         client = self.create_test_client(signer_kwargs={'deterministic': True})
 
-        with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-            with mock.patch('blake2signer.bases.time', return_value=10000):
-                response = client.get(
-                    '/cookie',
-                    cookies={
-                        self.cookie_name: 'jUSF_Zqz8NWPjT-c3cMvMQ.AAAnEA.existing',
-                    },
-                )
+        with mock.patch('blake2signer.bases.time', return_value=10000):
+            response = client.get(
+                '/cookie',
+                cookies={
+                    self.cookie_name: 'jUSF_Zqz8NWPjT-c3cMvMQ.AAAnEA.existing',
+                },
+            )
 
         assert 200 == response.status_code
         assert response.json() is None
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='2eOBgs64SlxJ6_8G0OKjyg.AAAnEA.existingchanged',
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}='
+            '2eOBgs64SlxJ6_8G0OKjyg.AAAnEA.existingchanged'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
 
 
 class TestSimpleSignedCookieMiddlewareForStarlitePy38(
@@ -565,22 +547,16 @@ class TestSerializedSignedCookieMiddlewareForStarlite(
         )
 
         with mock.patch('blake2signer.bases.time', return_value=10000):
-            with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-                response = client.get('/cookie')
+            response = client.get('/cookie')
 
         assert 200 == response.status_code
         assert response.json() is None
 
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value='mNZnpY_lP9TKGJQs92mSKRo2aoBiQ9LhXXbH9rIXCjI.AAAnEA.eyJleHRyYSI6ImRhdGEifQ',
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}='
+            'mNZnpY_lP9TKGJQs92mSKRo2aoBiQ9LhXXbH9rIXCjI.AAAnEA.eyJleHRyYSI6ImRhdGEifQ'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
 
     @pytest.mark.parametrize(
         ('existing_value', 'expected_value'),
@@ -611,27 +587,20 @@ class TestSerializedSignedCookieMiddlewareForStarlite(
         """Test that existing signed cookie is read."""
         client = self.create_test_client(signer_kwargs={'deterministic': True})
 
-        with mock.patch('starlette.responses.Response.set_cookie') as mock_set_cookie:
-            with mock.patch('blake2signer.bases.time', return_value=10000):
-                response = client.get(
-                    '/cookie',
-                    cookies={
-                        self.cookie_name: existing_value,
-                    },
-                )
+        with mock.patch('blake2signer.bases.time', return_value=10000):
+            response = client.get(
+                '/cookie',
+                cookies={
+                    self.cookie_name: existing_value,
+                },
+            )
 
         assert 200 == response.status_code
         assert response.json() is None
-        mock_set_cookie.assert_called_once_with(
-            key=self.cookie_name,
-            value=expected_value,
-            max_age=self.cookie_ttl,
-            path='/',
-            domain=None,
-            secure=False,
-            httponly=False,
-            samesite='lax',
-        )
+        assert (
+            f'{self.cookie_name}={expected_value}'
+            f'; Max-Age={self.cookie_ttl}; Path=/; SameSite=lax'
+        ) == response.headers['set-cookie']
 
 
 class TestSerializedSignedCookieMiddlewareForStarlitePy38(
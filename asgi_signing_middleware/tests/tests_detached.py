@@ -0,0 +1,75 @@
+"""Tests for the detached module."""
+
+import time
+from unittest import mock
+
+import pytest
+from blake2signer.errors import ExpiredSignatureError
+from blake2signer.errors import InvalidSignatureError
+
+from ..detached import DetachedSigner
+
+secret = b'secretsecretsecret'
+old_secret = b'oldsecretoldsecret'
+
+
+def test_signatures_are_verified() -> None:
+    """Test that detached signatures are verified against the data they sign."""
+    signer = DetachedSigner(secret, personalisation='test', max_age=60)
+    signature = signer.sign(b'data')
+
+    signer.verify(signature, b'data')
+    with pytest.raises(InvalidSignatureError):
+        signer.verify(signature, b'other data')
+
+
+def test_signatures_are_verified_with_any_secret() -> None:
+    """Test that signatures made with an older secret are verified when rotating keys."""
+    signer = DetachedSigner((secret, old_secret), personalisation='test', max_age=60)
+    old_signer = DetachedSigner(old_secret, personalisation='test', max_age=60)
+    other_signer = DetachedSigner(b'othersecretothersecret', personalisation='test', max_age=60)
+
+    signer.verify(old_signer.sign(b'data'), b'data')
+    with pytest.raises(InvalidSignatureError):
+        signer.verify(other_signer.sign(b'data'), b'data')
+
+
+def test_signatures_are_made_with_the_newest_secret() -> None:
+    """Test that signatures are made with the newest secret when rotating keys."""
+    signer = DetachedSigner((secret, old_secret), personalisation='test', max_age=60)
+
+    DetachedSigner(secret, personalisation='test', max_age=60).verify(
+        signer.sign(b'data'),
+        b'data',
+    )
+
+
+def test_expired_signatures_are_not_checked_with_older_secrets() -> None:
+    """Test that an expired signature fails as such, instead of as a wrong one."""
+    signer = DetachedSigner((secret, old_secret), personalisation='test', max_age=60)
+    with mock.patch('blake2signer.bases.time', return_value=time.time() - 70):
+        signature = signer.sign(b'data')
+
+    with pytest.raises(ExpiredSignatureError):
+        signer.verify(signature, b'data')
+
+
+def test_personalisation_is_extended_by_the_signer_kwargs() -> None:
+    """Test that the personalisation in the signer kwargs extends the given one."""
+    signer = DetachedSigner(
+        secret,
+        personalisation='test',
+        max_age=60,
+        signer_kwargs={'personalisation': 'extended'},
+    )
+    other_signer = DetachedSigner(secret, personalisation='testextended', max_age=60)
+
+    other_signer.verify(signer.sign(b'data'), b'data')
+
+
+def test_secret_in_signer_kwargs_is_rejected() -> None:
+    """Test that the secret can't be set in the signer kwargs."""
+    with pytest.raises(ValueError, match='secret'):
+        DetachedSigner(secret, personalisation='test', max_age=60, signer_kwargs={
+            'secret': secret,
+        })
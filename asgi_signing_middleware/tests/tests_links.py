@@ -0,0 +1,223 @@
+"""Tests for the links module."""
+
+import re
+import time
+import typing
+from unittest import mock
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from ..links import LinkData
+from ..links import SignedLinkMiddleware
+
+
+class TestsSignedLinkMiddleware:
+    """Tests for the SignedLinkMiddleware."""
+
+    secret = b'secretsecretsecret'
+    path_pattern = re.compile(r'/files/(?P<token>[^/]+)/')
+
+    def create_middleware(self, **kwargs: typing.Any) -> SignedLinkMiddleware:
+        """Create a middleware instance directly, wrapping a dummy app."""
+        kwargs.setdefault('secret', self.secret)
+        kwargs.setdefault('state_attribute_name', 'link')
+        kwargs.setdefault('link_ttl', 60)
+
+        return SignedLinkMiddleware(mock.AsyncMock(), **kwargs)
+
+    def create_test_client(self, **kwargs: typing.Any) -> TestClient:
+        """Create a test client for an application using the signed link middleware."""
+
+        def download(request: Request) -> JSONResponse:
+            """Endpoint that returns the verification result."""
+            link: LinkData = request.state.link
+
+            return JSONResponse({
+                'data': link.data,
+                'error': type(link.exc).__name__ if link.exc else None,
+            })
+
+        def public(request: Request) -> JSONResponse:
+            """Endpoint that doesn't require a signed link."""
+            return JSONResponse({
+                'has_state': hasattr(request.state, 'link'),
+            })
+
+        kwargs.setdefault('secret', self.secret)
+        kwargs.setdefault('state_attribute_name', 'link')
+        kwargs.setdefault('link_ttl', 60)
+        app = Starlette(
+            routes=[
+                Route('/download/{name}', download),
+                Route('/files/{token}/{name}', download),
+                Route('/public', public),
+            ],
+            middleware=[Middleware(SignedLinkMiddleware, **kwargs)],
+        )
+
+        return TestClient(app)
+
+    def test_query_token_is_verified(self) -> None:
+        """Test that a link with a valid token in the query string is verified."""
+        client = self.create_test_client()
+        url = self.create_middleware().mint_url('/download/report.pdf')
+
+        response = client.get(url)
+
+        assert 200 == response.status_code
+        assert {'data': '/download/report.pdf', 'error': None} == response.json()
+
+    @pytest.mark.parametrize(
+        ('path', 'data'),
+        (
+            ('/download/my%20report.pdf', '/download/my report.pdf'),
+            ('/download/caf%C3%A9.pdf', '/download/café.pdf'),
+        ),
+    )
+    def test_encoded_path_is_verified(self, path: str, data: str) -> None:
+        """Test that a link to a path that needs percent-encoding is verified."""
+        client = self.create_test_client()
+        url = self.create_middleware().mint_url(path)
+
+        response = client.get(url)
+
+        assert {'data': data, 'error': None} == response.json()
+
+    def test_encoded_path_token_is_verified(self) -> None:
+        """Test that a link with a token in a path that needs percent-encoding is verified."""
+        client = self.create_test_client(path_pattern=self.path_pattern)
+        middleware = self.create_middleware(path_pattern=self.path_pattern)
+        url = middleware.mint_url('/files/{token}/my%20report.pdf')
+
+        response = client.get(url)
+
+        assert {'data': '/files//my report.pdf', 'error': None} == response.json()
+
+    def test_other_query_params_are_not_signed(self) -> None:
+        """Test that query parameters can be added to a link, before or after minting it."""
+        client = self.create_test_client()
+        url = self.create_middleware().mint_url('/download/report.pdf?inline=1')
+
+        response = client.get(f'{url}&lang=en')
+
+        assert {'data': '/download/report.pdf', 'error': None} == response.json()
+
+    def test_path_token_is_verified(self) -> None:
+        """Test that a link with a valid token in the path is verified."""
+        client = self.create_test_client(path_pattern=self.path_pattern)
+        middleware = self.create_middleware(path_pattern=self.path_pattern)
+        url = middleware.mint_url('/files/{token}/report.pdf')
+
+        response = client.get(url)
+
+        assert url.startswith('/files/')
+        assert {'data': '/files//report.pdf', 'error': None} == response.json()
+
+    @pytest.mark.parametrize(
+        'url',
+        (
+            '/download/report.pdf',
+            '/download/report.pdf?token=',
+            '/download/report.pdf?token=wrong.token',
+            '/files/wrong.token/report.pdf',
+        ),
+    )
+    def test_bad_tokens_are_rejected(self, url: str) -> None:
+        """Test that links whose token is missing or wrong are rejected."""
+        client = self.create_test_client()
+
+        response = client.get(url)
+
+        assert 403 == response.status_code
+        assert 'Invalid link' == response.text
+
+    def test_token_of_another_path_is_rejected(self) -> None:
+        """Test that a token can't be used for a path other than the one it signs."""
+        client = self.create_test_client()
+        url = self.create_middleware().mint_url('/download/report.pdf')
+
+        response = client.get(url.replace('report', 'secrets'))
+
+        assert 403 == response.status_code
+
+    def test_path_not_matching_the_pattern_is_rejected(self) -> None:
+        """Test that a path not matching the pattern has no token."""
+        client = self.create_test_client(path_pattern=self.path_pattern)
+
+        response = client.get('/download/report.pdf')
+
+        assert 403 == response.status_code
+
+    def test_expired_links_are_rejected(self) -> None:
+        """Test that links older than the link time-to-live are rejected."""
+        client = self.create_test_client(reject=False)
+        with mock.patch('blake2signer.bases.time', return_value=time.time() - 70):
+            url = self.create_middleware().mint_url('/download/report.pdf')
+
+        response = client.get(url)
+
+        assert {'data': None, 'error': 'ExpiredSignatureError'} == response.json()
+
+    @pytest.mark.parametrize(
+        'url',
+        (
+            '/download/report.pdf',
+            '/download/report.pdf?token=wrong.token',
+        ),
+    )
+    def test_bad_tokens_can_be_handled_by_the_app(self, url: str) -> None:
+        """Test that bad tokens are left to the app when not rejecting them."""
+        client = self.create_test_client(reject=False)
+
+        response = client.get(url)
+
+        assert 200 == response.status_code
+        assert {'data': None, 'error': 'InvalidSignatureError'} == response.json()
+
+    def test_custom_query_param(self) -> None:
+        """Test that the token is taken from the given query parameter."""
+        client = self.create_test_client(query_param='sig')
+        url = self.create_middleware(query_param='sig').mint_url('/download/report.pdf')
+
+        response = client.get(url)
+
+        assert '?sig=' in url
+        assert {'data': '/download/report.pdf', 'error': None} == response.json()
+
+    def test_urls_are_minted_in_bulk_with_the_same_signer(self) -> None:
+        """Test that minting links in bulk doesn't create a signer per link."""
+        middleware = self.create_middleware()
+        paths = [f'/download/report{index}.pdf' for index in range(10)]
+
+        with mock.patch('asgi_signing_middleware.detached.Blake2TimestampSigner') as mock_signer:
+            urls = middleware.mint_urls(paths, base_url='https://example.com')
+
+        mock_signer.assert_not_called()
+        assert 10 == len(urls)
+        assert all(url.startswith('https://example.com/download/report') for url in urls)
+
+    def test_path_without_placeholder_is_rejected(self) -> None:
+        """Test that links can't be minted without the placeholder when using a pattern."""
+        middleware = self.create_middleware(path_pattern=self.path_pattern)
+
+        with pytest.raises(ValueError, match='placeholder'):
+            middleware.mint_url('/files/report.pdf')
+
+    def test_path_pattern_without_token_group_is_rejected(self) -> None:
+        """Test that the path pattern must have a token group."""
+        with pytest.raises(ValueError, match='token'):
+            self.create_middleware(path_pattern=re.compile(r'/files/([^/]+)/'))
+
+    def test_excluded_paths_are_not_verified(self) -> None:
+        """Test that the middleware doesn't act for excluded paths."""
+        client = self.create_test_client(exclude_paths=['/public'])
+
+        response = client.get('/public')
+
+        assert {'has_state': False} == response.json()
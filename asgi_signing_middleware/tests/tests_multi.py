@@ -0,0 +1,191 @@
+"""Tests for the multi module."""
+
+import typing
+from unittest import mock
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from ..cookie import SimpleSignedCookieMiddleware
+from ..multi import CookieSpec
+from ..multi import MultiSignedCookieMiddleware
+from ..scanner import CookieScanner
+
+
+class TestsMultiSignedCookieMiddleware:
+    """Tests for the MultiSignedCookieMiddleware."""
+
+    secret = b'secretsecretsecret'
+
+    def create_specs(self) -> typing.List[CookieSpec]:
+        """Create the cookie specs: a simple one, and a serialized one."""
+        return [
+            CookieSpec(
+                cookie_name='theme',
+                state_attribute_name='theme',
+                cookie_ttl=60,
+                middleware_class=SimpleSignedCookieMiddleware,
+            ),
+            CookieSpec(
+                cookie_name='cart',
+                state_attribute_name='cart',
+                cookie_ttl=60,
+                secret=b'anothersecretanother',
+                options={'cookie_properties': {'path': '/'}},
+            ),
+        ]
+
+    def create_test_client(self, **kwargs: typing.Any) -> TestClient:
+        """Create a test client for an application using the multi cookie middleware."""
+
+        def cookies(request: Request) -> JSONResponse:
+            """Endpoint that returns the data of every cookie."""
+            return JSONResponse({
+                'theme': request.state.theme.data,
+                'cart': request.state.cart.data,
+            })
+
+        def theme(request: Request) -> JSONResponse:
+            """Endpoint that sets the theme cookie only."""
+            request.state.theme.data = 'dark'
+
+            return JSONResponse({})
+
+        def both(request: Request) -> JSONResponse:
+            """Endpoint that sets every cookie."""
+            request.state.theme.data = 'light'
+            request.state.cart.data = {'items': [1, 2]}
+
+            return JSONResponse({})
+
+        app = Starlette(
+            routes=[
+                Route('/', cookies),
+                Route('/theme', theme),
+                Route('/both', both),
+            ],
+            middleware=[
+                Middleware(
+                    MultiSignedCookieMiddleware,
+                    secret=self.secret,
+                    cookies=self.create_specs(),
+                    **kwargs,
+                ),
+            ],
+        )
+
+        return TestClient(app)
+
+    def test_cookies_are_written_and_read(self) -> None:
+        """Test that every cookie is written in the same response, and read afterwards."""
+        client = self.create_test_client()
+
+        response = client.get('/both')
+
+        assert response.status_code == 200
+        assert set(response.cookies.keys()) == {'theme', 'cart'}
+
+        response = client.get('/')
+
+        assert response.status_code == 200
+        assert response.json() == {'theme': 'light', 'cart': {'items': [1, 2]}}
+        assert 'set-cookie' not in response.headers
+
+    def test_cookie_header_is_scanned_once(self) -> None:
+        """Test that the cookie header is scanned once per request, for every cookie."""
+        client = self.create_test_client()
+        client.get('/both')
+
+        with mock.patch(
+                'asgi_signing_middleware.cookie.CookieScanner',
+                wraps=CookieScanner,
+        ) as mock_scanner:
+            response = client.get('/both')
+
+        assert response.json() == {}
+        mock_scanner.assert_called_once()
+
+    def test_only_modified_cookies_are_written(self) -> None:
+        """Test that only the cookies modified by the request handler are written."""
+        client = self.create_test_client()
+
+        response = client.get('/theme')
+
+        assert set(response.cookies.keys()) == {'theme'}
+        assert client.get('/').json() == {'theme': 'dark', 'cart': None}
+
+    def test_cookies_use_their_own_secret(self) -> None:
+        """Test that the secret of a cookie spec takes precedence over the general one."""
+        middleware = MultiSignedCookieMiddleware(
+            None,  # type: ignore[arg-type]
+            secret=self.secret,
+            cookies=self.create_specs(),
+        )
+        theme, cart = middleware.handlers
+
+        assert theme.secret == self.secret
+        assert cart.secret == b'anothersecretanother'
+
+    @pytest.mark.parametrize(
+        ('cookie_name', 'state_attribute_name'),
+        (
+            ('theme', 'other'),
+            ('other', 'theme'),
+        ),
+    )
+    def test_duplicated_cookies_are_rejected(
+        self,
+        cookie_name: str,
+        state_attribute_name: str,
+    ) -> None:
+        """Test that cookie names and state attribute names must be unique."""
+        specs = self.create_specs()
+        specs.append(
+            CookieSpec(
+                cookie_name=cookie_name,
+                state_attribute_name=state_attribute_name,
+                cookie_ttl=60,
+            ),
+        )
+
+        with pytest.raises(ValueError, match='must be unique'):
+            MultiSignedCookieMiddleware(
+                None,  # type: ignore[arg-type]
+                secret=self.secret,
+                cookies=specs,
+            )
+
+    def test_excluded_paths_are_not_handled(self) -> None:
+        """Test that the middleware doesn't act for excluded paths."""
+        client = self.create_test_client(exclude_paths=('/theme',))
+
+        with pytest.raises(AttributeError):
+            client.get('/theme')
+
+        response = client.get('/both')
+
+        assert set(response.cookies.keys()) == {'theme', 'cart'}
+
+    def test_included_paths_are_handled(self) -> None:
+        """Test that the middleware only acts for included paths."""
+        client = self.create_test_client(include_paths=('/both',))
+
+        response = client.get('/both')
+
+        assert set(response.cookies.keys()) == {'theme', 'cart'}
+        with pytest.raises(AttributeError):
+            client.get('/')
+
+    def test_non_http_scopes_are_passed_through(self) -> None:
+        """Test that the middleware doesn't act for non HTTP scopes."""
+        client = self.create_test_client()
+
+        with client:  # Runs the lifespan protocol through the middleware
+            response = client.get('/both')
+
+        assert response.status_code == 200
@@ -0,0 +1,70 @@
+"""Tests for the observers module."""
+
+from unittest import mock
+
+import prometheus_client
+import pytest
+
+from ..observers import CookieObserver
+from ..observers import PrometheusObserver
+from ..observers import StageTimer
+
+
+def test_base_observer_ignores_every_event() -> None:
+    """Test that the base observer can be notified of anything, doing nothing."""
+    observer = CookieObserver()
+
+    observer.on_timing('cookie', 'sign', 0.1)
+    observer.on_size('cookie', 'out', 100)
+    observer.on_outcome('cookie', 'written')
+
+
+def test_stage_timer_notifies_the_observer() -> None:
+    """Test that the stage timer notifies the time spent within it."""
+    observer = mock.MagicMock()
+
+    with mock.patch('asgi_signing_middleware.observers.perf_counter', side_effect=(1.0, 1.5)):
+        with StageTimer(observer, 'cookie', 'unsign'):
+            pass
+
+    observer.on_timing.assert_called_once_with('cookie', 'unsign', 0.5)
+
+
+def test_stage_timer_notifies_the_observer_on_errors() -> None:
+    """Test that the stage timer notifies the time spent even if an exception is raised."""
+    observer = mock.MagicMock()
+
+    with pytest.raises(ValueError):
+        with StageTimer(observer, 'cookie', 'unsign'):
+            raise ValueError
+
+    observer.on_timing.assert_called_once()
+
+
+def test_prometheus_observer_keeps_metrics() -> None:
+    """Test that the Prometheus observer keeps metrics labeled by cookie."""
+    registry = prometheus_client.CollectorRegistry()
+    observer = PrometheusObserver(namespace='test', registry=registry)
+
+    observer.on_timing('cookie', 'sign', 0.25)
+    observer.on_size('cookie', 'out', 100)
+    observer.on_size('cookie', 'out', 5000)
+    observer.on_outcome('cookie', 'written')
+
+    def get(name: str, **labels: str) -> float:
+        value = registry.get_sample_value(name, {'cookie': 'cookie', **labels})
+        assert value is not None
+
+        return value
+
+    assert 0.25 == get('test_cookie_stage_seconds_sum', stage='sign')
+    assert 1 == get('test_cookie_size_bytes_bucket', direction='out', le='128.0')
+    assert 2 == get('test_cookie_size_bytes_count', direction='out')
+    assert 1 == get('test_cookie_outcomes_total', outcome='written')
+
+
+def test_prometheus_observer_requires_prometheus_client() -> None:
+    """Test that the Prometheus observer can't be created without prometheus_client."""
+    with mock.patch('asgi_signing_middleware.observers.import_optional', return_value=None):
+        with pytest.raises(ImportError, match='prometheus_client'):
+            PrometheusObserver()
@@ -0,0 +1,61 @@
+"""Tests for the paths module."""
+
+import re
+
+import pytest
+
+from ..paths import PathMatcher
+
+
+@pytest.mark.parametrize(
+    ('path', 'expected'),
+    (
+        ('/app', True),
+        ('/app/some/view', True),
+        ('/app/', True),
+        ('/application', False),
+        ('/app-admin/view', False),
+        ('/static/app.css', False),
+        ('/api/v2/items', True),
+        ('/api/items', False),
+        ('/', False),
+    ),
+)
+def test_path_matcher_match(path: str, expected: bool) -> None:
+    """Test that the path matcher matches prefixes and regular expressions."""
+    matcher = PathMatcher(('/app', re.compile(r'/api/v\d+/')))
+
+    assert expected is matcher.match(path)
+
+
+def test_path_matcher_empty() -> None:
+    """Test that an empty path matcher is falsy, and doesn't match anything."""
+    matcher = PathMatcher()
+
+    assert not matcher
+    assert not matcher.match('/')
+
+
+@pytest.mark.parametrize(
+    ('prefix', 'path', 'expected'),
+    (
+        ('/app/', '/app/some/view', True),
+        ('/app/', '/application', False),
+        ('/', '/app', True),
+    ),
+)
+def test_path_matcher_match_segments(prefix: str, path: str, expected: bool) -> None:
+    """Test that the path matcher matches prefixes by whole path segments."""
+    assert expected is PathMatcher((prefix,)).match(path)
+
+
+@pytest.mark.parametrize(
+    'patterns',
+    (
+        ('/app',),
+        (re.compile('/app'),),
+    ),
+)
+def test_path_matcher_is_truthy(patterns: tuple) -> None:
+    """Test that a path matcher with any pattern is truthy."""
+    assert PathMatcher(patterns)
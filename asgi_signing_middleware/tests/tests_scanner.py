@@ -0,0 +1,108 @@
+"""Tests for the scanner module."""
+
+from unittest import mock
+
+import pytest
+from starlette.datastructures import QueryParams
+from starlette.requests import cookie_parser
+
+from ..scanner import CookieScanner
+from ..scanner import count_cookies
+from ..scanner import find_cookie
+from ..scanner import get_cookie
+from ..scanner import get_cookie_header
+from ..scanner import get_query_param
+
+
+@pytest.mark.parametrize(
+    'header',
+    (
+        '',
+        'my_cookie=value',
+        'my_cookie=value; other=data',
+        'other=data;my_cookie=value',
+        'other=data;   my_cookie=value  ;another=more',
+        'other=my_cookie=value; my_cookie=the value',
+        'not_my_cookie=value; my_cookie_not=value',
+        'my_cookie=first; my_cookie=last',
+        'my_cookie="quoted\\054value"',
+        'my_cookie=',
+        'my_cookie',
+        'other=data; my_cookie=a.b.c=d',
+        'my_cookie.0=chunk; my_cookie=2; my_cookie.1=chunk',
+    ),
+)
+def test_get_cookie_matches_starlette(header: str) -> None:
+    """Test that cookies are read as Starlette does."""
+    cookies = cookie_parser(header)
+
+    for name in ('my_cookie', 'my_cookie.0', 'my_cookie.1', 'other'):
+        assert cookies.get(name, '') == get_cookie(header.encode('latin-1'), name)
+
+
+def test_find_cookie_missing() -> None:
+    """Test that a missing cookie is None, whereas an empty one is empty."""
+    assert find_cookie(b'other=data; prefix_name=value', b'name') is None
+    assert b'' == find_cookie(b'name=; other=data', b'name')
+
+
+def test_get_cookie_header() -> None:
+    """Test that the cookie header is taken from the scope headers, joined if repeated."""
+    headers = [
+        (b'host', b'example.com'),
+        (b'cookie', b'a=1'),
+        (b'x-cookie', b'b=2'),
+        (b'cookie', b'c=3'),
+    ]
+
+    assert b'a=1; c=3' == get_cookie_header(headers)
+    assert b'' == get_cookie_header([(b'host', b'example.com')])
+
+
+@pytest.mark.parametrize(
+    ('header', 'expected'),
+    (
+        (b'', 0),
+        (b'a=1', 1),
+        (b'a=1; b=2; c=3', 3),
+    ),
+)
+def test_count_cookies(header: bytes, expected: int) -> None:
+    """Test that cookies are counted."""
+    assert expected == count_cookies(header)
+
+
+def test_cookie_scanner() -> None:
+    """Test that the scanner counts the cookies, and keeps the ones it finds."""
+    headers = [(b'cookie', b'a=1; b="2"; c=3'), (b'cookie', b'_ga=GA1.1.123; _gid=GA1.2.456')]
+    scanner = CookieScanner(headers)
+
+    assert 5 == scanner.count
+    assert ('1', '2', '') == (scanner.get('a'), scanner.get('b'), scanner.get('missing'))
+    assert {'a': '1', 'b': '2', 'missing': ''} == scanner.cookies
+
+    with mock.patch('asgi_signing_middleware.scanner.get_cookie') as mock_get_cookie:
+        assert '1' == scanner.get('a')
+
+    mock_get_cookie.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    'query_string',
+    (
+        b'',
+        b'token=value',
+        b'token=value&other=data',
+        b'other=data&token=value',
+        b'my_token=other&token=value',
+        b'token=first&token=last',
+        b'token=a%2Bb%3D+c',
+        b'token=',
+        b'other=token=value',
+    ),
+)
+def test_get_query_param_parses_as_starlette(query_string: bytes) -> None:
+    """Test that query parameters are parsed as Starlette does."""
+    expected = QueryParams(query_string.decode('latin-1')).get('token')
+
+    assert expected == get_query_param(query_string, 'token')
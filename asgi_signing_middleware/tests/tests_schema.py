@@ -0,0 +1,168 @@
+"""Tests for the schema module."""
+
+import typing
+from dataclasses import dataclass
+
+import pytest
+
+from ..schema import SchemaCodec
+from ..schema import create_schema_serializer
+from ..schema import decode_varint
+from ..schema import encode_varint
+
+
+class Preferences(typing.NamedTuple):
+    """NamedTuple schema."""
+
+    user_id: int
+    locale: str
+    dark: bool
+    beta: bool
+    score: float
+    avatar: typing.Optional[bytes]
+    referrer: typing.Optional[int] = None
+    admin: typing.Optional[bool] = None
+
+
+@dataclass
+class Session:
+    """Dataclass schema."""
+
+    user_id: int
+    locale: typing.Optional[str]
+    remember: bool
+
+
+@pytest.mark.parametrize('value', (0, 1, 127, 128, 300, 2 ** 64))
+def test_varint(value: int) -> None:
+    """Test that varints are decoded back to their value."""
+    encoded = encode_varint(value)
+
+    assert (value, len(encoded)) == decode_varint(encoded, 0)
+
+
+def test_varint_is_compact() -> None:
+    """Test that small varints take a single byte."""
+    assert b'\x7f' == encode_varint(127)
+    assert b'\x80\x01' == encode_varint(128)
+
+
+@pytest.mark.parametrize(
+    'obj',
+    (
+        Preferences(
+            user_id=12345,
+            locale='es-AR',
+            dark=True,
+            beta=False,
+            score=-1.5,
+            avatar=b'\x00\xff',
+            referrer=-7,
+            admin=False,
+        ),
+        Preferences(user_id=-1, locale='', dark=False, beta=True, score=0.0, avatar=None),
+        Session(user_id=2 ** 40, locale='ñandú', remember=True),
+        Session(user_id=0, locale=None, remember=False),
+    ),
+)
+def test_codec(obj: typing.Any) -> None:
+    """Test that instances are decoded back to equal ones."""
+    codec: SchemaCodec[typing.Any] = SchemaCodec(type(obj))
+
+    encoded = codec.encode(obj)
+
+    assert obj == codec.decode(encoded)
+
+
+def test_codec_is_compact() -> None:
+    """Test that instances are packed without field names nor delimiters."""
+    codec = SchemaCodec(Session)
+
+    # Flags: locale is set and remember is true, then user ID 5 and locale 'en'
+    assert b'\x03\x0a\x02en' == codec.encode(Session(user_id=5, locale='en', remember=True))
+
+
+def test_codec_rejects_other_instances() -> None:
+    """Test that the codec only encodes instances of its schema."""
+    codec = SchemaCodec(Session)
+
+    with pytest.raises(TypeError, match='Expected an instance of Session'):
+        codec.encode({'user_id': 1, 'locale': None, 'remember': True})  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize(
+    ('data', 'message'),
+    (
+        (b'', 'Truncated data'),
+        (b'\x00\x80', 'Truncated data'),
+        (b'\x01\x02\x05en', 'Truncated data'),
+        (b'\x00\x02\x00', 'Unexpected trailing data'),
+    ),
+)
+def test_codec_rejects_malformed_data(data: bytes, message: str) -> None:
+    """Test that the codec rejects malformed data."""
+    codec = SchemaCodec(Session)
+
+    with pytest.raises(ValueError, match=message):
+        codec.decode(data)
+
+
+def test_codec_rejects_truncated_floats() -> None:
+    """Test that the codec rejects truncated floats."""
+
+    class Score(typing.NamedTuple):
+        """Schema with a float."""
+
+        value: float
+
+    with pytest.raises(ValueError, match='Truncated data'):
+        SchemaCodec(Score).decode(b'\x00\x00\x00')
+
+
+@pytest.mark.parametrize(
+    ('schema', 'message'),
+    (
+        (dict, 'must be a NamedTuple or a dataclass'),
+        (tuple, 'must be a NamedTuple or a dataclass'),
+        (typing.NamedTuple('Tags', [('tags', typing.List[str])]), "field 'tags'"),
+        (typing.NamedTuple('Id', [('id', typing.Union[int, str])]), "field 'id'"),
+    ),
+)
+def test_unsupported_schemas_are_rejected(schema: type, message: str) -> None:
+    """Test that unsupported schemas are rejected."""
+    with pytest.raises(ValueError, match=message):
+        SchemaCodec(schema)
+
+
+def test_schema_serializer() -> None:
+    """Test that the schema serializer uses the codec."""
+    serializer = create_schema_serializer(Session)()
+    session = Session(user_id=1, locale=None, remember=True)
+
+    assert session == serializer.unserialize(serializer.serialize(session))
+
+
+def test_schema_serializer_is_named_after_the_layout() -> None:
+    """Test that the schema serializer name changes with the schema fields."""
+
+    @dataclass
+    class OtherSession:
+        """Schema with the same layout as Session."""
+
+        user_id: int
+        locale: typing.Optional[str]
+        remember: bool
+
+    @dataclass
+    class RenamedSession:
+        """Schema with a different layout than Session."""
+
+        user_id: int
+        language: typing.Optional[str]
+        remember: bool
+
+    name = create_schema_serializer(Session).__name__
+
+    assert name.startswith('SchemaSerializer')
+    assert name == create_schema_serializer(OtherSession).__name__
+    assert name != create_schema_serializer(RenamedSession).__name__
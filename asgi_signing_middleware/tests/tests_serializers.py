@@ -0,0 +1,116 @@
+"""Tests for the serializers module."""
+
+import pickle
+import typing
+from unittest import mock
+
+import pytest
+from blake2signer.interfaces import SerializerInterface
+from blake2signer.serializers import JSONSerializer
+
+from ..cookie import SerializedSignedCookieMiddleware
+from ..serializers import BACKENDS
+from ..serializers import CBORSerializer
+from ..serializers import MsgpackSerializer
+from ..serializers import OrjsonSerializer
+from ..serializers import get_serializer_class
+
+DATA = {'str': 'ñandú', 'int': 1, 'float': 1.5, 'list': [True, None], 'dict': {'a': 'b'}}
+
+
+@pytest.mark.parametrize(
+    'serializer_class',
+    (
+        OrjsonSerializer,
+        MsgpackSerializer,
+        CBORSerializer,
+    ),
+)
+def test_serializers(serializer_class: typing.Type[SerializerInterface]) -> None:
+    """Test that serializers produce bytes that are unserialized to the original data."""
+    serializer = serializer_class()
+
+    serialized = serializer.serialize(DATA)
+
+    assert isinstance(serialized, bytes)
+    assert DATA == serializer.unserialize(serialized)
+
+
+def test_orjson_serializer_is_named_as_json_serializer() -> None:
+    """Test that the orjson serializer keeps the name of the JSON serializer."""
+    assert JSONSerializer.__name__ == OrjsonSerializer.__name__
+    assert DATA == JSONSerializer().unserialize(OrjsonSerializer().serialize(DATA))
+
+
+def test_orjson_serializer_is_picklable() -> None:
+    """Test that the orjson serializer can be pickled, as when sent to worker processes."""
+    middleware = SerializedSignedCookieMiddleware(
+        None,  # type: ignore
+        secret=b'secretsecretsecret',
+        state_attribute_name='cookie',
+        cookie_name='my_cookie',
+        cookie_ttl=60,
+        serializer='orjson',
+    )
+
+    unpickled = pickle.loads(pickle.dumps(middleware))
+
+    assert OrjsonSerializer is pickle.loads(pickle.dumps(OrjsonSerializer))
+    assert OrjsonSerializer is unpickled.serializer
+    assert DATA == unpickled.unsign(middleware.sign(DATA))
+
+
+def test_orjson_serializer_uses_json_with_kwargs() -> None:
+    """Test that the orjson serializer uses the json module if given kwargs."""
+    serializer = OrjsonSerializer()
+
+    serialized = serializer.serialize(DATA, separators=(', ', ': '))
+
+    assert b', ' in serialized
+    assert DATA == serializer.unserialize(serialized, parse_float=float)
+
+
+def test_orjson_serializer_falls_back_to_json() -> None:
+    """Test that the orjson serializer uses the json module if orjson is not installed."""
+    serializer = OrjsonSerializer()
+
+    with mock.patch.dict(BACKENDS, {'orjson': None}):
+        serialized = serializer.serialize(DATA)
+        unserialized = serializer.unserialize(serialized)
+
+    assert JSONSerializer().serialize(DATA) == serialized
+    assert DATA == unserialized
+
+
+@pytest.mark.parametrize(
+    ('name', 'serializer_class'),
+    (
+        ('json', JSONSerializer),
+        ('orjson', OrjsonSerializer),
+        ('msgpack', MsgpackSerializer),
+        ('cbor', CBORSerializer),
+        (MsgpackSerializer, MsgpackSerializer),
+    ),
+)
+def test_get_serializer_class(
+    name: typing.Union[str, typing.Type[SerializerInterface]],
+    serializer_class: typing.Type[SerializerInterface],
+) -> None:
+    """Test getting a serializer class by name."""
+    assert serializer_class is get_serializer_class(name)
+
+
+@pytest.mark.parametrize('name', ('orjson', 'msgpack', 'cbor'))
+def test_get_serializer_class_falls_back_to_json(name: str) -> None:
+    """Test that serializers fall back to JSON if their library is not installed."""
+    with mock.patch.dict(BACKENDS, {name: None}):
+        with pytest.warns(RuntimeWarning, match=f'The {name} serializer is not installed'):
+            serializer_class = get_serializer_class(name)
+
+    assert OrjsonSerializer is serializer_class
+
+
+def test_get_serializer_class_rejects_unknown_names() -> None:
+    """Test that unknown serializer names are rejected."""
+    with pytest.raises(ValueError, match="Unknown serializer 'pickle'"):
+        get_serializer_class('pickle')
@@ -0,0 +1,221 @@
+"""Tests for the session module."""
+
+import json
+import time
+import typing
+from unittest import mock
+
+import pytest
+from blake2signer import Blake2TimestampSigner
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from ..session import SessionData
+from ..session import SessionSignedCookieMiddleware
+from ..stores import MemorySessionStore
+
+
+class TestsSessionSignedCookieMiddleware:
+    """Tests for the SessionSignedCookieMiddleware."""
+
+    secret = b'secretsecretsecret'
+    cookie_name = 'session'
+    cookie_ttl = 60
+
+    def create_test_client(self, store: MemorySessionStore, **kwargs: typing.Any) -> TestClient:
+        """Create a test client for an application using the session middleware."""
+
+        def counter(request: Request) -> JSONResponse:
+            """Endpoint that counts visits in the session."""
+            session: SessionData[typing.Any] = request.state.session
+            session.data = {'visits': (session.data or {}).get('visits', 0) + 1}
+
+            return JSONResponse({
+                'session_id': session.session_id,
+                'exc': repr(session.exc) if session.exc else None,
+            })
+
+        async def visits(request: Request) -> JSONResponse:
+            """Endpoint that reads the session, setting it if given data."""
+            if request.method == 'POST':
+                request.state.session.data = await request.json()
+
+            return JSONResponse(request.state.session.data)
+
+        def increment(request: Request) -> JSONResponse:
+            """Endpoint that modifies the session in place."""
+            request.state.session.data['visits'] += 1
+
+            return JSONResponse()
+
+        def root(request: Request) -> JSONResponse:  # pylint: disable=W0613
+            """Endpoint that doesn't use the session."""
+            return JSONResponse({})
+
+        app = Starlette(
+            routes=[
+                Route('/', root),
+                Route('/counter', counter),
+                Route('/visits', visits, methods=['GET', 'POST']),
+                Route('/increment', increment),
+            ],
+            middleware=[
+                Middleware(
+                    SessionSignedCookieMiddleware,
+                    store=store,
+                    secret=self.secret,
+                    state_attribute_name='session',
+                    cookie_name=self.cookie_name,
+                    cookie_ttl=self.cookie_ttl,
+                    **kwargs,
+                ),
+            ],
+        )
+
+        return TestClient(app)
+
+    def test_session_is_created_and_persisted(self) -> None:
+        """Test that a session is created, and its data is kept in the store."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+
+        response = client.get('/counter')
+        assert {'session_id': None, 'exc': None} == response.json()
+
+        cookie: str = response.cookies[self.cookie_name] or ''
+        session_id = Blake2TimestampSigner(
+            self.secret,
+            personalisation=f'SessionSignedCookieMiddleware{self.cookie_name}',
+        ).unsign(cookie, max_age=self.cookie_ttl).decode()
+        assert 1 == len(store)
+
+        response = client.get('/counter')
+        assert {'session_id': session_id, 'exc': None} == response.json()
+        assert self.cookie_name not in response.cookies  # ID unchanged, cookie not re-sent
+
+        client.cookies.clear()
+        response = client.get('/counter', cookies={self.cookie_name: cookie})
+        assert session_id == response.json()['session_id']
+        assert 1 == len(store)
+
+    def test_session_data_is_kept_in_store(self) -> None:
+        """Test that the session data is kept in the store, not in the cookie."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+
+        client.get('/counter')
+        client.get('/counter')
+        response = client.get('/counter')
+
+        session_id = response.json()['session_id']
+        assert {'visits': 3} == store._sessions[session_id][1]  # pylint: disable=W0212
+
+    def test_session_unmodified_is_not_written(self) -> None:
+        """Test that an unmodified session is not written to the store."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+        client.get('/counter')
+
+        with mock.patch.object(store, 'set') as mock_set:
+            response = client.get('/visits')
+
+        assert {'visits': 1} == response.json()
+        mock_set.assert_not_called()
+
+    def test_session_modified_in_place_is_written(self) -> None:
+        """Test that a session modified in place is written to the store."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+        client.get('/counter')
+
+        response = client.get('/increment')
+
+        assert 200 == response.status_code
+        assert {'visits': 2} == client.get('/visits').json()
+
+    @pytest.mark.parametrize(
+        'data',
+        (None, {'visits': 1}),
+    )
+    def test_session_set_unchanged_is_not_written(self, data: typing.Any) -> None:
+        """Test that a session set to nothing, or to the same data, isn't written."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+        client.get('/counter')
+
+        with mock.patch.object(store, 'set') as mock_set:
+            response = client.post('/visits', data=json.dumps(data))
+
+        assert 200 == response.status_code
+        mock_set.assert_not_called()
+
+    def test_session_cleared_is_deleted(self) -> None:
+        """Test that a session set to nothing is deleted, and its cookie expired."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+        client.get('/counter')
+        session_id = client.get('/counter').json()['session_id']
+
+        with mock.patch.object(store, 'delete', wraps=store.delete) as mock_delete:
+            response = client.post('/visits', data=json.dumps(None))
+
+        assert 200 == response.status_code
+        mock_delete.assert_called_once_with(session_id)
+        assert 0 == len(store)
+        cookies = response.raw.headers.getlist('set-cookie')
+        assert [f'{self.cookie_name}=""; Max-Age=0; Path=/; SameSite=lax'] == cookies
+        assert self.cookie_name not in client.cookies
+
+    def test_session_is_refreshed(self) -> None:
+        """Test that the session cookie is refreshed, extending the session in the store."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store, cookie_refresh_ratio=0.5)
+        with mock.patch('blake2signer.bases.time', return_value=time.time() - 40):
+            cookie = client.get('/counter').cookies[self.cookie_name] or ''
+
+        with mock.patch.object(store, 'set', wraps=store.set) as mock_set:
+            response = client.get('/visits', cookies={self.cookie_name: cookie})
+
+        assert {'visits': 1} == response.json()
+        refreshed_cookie = response.cookies[self.cookie_name]
+        assert refreshed_cookie
+        assert cookie != refreshed_cookie
+        mock_set.assert_called_once_with(mock.ANY, {'visits': 1}, ttl=self.cookie_ttl)
+
+    def test_session_invalid_cookie(self) -> None:
+        """Test that an invalid cookie sets the exception and creates a new session."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+
+        response = client.get('/counter', cookies={self.cookie_name: 'invalid'})
+
+        assert response.json()['session_id'] is None
+        assert 'SignatureError' in response.json()['exc']
+        assert self.cookie_name in response.cookies
+
+    def test_session_unused_is_not_created(self) -> None:
+        """Test that a session is not created if it isn't used."""
+        store = MemorySessionStore()
+        client = self.create_test_client(store)
+
+        response = client.get('/')
+
+        assert self.cookie_name not in response.cookies
+        assert 0 == len(store)
+
+    def test_session_lazy_is_not_supported(self) -> None:
+        """Test that the lazy mode is not supported."""
+        with pytest.raises(ValueError, match='lazy mode is not supported'):
+            SessionSignedCookieMiddleware(
+                Starlette(),
+                store=MemorySessionStore(),
+                secret=self.secret,
+                state_attribute_name='session',
+                cookie_name=self.cookie_name,
+                cookie_ttl=self.cookie_ttl,
+                lazy=True,
+            )
@@ -0,0 +1,92 @@
+"""Tests for the stores module."""
+
+import typing
+from pathlib import Path
+from unittest import mock
+
+import anyio
+import pytest
+
+from ..stores import FileSessionStore
+from ..stores import MemorySessionStore
+from ..stores import SQLiteSessionStore
+from ..stores import SessionStore
+
+
+@pytest.fixture(params=('memory', 'file', 'sqlite'))
+def store(request: pytest.FixtureRequest, tmp_path: Path) -> typing.Iterator[SessionStore]:
+    """Get each of the session stores."""
+    if request.param == 'memory':
+        yield MemorySessionStore()
+    elif request.param == 'file':
+        yield FileSessionStore(tmp_path / 'sessions')
+    else:
+        sqlite_store = SQLiteSessionStore(tmp_path / 'sessions.sqlite3')
+        yield sqlite_store
+        sqlite_store.close()
+
+
+def test_store_set_get_delete(store: SessionStore) -> None:
+    """Test that sessions can be set, get, and deleted."""
+    data = {'some': ['data', 1, 2.5, True, None]}
+
+    assert anyio.run(store.get, 'session') is None
+
+    anyio.run(lambda: store.set('session', data, ttl=60))
+    assert data == anyio.run(store.get, 'session')
+
+    anyio.run(lambda: store.set('session', 'new data', ttl=60))
+    assert 'new data' == anyio.run(store.get, 'session')
+
+    anyio.run(store.delete, 'session')
+    assert anyio.run(store.get, 'session') is None
+
+    anyio.run(store.delete, 'session')  # deleting again does nothing
+
+
+def test_store_expired_session(store: SessionStore) -> None:
+    """Test that expired sessions are not returned."""
+    anyio.run(lambda: store.set('session', 'data', ttl=60))
+
+    with mock.patch('time.monotonic', return_value=float('inf')):
+        with mock.patch('time.time', return_value=float('inf')):
+            assert anyio.run(store.get, 'session') is None
+
+    assert anyio.run(store.get, 'session') is None  # It was removed
+
+
+def test_memory_store_evicts_least_recently_used() -> None:
+    """Test that the memory store evicts the least recently used sessions."""
+    store = MemorySessionStore(max_size=2)
+
+    anyio.run(lambda: store.set('first', 1, ttl=60))
+    anyio.run(lambda: store.set('second', 2, ttl=60))
+    assert 1 == anyio.run(store.get, 'first')  # Now "second" is the least recently used
+    anyio.run(lambda: store.set('third', 3, ttl=60))
+
+    assert 2 == len(store)
+    assert 1 == anyio.run(store.get, 'first')
+    assert anyio.run(store.get, 'second') is None
+    assert 3 == anyio.run(store.get, 'third')
+
+
+def test_file_store_writes_files(tmp_path: Path) -> None:
+    """Test that the file store keeps a file per session, and no temporary files."""
+    store = FileSessionStore(tmp_path)
+
+    anyio.run(lambda: store.set('session', 'data', ttl=60))
+
+    assert [store.get_path('session')] == list(tmp_path.iterdir())
+
+
+def test_sqlite_store_purge(tmp_path: Path) -> None:
+    """Test that the SQLite store can purge expired sessions."""
+    store = SQLiteSessionStore(tmp_path / 'sessions.sqlite3')
+
+    anyio.run(lambda: store.set('expired', 'data', ttl=-1))
+    anyio.run(lambda: store.set('session', 'data', ttl=60))
+    anyio.run(store.purge)
+
+    # pylint: disable=W0212
+    assert [('session',)] == store._execute('SELECT id FROM sessions')
+    store.close()
@@ -0,0 +1,55 @@
+"""Tests for the tracing module."""
+
+from unittest import mock
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from ..tracing import CookieTracer
+from ..tracing import NO_SPAN
+from ..tracing import NoOpSpan
+
+
+def test_no_span_ignores_every_attribute() -> None:
+    """Test that the no-op span can be given any attribute, doing nothing."""
+    with NO_SPAN as span:
+        assert isinstance(span, NoOpSpan)
+        span.set_attribute('cookie.size', 100)
+
+
+def test_tracer_starts_spans() -> None:
+    """Test that the tracer starts spans with given attributes, recording exceptions."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = CookieTracer(provider.get_tracer('test'))
+
+    with tracer.start_span('read_cookie', {'cookie.name': 'cookie'}) as span:
+        span.set_attribute('cookie.size', 100)
+
+    with pytest.raises(ValueError):
+        with tracer.start_span('unsign', {}):
+            raise ValueError
+
+    read_span, unsign_span = exporter.get_finished_spans()
+    assert 'read_cookie' == read_span.name
+    assert {'cookie.name': 'cookie', 'cookie.size': 100} == dict(read_span.attributes or {})
+    assert 'exception' == unsign_span.events[0].name
+
+
+def test_tracer_uses_the_global_tracer_provider_by_default() -> None:
+    """Test that the tracer gets a tracer from the global tracer provider if none given."""
+    with mock.patch('opentelemetry.trace.get_tracer') as mock_get_tracer:
+        tracer = CookieTracer()
+
+    mock_get_tracer.assert_called_once_with('asgi_signing_middleware')
+    assert mock_get_tracer.return_value is tracer.tracer
+
+
+def test_tracer_requires_opentelemetry() -> None:
+    """Test that the tracer can't be created without opentelemetry-api."""
+    with mock.patch('asgi_signing_middleware.tracing.import_optional', return_value=None):
+        with pytest.raises(ImportError, match='opentelemetry-api'):
+            CookieTracer()
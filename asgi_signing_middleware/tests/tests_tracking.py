@@ -0,0 +1,147 @@
+"""Tests for the tracking module."""
+
+import copy
+import json
+import pickle  # noqa: S403
+import typing
+from unittest import mock
+
+import pytest
+
+from ..cookie import CookieData
+from ..tracking import TrackedDict
+from ..tracking import TrackedList
+from ..tracking import track
+
+
+def test_track_wraps_containers_only() -> None:
+    """Test that only dicts and lists are tracked."""
+    on_change = mock.Mock()
+
+    assert isinstance(track({}, on_change), TrackedDict)
+    assert isinstance(track([], on_change), TrackedList)
+    assert 'data' == track('data', on_change)
+    assert track(None, on_change) is None
+
+
+def test_track_reuses_tracked_containers() -> None:
+    """Test that a container already tracked is not wrapped again, but takes the callback."""
+    on_change = mock.Mock()
+    tracked = track({'a': 1}, on_change)
+
+    assert tracked is track(tracked, on_change)
+
+    other_on_change = mock.Mock()
+    assert tracked is track(tracked, other_on_change)
+
+    tracked['b'] = 2
+
+    on_change.assert_not_called()
+    other_on_change.assert_called_once_with()
+
+
+def test_cookie_data_reuses_tracked_containers() -> None:
+    """Test that the cookie data container copies untracked data only."""
+    data = {'a': 1}
+    cookie = CookieData(data=data)
+
+    assert data == cookie.data
+    assert data is not cookie.data
+    assert isinstance(cookie.data, TrackedDict)
+
+    other_cookie = CookieData(data=cookie.data)
+
+    assert cookie.data is other_cookie.data
+
+    other_cookie.data['b'] = 2
+
+    assert (False, True) == (cookie.modified, other_cookie.modified)
+
+
+@pytest.mark.parametrize(
+    'modify',
+    (
+        lambda data: data.__setitem__('b', 2),
+        lambda data: data.__delitem__('a'),
+        lambda data: data.__ior__({'b': 2}),
+        lambda data: data.clear(),
+        lambda data: data.pop('a'),
+        lambda data: data.popitem(),
+        lambda data: data.setdefault('b', 2),
+        lambda data: data.update(b=2),
+        lambda data: data['nested'].append(2),
+        lambda data: data.get('nested').append(2),
+        lambda data: data.setdefault('nested', []).append(2),
+        lambda data: list(data.values())[1].append(2),
+        lambda data: dict(data.items())['nested'].append(2),
+    ),
+)
+def test_tracked_dict_modifications(modify: typing.Callable[[TrackedDict], None]) -> None:
+    """Test that modifying a tracked dict, or its nested containers, is tracked."""
+    on_change = mock.Mock()
+    original = {'a': 1, 'nested': [1]}
+    tracked = TrackedDict(original, on_change)
+
+    modify(tracked)
+
+    on_change.assert_called()
+    assert {'a': 1, 'nested': [1]} == original  # Top level is a copy
+
+
+@pytest.mark.parametrize(
+    'modify',
+    (
+        lambda data: data.__setitem__(0, 2),
+        lambda data: data.__delitem__(0),
+        lambda data: data.__iadd__([2]),
+        lambda data: data.__imul__(2),
+        lambda data: data.append(2),
+        lambda data: data.extend([2]),
+        lambda data: data.insert(0, 2),
+        lambda data: data.pop(),
+        lambda data: data.remove(1),
+        lambda data: data.clear(),
+        lambda data: data.sort(key=str),
+        lambda data: data.reverse(),
+        lambda data: data[1].update(b=2),
+        lambda data: next(item for item in data if isinstance(item, dict)).update(b=2),
+    ),
+)
+def test_tracked_list_modifications(modify: typing.Callable[[TrackedList], None]) -> None:
+    """Test that modifying a tracked list, or its nested containers, is tracked."""
+    on_change = mock.Mock()
+    tracked = TrackedList([1, {'a': 1}], on_change)
+
+    modify(tracked)
+
+    on_change.assert_called()
+
+
+def test_tracked_containers_reads_are_not_tracked() -> None:
+    """Test that reading tracked containers doesn't count as a modification."""
+    on_change = mock.Mock()
+    tracked = TrackedDict({'a': 1, 'nested': [{'b': [2]}]}, on_change)
+
+    assert 1 == tracked['a']
+    assert tracked.get('missing') is None
+    assert 'default' == tracked.get('missing', 'default')
+    assert [2] == tracked['nested'][0]['b']
+    assert [{'b': [2]}] == tracked['nested'][:]
+    assert [[{'b': [2]}]] == [value for key, value in tracked.items() if key == 'nested']
+    assert 1 == tracked.setdefault('a', 3)
+
+    on_change.assert_not_called()
+
+
+def test_tracked_containers_are_serializable() -> None:
+    """Test that tracked containers can be serialized as their plain counterparts."""
+    data = {'a': 1, 'nested': [{'b': [2]}]}
+    tracked = TrackedDict(data, mock.Mock())
+    tracked['nested'][0]['b'].append(3)  # Track nested containers
+
+    expected = {'a': 1, 'nested': [{'b': [2, 3]}]}
+    assert expected == json.loads(json.dumps(tracked))
+    assert expected == pickle.loads(pickle.dumps(tracked))  # noqa: S301
+    assert type(pickle.loads(pickle.dumps(tracked))) is dict  # noqa: S301
+    assert type(pickle.loads(pickle.dumps(tracked['nested']))) is list  # noqa: S301
+    assert expected == copy.deepcopy(tracked)
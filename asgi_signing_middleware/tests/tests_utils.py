@@ -0,0 +1,46 @@
+"""Tests for the utils module."""
+
+import time
+from http.cookies import SimpleCookie
+from unittest import mock
+
+from ..utils import estimate_size
+from ..utils import format_cookie_date
+from ..utils import import_optional
+from ..utils import quote_cookie_value
+
+
+def test_import_optional() -> None:
+    """Test that optional modules are imported, or None if not installed."""
+    assert import_optional('json') is not None
+    assert import_optional('surely_not_an_installed_module') is None
+
+
+def test_quote_cookie_value() -> None:
+    """Test that cookie values are quoted only if they need it, as `http.cookies` does."""
+    assert 'Sig-1_x.AAAnEA.eyJhIjoxfQ~k:1' == quote_cookie_value('Sig-1_x.AAAnEA.eyJhIjoxfQ~k:1')
+    assert '""' == quote_cookie_value('')
+    assert '"some data"' == quote_cookie_value('some data')
+    assert '"\\073"' == quote_cookie_value(';')
+
+
+def test_estimate_size() -> None:
+    """Test that the size of data is estimated, counting up to the limit only."""
+    data = {'items': ['a' * 100, 'b' * 100], 'count': 2}
+
+    assert 232 == estimate_size(data, limit=1024)
+    assert 0 == estimate_size(data, limit=0)
+    assert 100 <= estimate_size(data, limit=100) < 232
+
+
+def test_format_cookie_date() -> None:
+    """Test that dates are formatted from seconds from now, as `http.cookies` does."""
+    cookie = SimpleCookie()
+    cookie['name'] = 'value'
+    cookie['name']['expires'] = 3600
+
+    with mock.patch('time.time', return_value=time.time()) as mock_time:
+        with mock.patch('asgi_signing_middleware.utils.time', mock_time):
+            expected = cookie['name'].OutputString().split('expires=')[1]
+
+            assert expected == format_cookie_date(3600)
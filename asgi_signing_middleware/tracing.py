@@ -0,0 +1,73 @@
+"""Middleware tracing.
+
+Tracers open spans around reading, unsigning, signing and writing a cookie, so that the
+cost of checking signatures can be spotted in distributed traces. Spans have attributes
+for the cookie name, its serializer and compression (for serialized cookies), and, for
+reading and writing, its signed size and the outcome (see the `observers` module).
+
+Tracing requires OpenTelemetry. When the middlewares have no tracer, spans are replaced by
+a no-op that costs next to nothing.
+"""
+
+import typing
+from contextlib import nullcontext
+
+from .utils import import_optional
+
+
+class NoOpSpan:
+    """Span that ignores every attribute, used when there's no tracer."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: typing.Any) -> None:
+        """Ignore given attribute."""
+
+
+# Context manager used instead of a span when there's no tracer
+NO_SPAN: typing.ContextManager[typing.Any] = nullcontext(NoOpSpan())
+
+
+class CookieTracer:
+    """Tracer of the signed cookie middlewares, which requires opentelemetry-api."""
+
+    def __init__(self, tracer: typing.Any = None) -> None:
+        """Create a cookie tracer.
+
+        Args:
+            tracer (optional): An OpenTelemetry tracer (defaults to one from the global
+                tracer provider).
+
+        Raises:
+            ImportError: opentelemetry-api is not installed.
+        """
+        trace = import_optional('opentelemetry.trace')
+        if trace is None:
+            raise ImportError('The opentelemetry-api package is required by this tracer')
+
+        self.tracer: typing.Any = (
+            trace.get_tracer('asgi_signing_middleware') if tracer is None else tracer
+        )
+
+    def start_span(
+        self,
+        name: str,
+        attributes: typing.Dict[str, typing.Any],
+    ) -> typing.ContextManager[typing.Any]:
+        """Start a span as the current one, ending it on exit.
+
+        Exceptions raised within the span are recorded in it.
+
+        Args:
+            name: The span name.
+            attributes: The span attributes.
+
+        Returns:
+            A context manager that yields the span.
+        """
+        span: typing.ContextManager[typing.Any] = self.tracer.start_as_current_span(
+            name,
+            attributes=attributes,
+        )
+
+        return span
@@ -0,0 +1,241 @@
+"""Mutation tracking containers.
+
+Data read from a cookie is wrapped in these containers, so that modifying it in place is
+noticed without comparing it against the original data. Nested containers are wrapped as
+they are accessed.
+"""
+
+import typing
+
+OnChange = typing.Callable[[], None]
+
+
+def track(value: typing.Any, on_change: OnChange) -> typing.Any:
+    """Wrap given value in a tracking container if it is a dict or a list.
+
+    Args:
+        value: Any value.
+        on_change: Callable to call without arguments when the value is modified.
+
+    Returns:
+        The value itself if it is already a tracking container, now calling given callback
+        instead, a tracking container of a shallow copy of the value if it is a dict or a
+        list, the value itself otherwise.
+    """
+    if isinstance(value, (TrackedDict, TrackedList)):
+        value.on_change = on_change
+        return value
+
+    if isinstance(value, dict):
+        return TrackedDict(value, on_change)
+
+    if isinstance(value, list):
+        return TrackedList(value, on_change)
+
+    return value
+
+
+class TrackedDict(typing.Dict[typing.Any, typing.Any]):
+    """Dict that calls a callback when modified, including its nested containers."""
+
+    __slots__ = ('on_change',)
+
+    def __init__(self, data: typing.Mapping[typing.Any, typing.Any], on_change: OnChange) -> None:
+        """Create a tracking dict from given data.
+
+        Args:
+            data: Data to copy.
+            on_change: Callable to call without arguments when the dict is modified.
+        """
+        super().__init__(data)
+        self.on_change = on_change
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        """Reduce to a plain dict, dropping the callback."""
+        return dict, (dict(self),)
+
+    def _track_item(self, key: typing.Any, value: typing.Any) -> typing.Any:
+        """Wrap given value of an item in a tracking container, if necessary."""
+        tracked = track(value, self.on_change)
+        if tracked is not value:
+            super().__setitem__(key, tracked)
+
+        return tracked
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        """Get an item, tracking it."""
+        return self._track_item(key, super().__getitem__(key))
+
+    def get(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        """Get an item if it exists, tracking it, or return the default value."""
+        return self[key] if key in self else default
+
+    def values(self) -> typing.ValuesView[typing.Any]:  # type: ignore[override]
+        """Get the values, tracking them."""
+        for key, value in super().items():
+            self._track_item(key, value)
+
+        return super().values()
+
+    def items(self) -> typing.ItemsView[typing.Any, typing.Any]:  # type: ignore[override]
+        """Get the items, tracking them."""
+        self.values()
+
+        return super().items()
+
+    def __setitem__(self, key: typing.Any, value: typing.Any) -> None:
+        """Set an item."""
+        super().__setitem__(key, value)
+        self.on_change()
+
+    def __delitem__(self, key: typing.Any) -> None:
+        """Delete an item."""
+        super().__delitem__(key)
+        self.on_change()
+
+    def __ior__(self, other: typing.Any) -> 'TrackedDict':  # type: ignore[misc]
+        """Update the dict."""
+        self.update(other)
+
+        return self
+
+    def clear(self) -> None:
+        """Remove all items."""
+        super().clear()
+        self.on_change()
+
+    def pop(self, *args: typing.Any) -> typing.Any:
+        """Remove an item, returning its value."""
+        value = super().pop(*args)
+        self.on_change()
+
+        return value
+
+    def popitem(self) -> typing.Tuple[typing.Any, typing.Any]:
+        """Remove the last item, returning it."""
+        item = super().popitem()
+        self.on_change()
+
+        return item
+
+    def setdefault(self, key: typing.Any, default: typing.Any = None) -> typing.Any:
+        """Get an item, tracking it, setting it to the default value if it doesn't exist."""
+        if key in self:
+            return self[key]
+
+        self[key] = default
+
+        return default
+
+    def update(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        """Update the dict."""
+        super().update(*args, **kwargs)
+        self.on_change()
+
+
+class TrackedList(typing.List[typing.Any]):
+    """List that calls a callback when modified, including its nested containers."""
+
+    __slots__ = ('on_change',)
+
+    def __init__(self, data: typing.Iterable[typing.Any], on_change: OnChange) -> None:
+        """Create a tracking list from given data.
+
+        Args:
+            data: Data to copy.
+            on_change: Callable to call without arguments when the list is modified.
+        """
+        super().__init__(data)
+        self.on_change = on_change
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        """Reduce to a plain list, dropping the callback."""
+        return list, (list(self),)
+
+    def _track_item(self, index: int, value: typing.Any) -> typing.Any:
+        """Wrap given value of an item in a tracking container, if necessary."""
+        tracked = track(value, self.on_change)
+        if tracked is not value:
+            super().__setitem__(index, tracked)
+
+        return tracked
+
+    def __getitem__(self, index: typing.Any) -> typing.Any:
+        """Get an item, tracking it (slices are plain copies)."""
+        value = super().__getitem__(index)
+        if isinstance(index, slice):
+            return value
+
+        return self._track_item(index, value)
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        """Iterate over the items, tracking them."""
+        for index, value in enumerate(super().__iter__()):
+            self._track_item(index, value)
+
+        return super().__iter__()
+
+    def __setitem__(self, index: typing.Any, value: typing.Any) -> None:
+        """Set an item."""
+        super().__setitem__(index, value)
+        self.on_change()
+
+    def __delitem__(self, index: typing.Any) -> None:
+        """Delete an item."""
+        super().__delitem__(index)
+        self.on_change()
+
+    def __iadd__(self, other: typing.Iterable[typing.Any]) -> 'TrackedList':  # type: ignore[misc]
+        """Extend the list."""
+        self.extend(other)
+
+        return self
+
+    def __imul__(self, other: typing.SupportsIndex) -> 'TrackedList':
+        """Repeat the list in place."""
+        super().__imul__(other)
+        self.on_change()
+
+        return self
+
+    def append(self, value: typing.Any) -> None:
+        """Append an item."""
+        super().append(value)
+        self.on_change()
+
+    def extend(self, values: typing.Iterable[typing.Any]) -> None:
+        """Extend the list."""
+        super().extend(values)
+        self.on_change()
+
+    def insert(self, index: typing.SupportsIndex, value: typing.Any) -> None:
+        """Insert an item."""
+        super().insert(index, value)
+        self.on_change()
+
+    def pop(self, *args: typing.Any) -> typing.Any:
+        """Remove an item, returning it."""
+        value = super().pop(*args)
+        self.on_change()
+
+        return value
+
+    def remove(self, value: typing.Any) -> None:
+        """Remove the first occurrence of a value."""
+        super().remove(value)
+        self.on_change()
+
+    def clear(self) -> None:
+        """Remove all items."""
+        super().clear()
+        self.on_change()
+
+    def sort(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        """Sort the list in place."""
+        super().sort(*args, **kwargs)
+        self.on_change()
+
+    def reverse(self) -> None:
+        """Reverse the list in place."""
+        super().reverse()
+        self.on_change()
@@ -11,13 +11,27 @@ TSigner = typing.TypeVar('TSigner', Blake2TimestampSigner, Blake2SerializerSigne
 # JSON valid types
 JSONTypes = typing.Union[str, typing.Dict[str, typing.Any], int, float, typing.List[typing.Any]]
 
+# Signing secret, and one or more secrets ordered from newest to oldest, for key rotation
+Secret = typing.Union[str, bytes]
+Secrets = typing.Union[Secret, typing.Sequence[Secret]]
+
 # Generic data type
 TData = typing.TypeVar('TData')
 
+# Generic result type
+TResult = typing.TypeVar('TResult')
+
+# Outcome of reading a cookie: its data, any exception raised while checking it, and
+# whether it is due to be refreshed
+CookieReadResult = typing.Tuple[typing.Optional[TData], typing.Optional[Exception], bool]
+
 # Cookie properties accepted by Starlette's `Response.set_cookie`, as a type
 # Using a TypedDict proved to be too complicated and forced a very particular usage, so
 # I opted for a simple dictionary.
-CookieProperties = typing.Dict[str, typing.Union[str, bool, None]]
+CookieProperties = typing.Dict[str, typing.Union[str, int, bool, None]]
+
+# Request path pattern: either a path prefix, or a compiled regular expression
+PathPattern = typing.Union[str, typing.Pattern[str]]
 
 # Generic middleware type
 TMiddleware = typing.TypeVar('TMiddleware')
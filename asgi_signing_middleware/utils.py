@@ -0,0 +1,62 @@
+"""Miscellaneous utilities."""
+
+import importlib
+import re
+import typing
+from email.utils import formatdate
+from http.cookies import SimpleCookie
+from time import time
+from types import ModuleType
+
+# Characters of a cookie value that doesn't need quoting, as in `http.cookies`
+COOKIE_VALUE_PATTERN = re.compile(r"[\w!#$%&'*+\-.^`|~:]+", re.ASCII)
+
+
+def import_optional(name: str) -> typing.Optional[ModuleType]:
+    """Import an optional module, returning None if it is not installed."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def estimate_size(data: typing.Any, *, limit: int) -> int:
+    """Estimate the size of data once serialized, in bytes, counting up to given limit.
+
+    Strings and bytes are measured, containers are walked, and other objects count as a
+    few bytes, so that the estimate is cheap even for big data.
+    """
+    size = 0
+    pending = [data]
+    while pending and size < limit:
+        item = pending.pop()
+        if isinstance(item, (str, bytes)):
+            size += len(item) + 2
+        elif isinstance(item, dict):
+            pending.extend(item.items())
+        elif isinstance(item, (list, tuple)):
+            pending.extend(item)
+            size += 2
+        else:
+            size += 8
+
+    return size
+
+
+def quote_cookie_value(value: str) -> str:
+    """Quote a cookie value if it needs it, as `http.cookies` does.
+
+    Signed values never need it, so they are returned as they are without going through
+    `http.cookies`.
+    """
+    if COOKIE_VALUE_PATTERN.fullmatch(value):
+        return value
+
+    quoted_value: str = SimpleCookie().value_encode(value)[1]
+
+    return quoted_value
+
+
+def format_cookie_date(seconds: int) -> str:
+    """Format the date given seconds from now, as `http.cookies` does for the expiry."""
+    return formatdate(time() + seconds, usegmt=True)
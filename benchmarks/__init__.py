@@ -0,0 +1,5 @@
+"""Benchmarks.
+
+These are not tests, and are not collected by the default test run. Run them with
+`invoke bench`, see the task help for more information.
+"""
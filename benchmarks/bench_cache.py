@@ -0,0 +1,58 @@
+"""Benchmarks for the verified cookie cache, against unsigning the cookie every time."""
+
+import typing
+
+import pytest
+
+from asgi_signing_middleware import SerializedSignedCookieMiddleware
+
+# Nested payloads, typical of cookies that are read on every request
+PAYLOADS: typing.Dict[str, typing.Dict[str, typing.Any]] = {
+    'flash': {
+        'messages': [
+            {'level': 'info', 'text': f'Saved item {index}', 'tags': ['a', 'b'], 'seen': False}
+            for index in range(5)
+        ],
+    },
+    'cart': {
+        'items': [
+            {'sku': f'SKU{index:05}', 'qty': index, 'price': {'amount': 1999, 'currency': 'EUR'}}
+            for index in range(5)
+        ],
+        'coupon': None,
+    },
+}
+
+
+def unsign(middleware: SerializedSignedCookieMiddleware, signed_data: str) -> typing.Any:
+    """Get the data unsigning the cookie."""
+    return middleware.unsign(signed_data)
+
+
+def cache_hit(middleware: SerializedSignedCookieMiddleware, signed_data: str) -> typing.Any:
+    """Get the data from the verified cookie cache, where it already is."""
+    return middleware.unsign_cached(signed_data)
+
+
+@pytest.mark.parametrize('payload', tuple(PAYLOADS))
+@pytest.mark.parametrize('reader', (unsign, cache_hit))
+def test_read_cookie(
+    benchmark: typing.Any,
+    reader: typing.Callable[[SerializedSignedCookieMiddleware, str], typing.Any],
+    payload: str,
+) -> None:
+    """Benchmark reading a nested payload, unsigning it or from the cache."""
+    middleware = SerializedSignedCookieMiddleware(
+        None,  # type: ignore[arg-type]
+        secret=b'secretsecretsecret',
+        state_attribute_name='cookie',
+        cookie_name='my_cookie',
+        cookie_ttl=60,
+        cookie_cache_size=10,
+    )
+    signed_data = middleware.sign(PAYLOADS[payload])
+    middleware.unsign_cached(signed_data)
+    benchmark.group = f'{payload} payload'
+
+    assert PAYLOADS[payload] == benchmark(reader, middleware, signed_data)
+    assert 1 == middleware.verified_cache.stats.misses  # type: ignore[union-attr]
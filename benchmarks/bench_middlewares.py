@@ -0,0 +1,181 @@
+"""Benchmarks for the signed cookie middlewares.
+
+Middlewares are driven directly through the ASGI interface, without a server, a test
+client, nor an event loop, so that mostly the middleware itself is measured.
+
+Besides the timings measured by pytest-benchmark, the following is stored as extra info
+for every benchmark: requests per second and p50/p99 latencies (in seconds), the Python
+implementation, and the peak traced memory per request (CPython only).
+"""
+
+import platform
+import statistics
+import string
+import tracemalloc
+import typing
+
+import pytest
+
+from asgi_signing_middleware import SerializedSignedCookieMiddleware
+from asgi_signing_middleware import SimpleSignedCookieMiddleware
+from asgi_signing_middleware.cookie import SignedCookieMiddlewareBase
+
+if typing.TYPE_CHECKING:
+    from starlette.types import Message
+    from starlette.types import Scope
+
+PAYLOAD_SIZES = (10, 100, 1000, 4096)
+MEMORY_ROUNDS = 100
+STATE_ATTRIBUTE_NAME = 'cookie'
+COOKIE_NAME = 'my_cookie'
+
+
+def create_payload(size: int) -> str:
+    """Create a payload of the given size, in characters."""
+    letters = string.ascii_letters * (size // len(string.ascii_letters) + 1)
+
+    return letters[:size]
+
+
+def create_app(*, new_data: typing.Optional[str]) -> typing.Callable[..., typing.Any]:
+    """Create a raw ASGI application that reads the cookie, and writes it if given data."""
+
+    async def app(
+        scope: 'Scope',
+        receive: typing.Callable[..., typing.Any],  # pylint: disable=W0613
+        send: typing.Callable[..., typing.Any],
+    ) -> None:
+        cookie = scope['state'][STATE_ATTRIBUTE_NAME]
+        assert cookie.data is not None
+        if new_data is not None:
+            cookie.data = new_data
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    return app
+
+
+async def receive() -> 'Message':
+    """Receive an empty request body."""
+    return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+
+async def send(message: 'Message') -> None:  # pylint: disable=W0613
+    """Discard the message."""
+
+
+def run(middleware: SignedCookieMiddlewareBase[typing.Any, typing.Any], scope: 'Scope') -> None:
+    """Run a request through the middleware, without an event loop.
+
+    Neither the application nor the middleware suspend, so the coroutine can be simply
+    stepped until it finishes.
+    """
+    coroutine = middleware({**scope, 'state': {}}, receive, send)
+    try:
+        coroutine.send(None)
+    except StopIteration:
+        return
+
+    coroutine.close()
+    raise RuntimeError('The ASGI application suspended, which is not supported')
+
+
+def measure_peak_memory(
+    middleware: SignedCookieMiddlewareBase[typing.Any, typing.Any],
+    scope: 'Scope',
+) -> float:
+    """Measure the mean peak traced memory per request, in bytes."""
+    peaks = []
+    for _ in range(MEMORY_ROUNDS):
+        tracemalloc.start()
+        run(middleware, scope)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+
+    return statistics.mean(peaks)
+
+
+def store_extra_info(benchmark: typing.Any) -> None:
+    """Store requests per second and latency percentiles as benchmark extra info."""
+    if benchmark.stats is None:  # Benchmarks are disabled
+        return
+
+    data = benchmark.stats.stats.data
+    percentiles = statistics.quantiles(data, n=100)
+    benchmark.extra_info['requests_per_second'] = 1 / statistics.mean(data)
+    benchmark.extra_info['p50'] = percentiles[49]
+    benchmark.extra_info['p99'] = percentiles[98]
+
+
+@pytest.mark.parametrize('traffic', ('read-only', 'read-write'))
+@pytest.mark.parametrize('size', PAYLOAD_SIZES)
+@pytest.mark.parametrize(
+    'middleware_class',
+    (SimpleSignedCookieMiddleware, SerializedSignedCookieMiddleware),
+)
+def test_middleware(
+    benchmark: typing.Any,
+    middleware_class: typing.Type[SignedCookieMiddlewareBase[typing.Any, typing.Any]],
+    size: int,
+    traffic: str,
+) -> None:
+    """Benchmark a request with a cookie going through a middleware."""
+    payload = create_payload(size)
+    middleware = middleware_class(
+        create_app(new_data=payload.swapcase() if traffic == 'read-write' else None),
+        secret=b'secretsecretsecret',
+        state_attribute_name=STATE_ATTRIBUTE_NAME,
+        cookie_name=COOKIE_NAME,
+        cookie_ttl=60,
+    )
+    cookie = f'{COOKIE_NAME}={middleware.sign(payload)}'
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'query_string': b'',
+        'headers': [(b'cookie', cookie.encode())],
+    }
+
+    benchmark.group = f'{traffic} {size}B'
+    benchmark.extra_info['implementation'] = platform.python_implementation()
+    if platform.python_implementation() == 'CPython':
+        benchmark.extra_info['peak_memory_per_request'] = measure_peak_memory(
+            middleware,
+            scope,
+        )
+
+    benchmark(run, middleware, scope)
+
+    store_extra_info(benchmark)
+
+
+@pytest.mark.parametrize('serializer', ('json', 'orjson', 'msgpack', 'cbor'))
+def test_serializer(benchmark: typing.Any, serializer: str) -> None:
+    """Benchmark a read-write request through the serialized middleware per serializer."""
+    payload = {'messages': [create_payload(10)] * 10, 'ids': list(range(10))}
+    middleware = SerializedSignedCookieMiddleware(
+        create_app(new_data={**payload, 'seen': True}),  # type: ignore[arg-type]
+        secret=b'secretsecretsecret',
+        state_attribute_name=STATE_ATTRIBUTE_NAME,
+        cookie_name=COOKIE_NAME,
+        cookie_ttl=60,
+        serializer=serializer,
+    )
+    cookie = f'{COOKIE_NAME}={middleware.sign(payload)}'
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'query_string': b'',
+        'headers': [(b'cookie', cookie.encode())],
+    }
+
+    benchmark.group = 'serializers'
+    benchmark.extra_info['cookie_size'] = len(cookie)
+
+    benchmark(run, middleware, scope)
+
+    store_extra_info(benchmark)
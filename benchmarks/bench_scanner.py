@@ -0,0 +1,45 @@
+"""Benchmarks for the cookie header scanner, against Starlette's cookie parser."""
+
+import typing
+
+import pytest
+from starlette.requests import cookie_parser
+
+from asgi_signing_middleware.scanner import get_cookie
+from asgi_signing_middleware.scanner import get_cookie_header
+
+COOKIE_NAME = 'my_cookie'
+
+
+def create_headers(amount: int) -> typing.List[typing.Tuple[bytes, bytes]]:
+    """Create scope headers with given amount of third-party cookies, plus ours."""
+    cookies = [f'_analytics{index}=GA1.2.{index:010}.1666000000' for index in range(amount)]
+    cookies.insert(amount // 2, f'{COOKIE_NAME}=signature.timestamp.data')
+
+    return [(b'host', b'example.com'), (b'cookie', '; '.join(cookies).encode())]
+
+
+def parse(headers: typing.List[typing.Tuple[bytes, bytes]]) -> str:
+    """Get our cookie parsing every cookie, as `request.cookies` does."""
+    header = get_cookie_header(headers).decode('latin-1')
+
+    return cookie_parser(header).get(COOKIE_NAME, '')
+
+
+def scan(headers: typing.List[typing.Tuple[bytes, bytes]]) -> str:
+    """Get our cookie scanning the raw header."""
+    return get_cookie(get_cookie_header(headers), COOKIE_NAME)
+
+
+@pytest.mark.parametrize('amount', (0, 10, 30))
+@pytest.mark.parametrize('reader', (parse, scan))
+def test_read_cookie(
+    benchmark: typing.Any,
+    reader: typing.Callable[[typing.List[typing.Tuple[bytes, bytes]]], str],
+    amount: int,
+) -> None:
+    """Benchmark reading our cookie among other cookies."""
+    headers = create_headers(amount)
+    benchmark.group = f'{amount} other cookies'
+
+    assert 'signature.timestamp.data' == benchmark(reader, headers)
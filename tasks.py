@@ -22,6 +22,7 @@ def flake8(ctx):
     ctx.run('flake8 --exclude tests asgi_signing_middleware/', echo=True)
     ctx.run('flake8 --ignore=S101,R701,C901 asgi_signing_middleware/tests/', echo=True)
     ctx.run('flake8 --ignore=S101,R701,C901 tests/', echo=True)
+    ctx.run('flake8 --ignore=S101,R701,C901 benchmarks/', echo=True)
     ctx.run('flake8 tasks.py', echo=True)
 
 
@@ -64,6 +65,7 @@ def mypy(ctx):
     """Lint code with mypy."""
     ctx.run('mypy asgi_signing_middleware/', echo=True, pty=True)
     ctx.run('mypy tests/', echo=True, pty=True)
+    ctx.run('mypy benchmarks/', echo=True, pty=True)
 
 
 @task
@@ -118,6 +120,7 @@ def clean(ctx):
         'htmlcov',
         '.mypy_cache',
         '.pytest_cache',
+        '.benchmarks',
         'site',
     )
     ctx.run(f'rm -vrf {" ".join(remove)}', echo=True)
@@ -158,6 +161,39 @@ def tests(ctx, watch=False, seed=0, coverage=True):
     ctx.run(' '.join(cmd1), pty=True, echo=True)
 
 
+@task(
+    aliases=['bench'],
+    help={
+        'save': 'save the results, to compare them later',
+        'compare': 'compare against the latest saved results',
+        'only': 'only run benchmarks matching this expression',
+    },
+)
+def benchmarks(ctx, save=False, compare=False, only=''):
+    """Run benchmarks with pytest-benchmark."""
+    cmd = [
+        'pytest',
+        '--no-cov',
+        '-p no:randomly',
+        '-o python_files="bench_*.py"',
+        '--benchmark-only',
+        '--benchmark-columns=min,median,mean,max,stddev,ops,rounds',
+        '--benchmark-group-by=group',
+    ]
+    if save:
+        cmd.append('--benchmark-autosave')
+
+    if compare:
+        cmd.append('--benchmark-compare')
+
+    if only:
+        cmd.append(f'-k "{only}"')
+
+    cmd.append('benchmarks')
+
+    ctx.run(' '.join(cmd), pty=True, echo=True)
+
+
 @task
 def safety(ctx):
     """Run Safety dependency vuln checker."""